@@ -1,20 +1,43 @@
 import os
+import re
 import json
+import time
 import asyncio
 import glob
+import threading
+from functools import partial
 from datetime import datetime
 from loguru import logger
 from dotenv import load_dotenv
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.runners import InMemoryRunner
 from google.genai import types
-from prompts.analyser_prompt import analysis_prompt_template, enhanced_instruction, standalone_instruction, standalone_analysis_prompt
+from prompts.analyser_prompt import analysis_prompt_template, enhanced_instruction, standalone_instruction, standalone_analysis_prompt, batch_analysis_prompt, fast_path_instruction, fast_path_analysis_prompt
 from google.adk.tools.agent_tool import AgentTool
+from tools.llm_backend import create_model
 from tools.local_command_tools import close_persistent_terminal, get_terminal_session_info
+from tools.timestamp_parser import parse_timestamp_ms
+from tools.log_follow import follow_lines, IDLE, RESET
+from tools.checkpoint import load_checkpoint, save_checkpoint
+from tools.template_miner import TemplateMiner
+from tools.analysis_output import extract_analysis_json, extract_analysis_list, format_analysis_json
+from tools.micro_batch import MicroBatcher
+from tools.log_compaction import compact_log_entry
+from tools.analysis_cache import AnalysisCache, cache_key, prompt_version
+from tools.session_window import AnomalySummary, SessionWindow
+from tools.log_tool import search_nifi_logs_by_timestamp
+from tools.nifi_correlation import NifiCorrelationMap, register_map, unregister_map
+from tools.result_writer import get_result_writer
+from tools.result_index import ResultIndex, INDEX_DB_NAME
 
 
 load_dotenv()
 
+# ADK's in-memory session service deep-copies the whole session history on every read, which
+# blocks the event loop for longer the bigger the session gets; nothing here edits sessions
+# through those copies, so its shallow copy is enough (ignored by ADK versions without the flag)
+os.environ.setdefault("ADK_ENABLE_IN_MEMORY_SESSION_SERVICE_LIGHT_COPY", "1")
+
 # Configure logging
 logger.remove()
 logger.add(sink=lambda msg: print(msg, end=""), format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{function}</cyan> | <level>{message}</level>", level="INFO")
@@ -24,52 +47,142 @@ os.makedirs("agent_logs", exist_ok=True)
 logger.add(sink=log_filename, format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {function} | {message}", level="DEBUG")
 logger.info(f"Logging session to file: {log_filename}")
 
+# Follow mode (tail -F) configuration
+FOLLOW_POLL_INTERVAL = float(os.getenv("FOLLOW_POLL_INTERVAL", "0.25"))  # seconds between EOF polls (backs off to 2s)
+FOLLOW_IDLE_TIMEOUT = float(os.getenv("FOLLOW_IDLE_TIMEOUT", "2.0"))  # seconds before a held entry is flushed
+
+# Resume checkpoints: committed every N saved entries (1 = never re-analyse an entry after a crash)
+CHECKPOINT_INTERVAL = max(1, int(os.getenv("CHECKPOINT_INTERVAL", "1")))
+
+# Template mining: non-ERROR entries whose template was classified NORMAL often enough skip the LLM
+TEMPLATE_MINING = os.getenv("TEMPLATE_MINING", "True").lower() == "true"
+TEMPLATE_MIN_NORMAL = int(os.getenv("TEMPLATE_MIN_NORMAL", "5"))  # NORMAL verdicts needed before skipping
+TEMPLATE_MIN_CONFIDENCE = float(os.getenv("TEMPLATE_MIN_CONFIDENCE", "0.95"))  # share of NORMAL verdicts
+TEMPLATE_SIMILARITY = float(os.getenv("TEMPLATE_SIMILARITY", "0.5"))  # Drain similarity threshold
+
+template_miner = TemplateMiner(similarity_threshold=TEMPLATE_SIMILARITY, min_normal=TEMPLATE_MIN_NORMAL,
+                               min_confidence=TEMPLATE_MIN_CONFIDENCE)
+
+# Analysis cache: identical (normalized) entries reuse an earlier agent output instead of a full round trip
+ANALYSIS_CACHE = os.getenv("ANALYSIS_CACHE", "True").lower() == "true"
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "1000"))  # entries kept in memory (LRU)
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "3600"))  # seconds before a cached analysis is redone
+ANALYSIS_CACHE_DISK_SIZE = int(os.getenv("ANALYSIS_CACHE_DISK_SIZE", "10000"))  # entries kept in SQLite
+
+analysis_cache = AnalysisCache(max_entries=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL,
+                               max_disk_entries=ANALYSIS_CACHE_DISK_SIZE)
+
+# Entries analysed in parallel per file (each on its own session); 1 = one entry at a time
+ANALYSIS_CONCURRENCY = max(1, int(os.getenv("ANALYSIS_CONCURRENCY", "1")))
+
+# Micro-batching: up to N entries (or ~token budget) per LLM call; 1 = one entry per call
+# ERROR entries that need the NiFi tool or remediation are still analysed one by one
+ANALYSIS_BATCH_SIZE = max(1, int(os.getenv("ANALYSIS_BATCH_SIZE", "1")))
+ANALYSIS_BATCH_TOKENS = int(os.getenv("ANALYSIS_BATCH_TOKENS", "8000"))  # rough budget (~4 chars per token)
+ANALYSIS_BATCH_WAIT = float(os.getenv("ANALYSIS_BATCH_WAIT", "2.0"))  # seconds before a partial batch is sent
+
+# Prompt compaction: long stack traces are trimmed before they reach the model (saved logs stay complete)
+LOG_COMPACTION = os.getenv("LOG_COMPACTION", "True").lower() == "true"
+LOG_COMPACTION_TOKENS = int(os.getenv("LOG_COMPACTION_TOKENS", "1500"))  # per-entry budget (~4 chars per token)
+LOG_COMPACTION_FRAMES = int(os.getenv("LOG_COMPACTION_FRAMES", "8"))  # "at ..." frames kept per exception
+
+# Session window: move to a fresh session every N entries or T context tokens (0 = no limit) so the
+# history sent with each prompt stays bounded; recent anomalies are carried over as a short summary
+SESSION_WINDOW_ENTRIES = int(os.getenv("SESSION_WINDOW_ENTRIES", "50"))
+SESSION_WINDOW_TOKENS = int(os.getenv("SESSION_WINDOW_TOKENS", "32000"))
+SESSION_SUMMARY_ITEMS = int(os.getenv("SESSION_SUMMARY_ITEMS", "10"))  # anomalies kept in the rolling summary
+
+# NiFi fast path: ERROR entries get the NiFi lines around their timestamp searched in-process and inlined
+# into the prompt, instead of the analyser calling the NiFi sub-agent (one LLM round trip less per error)
+NIFI_FAST_PATH = os.getenv("NIFI_FAST_PATH", "False").lower() == "true"
+# Sweep join: before analysing a complete file in correlation mode, collect the NiFi window of every ERROR
+# entry in one pass over both logs; NiFi lookups for those entries are then served from memory
+NIFI_SWEEP_JOIN = os.getenv("NIFI_SWEEP_JOIN", "True").lower() == "true"
+# Results: appended as JSON lines to agent_outputs/results-NNNNNN.jsonl by a background writer thread
+RESULTS_SEGMENT_MB = float(os.getenv("RESULTS_SEGMENT_MB", "64"))  # segment size before rolling over
+RESULTS_FSYNC = os.getenv("RESULTS_FSYNC", "True").lower() == "true"  # fsync each group commit
+RESULTS_INDEX = os.getenv("RESULTS_INDEX", "True").lower() == "true"  # also index results in SQLite for queries
+_NIFI_NOT_NEEDED = "N/A - not an ERROR log, no NiFi correlation needed"
+_ENTRY_TIMESTAMP = re.compile(r"(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})|\b(\d{2}:\d{2}:\d{2})\b")
 
-def stream_logs_by_timestamp(log_file_path):
-    """Stream complete log entries grouped by timestamp (handles multi-line logs like stack traces)"""
-    import re
+
+def stream_logs_by_timestamp(log_file_path, follow=False, idle_timeout=None, poll_interval=None, stop_event=None,
+                             start_offset=0, with_offsets=False):
+    """Stream complete log entries grouped by timestamp (handles multi-line logs like stack traces)
+    
+    follow=True keeps the file open like `tail -F`: new entries are yielded as the file grows,
+    rotation/truncation is handled by inode, and an entry held back for possible continuation
+    lines is flushed after idle_timeout seconds without new data.
     
+    start_offset: byte offset to start at (an entry boundary, e.g. from a checkpoint)
+    with_offsets=True yields (log_entry, next_offset) where next_offset is the byte offset
+    right after the entry - i.e. where a resumed run should start.
+    """
     try:
-        logger.info(f"Starting timestamp-based log streaming from: {log_file_path}")
+        logger.info(f"Starting timestamp-based log streaming from: {log_file_path}" + (" (follow mode)" if follow else ""))
+        if start_offset:
+            logger.info(f"⏩ Resuming at byte offset {start_offset}")
+        
+        # Entries start with a fixed-width timestamp like "2025-10-09 16:20:41,140" or "2025-10-09 16:20:41.140"
+        if follow:
+            lines = follow_lines(
+                log_file_path,
+                poll_interval=poll_interval or FOLLOW_POLL_INTERVAL,
+                idle_timeout=idle_timeout or FOLLOW_IDLE_TIMEOUT,
+                stop_event=stop_event,
+                start_offset=start_offset
+            )
+        else:
+            lines = _read_lines(log_file_path, start_offset)
         
-        # Common log timestamp patterns
-        # Matches patterns like: "2025-10-09 16:20:41,140" or "2025-10-09 16:20:41.140"
-        timestamp_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}[,\.]\d{3}')
+        current_log_entry = []
+        log_entry_count = 0
+        line_count = 0
+        offset = start_offset  # Bytes consumed so far
         
-        with open(log_file_path, 'r') as file:
-            current_log_entry = []
-            log_entry_count = 0
-            line_count = 0
+        for raw_line in lines:
+            if raw_line is IDLE or raw_line is RESET:
+                # No new data for a while, or the file was rotated/truncated - the held entry is complete
+                if raw_line is RESET:
+                    offset = 0
+                if current_log_entry:
+                    log_entry_count += 1
+                    logger.debug(f"Flushing held log entry #{log_entry_count}: {current_log_entry[0][:80]}...")
+                    complete_log = '\n'.join(current_log_entry)
+                    yield (complete_log, offset) if with_offsets else complete_log
+                    current_log_entry = []
+                continue
             
-            for line in file:
-                line_count += 1
-                line = line.rstrip()  # Keep leading spaces but remove trailing
-                
-                # Check if this line starts with a timestamp (new log entry)
-                if timestamp_pattern.match(line):
-                    # If we have a previous log entry, yield it
-                    if current_log_entry:
-                        complete_log = '\n'.join(current_log_entry)
-                        log_entry_count += 1
-                        logger.debug(f"Yielding log entry #{log_entry_count} ({len(current_log_entry)} lines): {current_log_entry[0][:80]}...")
-                        yield complete_log
-                    
-                    # Start new log entry
-                    current_log_entry = [line]
-                else:
-                    # This is a continuation line (stack trace, multi-line message, etc.)
-                    if current_log_entry and line:  # Only add non-empty continuation lines
-                        current_log_entry.append(line)
+            line_start = offset
+            offset += len(raw_line)
+            line_count += 1
+            line = raw_line.decode('utf-8', errors='replace').rstrip()  # Keep leading spaces but remove trailing
+            
+            # Check if this line starts with a timestamp (new log entry)
+            if parse_timestamp_ms(line) is not None:
+                # If we have a previous log entry, yield it
+                if current_log_entry:
+                    complete_log = '\n'.join(current_log_entry)
+                    log_entry_count += 1
+                    logger.debug(f"Yielding log entry #{log_entry_count} ({len(current_log_entry)} lines): {current_log_entry[0][:80]}...")
+                    yield (complete_log, line_start) if with_offsets else complete_log
                 
-                if line_count % 1000 == 0:
-                    logger.debug(f"Streaming progress: {line_count} lines processed, {log_entry_count} log entries yielded")
+                # Start new log entry
+                current_log_entry = [line]
+            else:
+                # This is a continuation line (stack trace, multi-line message, etc.)
+                if current_log_entry and line:  # Only add non-empty continuation lines
+                    current_log_entry.append(line)
             
-            # Yield the last log entry if exists
-            if current_log_entry:
-                complete_log = '\n'.join(current_log_entry)
-                log_entry_count += 1
-                logger.debug(f"Yielding final log entry #{log_entry_count}: {current_log_entry[0][:80]}...")
-                yield complete_log
+            if line_count % 1000 == 0:
+                logger.debug(f"Streaming progress: {line_count} lines processed, {log_entry_count} log entries yielded")
+        
+        # Yield the last log entry if exists
+        if current_log_entry:
+            complete_log = '\n'.join(current_log_entry)
+            log_entry_count += 1
+            logger.debug(f"Yielding final log entry #{log_entry_count}: {current_log_entry[0][:80]}...")
+            yield (complete_log, offset) if with_offsets else complete_log
         
         logger.info(f"Streaming complete: {line_count} lines processed into {log_entry_count} complete log entries")
         
@@ -79,17 +192,54 @@ def stream_logs_by_timestamp(log_file_path):
         logger.error(f"Error during streaming: {e}")
 
 
-def save_agent_interaction(log_index, log_entry, input_prompt, agent_output, session_id=None, 
-                          tool_calls=None, execution_metadata=None, output_dir="agent_outputs"):
-    """Save agent interaction data with complete execution details"""
-    os.makedirs(output_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+def count_log_entries(log_file_path):
+    """Number of log entries in a file (lines that start with a timestamp), without building them"""
+    with open(log_file_path, 'rb') as file:
+        return sum(1 for line in file if parse_timestamp_ms(line) is not None)
+
+
+def _read_lines(log_file_path, start_offset=0):
+    with open(log_file_path, 'rb') as file:
+        file.seek(start_offset)
+        yield from file
+
+
+async def _aiter_log_entries(log_file_path, follow=False, start_offset=0, stop_event=None):
+    """Async view of stream_logs_by_timestamp yielding (log_entry, next_offset)
+    
+    Follow mode waits in a worker thread so the event loop stays free; setting stop_event
+    ends that wait (and frees the thread) even if the file never grows again
+    """
+    entries = stream_logs_by_timestamp(log_file_path, follow=follow, start_offset=start_offset, with_offsets=True,
+                                       stop_event=stop_event)
+    if not follow:
+        for item in entries:
+            yield item
+        return
     
+    while True:
+        item = await asyncio.to_thread(next, entries, None)
+        if item is None:
+            break
+        yield item
+
+
+def result_writer(output_dir="agent_outputs"):
+    index = ResultIndex(os.path.join(output_dir, INDEX_DB_NAME)) if RESULTS_INDEX else None
+    return get_result_writer(output_dir, segment_bytes=int(RESULTS_SEGMENT_MB * 1024 * 1024), fsync=RESULTS_FSYNC,
+                             index=index)
+
+
+def build_interaction_record(log_index, log_entry, input_prompt, agent_output, session_id=None,
+                             tool_calls=None, execution_metadata=None, run_id=None):
+    """Agent interaction data with complete execution details (one line of the result store)"""
     interaction_data = {
         "metadata": {
-            "timestamp": timestamp,
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "saved_at": datetime.now().isoformat(),
             "log_index": log_index,
-            "session_id": session_id
+            "session_id": session_id,
+            "run_id": run_id or session_id
         },
         "agent_configuration": {
             "name": "log_analysis_agent",
@@ -102,7 +252,14 @@ def save_agent_interaction(log_index, log_entry, input_prompt, agent_output, ses
             "total_responses": execution_metadata.get("total_responses", 0) if execution_metadata else 0,
             "total_tool_calls": len(tool_calls) if tool_calls else 0,
             "processing_time_ms": execution_metadata.get("processing_time_ms", 0) if execution_metadata else 0,
-            "sub_agent_triggered": execution_metadata.get("sub_agent_triggered", False) if execution_metadata else False
+            "sub_agent_triggered": execution_metadata.get("sub_agent_triggered", False) if execution_metadata else False,
+            "llm_skipped": execution_metadata.get("llm_skipped", False) if execution_metadata else False,
+            "template_id": execution_metadata.get("template_id") if execution_metadata else None,
+            "cache_hit": execution_metadata.get("cache_hit", False) if execution_metadata else False,
+            "compaction": execution_metadata.get("compaction") if execution_metadata else None,
+            "prompt_tokens": execution_metadata.get("prompt_tokens") if execution_metadata else None,
+            "session_window": execution_metadata.get("session_window") if execution_metadata else None,
+            "nifi_lookup": execution_metadata.get("nifi_lookup") if execution_metadata else None
         },
         "log_analysis": {
             "original_log_entry": log_entry,
@@ -112,37 +269,590 @@ def save_agent_interaction(log_index, log_entry, input_prompt, agent_output, ses
         }
     }
     
-    filename = f"{output_dir}/complete_log_{log_index:05d}_{timestamp}.json"
-    
+    return interaction_data
+
+
+def save_agent_interaction(log_index, log_entry, input_prompt, agent_output, session_id=None, 
+                          tool_calls=None, execution_metadata=None, output_dir="agent_outputs", run_id=None):
+    """Save agent interaction data with complete execution details - returns True once it is on disk"""
     try:
-        with open(filename, 'w') as f:
-            json.dump(interaction_data, f, indent=2)
+        record = build_interaction_record(log_index, log_entry, input_prompt, agent_output, session_id,
+                                          tool_calls, execution_metadata, run_id)
     except Exception as e:
         logger.error(f"Failed to save interaction for log {log_index}: {e}")
+        return False
+    return result_writer(output_dir).write(record)
+
+
+async def run_agent_on_entry(session, prompt, log_index, log_entry, status_callback=None):
+    """Run one prompt through the multi-agent system and collect its output, tool calls and timing
+    
+    Returns (agent_output, tool_calls, execution_metadata)
+    """
+    try:
+        content = types.Content(
+            parts=[types.Part.from_text(text=prompt)],
+            role="user"
+        )
+
+        logger.info(f"Calling multi-agent system for log #{log_index}")
+
+        # Initialize tracking variables
+        agent_output = "No response from agent"
+        all_responses = []
+        tool_calls = []  # Track all tool calls
+        prompt_token_counts = []  # Prompt size of each model call, as reported by the model
+        output_tokens = 0
+        start_time = datetime.now()
+
+        response_count = 0
+        # Capture multiple responses to get full flow:
+        # - Agent 1 analysis
+        # - Agent 3 delegation (if triggered)
+        # - Agent 3 response
+        max_responses = 3  # Increased to capture Agent 1's analysis + Agent 3 flow
+
+        async for event in agent_runner.run_async(
+            user_id=session.user_id, 
+            session_id=session.id,
+            new_message=content
+        ):
+            usage = getattr(event, 'usage_metadata', None)
+            if usage and not getattr(event, 'partial', False):
+                if usage.prompt_token_count:
+                    prompt_token_counts.append(usage.prompt_token_count)
+                output_tokens += usage.candidates_token_count or 0
+            
+            # Handle different types of events
+            if hasattr(event, 'content') and event.content and event.content.parts:
+                for part in event.content.parts:
+                    # Log function calls and track them
+                    if hasattr(part, 'function_call') and part.function_call:
+                        tool_name = part.function_call.name
+                        call_time = datetime.now()
+
+                        # Capture tool call details
+                        tool_call_info = {
+                            "tool_name": tool_name,
+                            "timestamp": call_time.isoformat(),
+                            "call_sequence": len(tool_calls) + 1
+                        }
+
+                        # Try to capture arguments if available
+                        try:
+                            if hasattr(part.function_call, 'args') and part.function_call.args:
+                                tool_call_info["arguments"] = str(part.function_call.args)[:500]  # Limit size
+                        except:
+                            pass
+
+                        tool_calls.append(tool_call_info)
+
+                        logger.info(f"🔧 Tool call #{len(tool_calls)}: {tool_name}")
+                        if status_callback:
+                            status_callback("tool_call", f"🔧 Tool call: {tool_name}")
+
+                    # Log function responses with details
+                    elif hasattr(part, 'function_response') and part.function_response:
+                        tool_name = part.function_response.name
+                        response_time = datetime.now()
+
+                        # Update the corresponding tool call with response time
+                        for tool_call in reversed(tool_calls):
+                            if tool_call["tool_name"] == tool_name and "response_timestamp" not in tool_call:
+                                tool_call["response_timestamp"] = response_time.isoformat()
+
+                                # Calculate response time
+                                call_time = datetime.fromisoformat(tool_call["timestamp"])
+                                response_duration = (response_time - call_time).total_seconds() * 1000
+                                tool_call["response_time_ms"] = round(response_duration, 2)
+
+                                # Capture response preview
+                                try:
+                                    if hasattr(part.function_response, 'response'):
+                                        response_preview = str(part.function_response.response)[:300]
+                                        tool_call["response_preview"] = response_preview
+                                except:
+                                    pass
+                                break
+
+                        logger.info(f"📋 Tool response: {tool_name}")
+                        if status_callback:
+                            status_callback("tool_response", f"📋 Tool response: {tool_name}")
+                        if tool_name == "nifi_agent_tool":
+                            logger.info(f"📊 NiFi tool response content: {str(part.function_response.response)[:200]}...")
+
+            if event.is_final_response():
+                response_count += 1
+                logger.info(f"📨 Capturing response #{response_count}")
+                if status_callback:
+                    status_callback("response", f"📨 Agent response #{response_count}")
+
+                # Capture response text
+                current_response = ""
+                if event.content and event.content.parts:
+                    for part in event.content.parts:
+                        if hasattr(part, 'text') and part.text:
+                            current_response = part.text
+                            all_responses.append(current_response)
+                            logger.debug(f"Response #{response_count} preview: {current_response[:100]}...")
+
+                # Update agent_output only if we got actual text (not just delegation)
+                if current_response:
+                    agent_output = current_response
+
+                # Exit immediately if we've captured expected responses
+                if response_count >= max_responses:
+                    logger.info(f"📋 Captured {response_count} responses - exiting")
+                    break
+
+        # Calculate total processing time
+        end_time = datetime.now()
+        processing_time_ms = round((end_time - start_time).total_seconds() * 1000, 2)
+
+        # Detect if sub-agent was triggered
+        sub_agent_triggered = response_count > 1 or any("remediation" in str(resp).lower() for resp in all_responses)
+
+        # Combine multiple responses if any - preserve ALL responses
+        if len(all_responses) > 1:
+            agent_output = "\n\n--- AGENT FLOW ---\n".join(all_responses)
+            logger.info(f"📋 Combined {len(all_responses)} responses into final output")
+        elif len(all_responses) == 1:
+            agent_output = all_responses[0]
+            logger.info(f"📋 Single response captured")
+
+        # Prepare execution metadata
+        execution_metadata = {
+            "total_responses": response_count,
+            "processing_time_ms": processing_time_ms,
+            "sub_agent_triggered": sub_agent_triggered,
+            "all_responses": all_responses,
+            # First call = this entry's prompt plus the session history it was sent with
+            "prompt_tokens": prompt_token_counts[0] if prompt_token_counts else None,
+            "prompt_tokens_per_call": prompt_token_counts,
+            "output_tokens": output_tokens,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to call multi-agent system: {e}")
+        logger.error(f"Error type: {type(e)}")
+        logger.error(f"Error occurred for log entry: {log_entry[:100]}...")
+        agent_output = f"Error calling multi-agent system: {e}"
+        tool_calls = []
+        execution_metadata = {
+            "total_responses": 0,
+            "processing_time_ms": 0,
+            "sub_agent_triggered": False,
+            "all_responses": [],
+            "error": str(e)
+        }
+    
+    return agent_output, tool_calls, execution_metadata
+
+
+async def rotate_session(window, anomaly_summary=None):
+    """Move a SessionWindow that reached its limits onto a fresh session and delete the old one"""
+    old_session = window.session
+    window.rotate(await agent_runner.session_service.create_session(
+        app_name="log_analysis_agent",
+        user_id="log_analyzer"
+    ))
+    logger.info(f"🔄 Session {old_session.id[:8]} reached its window - continuing on {window.session.id[:8]} "
+                f"({len(anomaly_summary or ())} recent anomalies carried over)")
+    try:
+        await agent_runner.session_service.delete_session(
+            app_name="log_analysis_agent",
+            user_id="log_analyzer",
+            session_id=old_session.id
+        )
+    except Exception as e:
+        logger.debug(f"Could not delete session {old_session.id}: {e}")
+
+
+async def inline_nifi_context(log_entry, nifi_window=None):
+    """NiFi fast path: search the NiFi logs around the entry's timestamp without the NiFi sub-agent
+    
+    nifi_window: the entry's precomputed window from the sweep join, if there is one
+    Returns (text for the prompt, lookup info)
+    """
+    match = _ENTRY_TIMESTAMP.search(log_entry.split('\n')[0])
+    if not match:
+        return "No timestamp found in the log entry - NiFi logs could not be searched", \
+            {"timestamp": None, "nifi_logs_found": 0, "lookup_ms": 0}
+    
+    timestamp = (match.group(1) or match.group(2)).replace("T", " ")
+    start = time.perf_counter()
+    if nifi_window is not None:
+        result = {"status": "success", "nifi_logs_found": nifi_window.total,
+                  "nifi_infrastructure_logs": nifi_window.lines}
+    else:
+        result = await asyncio.to_thread(search_nifi_logs_by_timestamp, timestamp)
+    lookup_ms = round((time.perf_counter() - start) * 1000, 2)
+    
+    found = result.get("nifi_logs_found", 0)
+    lines = result.get("nifi_infrastructure_logs") or []
+    if result.get("status") != "success":
+        text = f"NiFi log search failed: {result.get('error') or result.get('message')}"
+    elif not lines:
+        text = f"No NiFi logs found between 2 seconds before and 1 second after {timestamp}"
+    else:
+        text = "\n".join(lines)
+        if found > len(lines):
+            text += f"\n... {found - len(lines)} more NiFi lines in the same window"
+    logger.info(f"⚡ NiFi fast path: {found} NiFi lines around {timestamp} in {lookup_ms} ms")
+    return text, {"timestamp": timestamp, "nifi_logs_found": found, "lookup_ms": lookup_ms,
+                  "from_correlation_map": nifi_window is not None}
+
+
+def analysis_prompt_for_mode():
+    """The Analyser prompt template for the current mode: NiFi sub-agent, NiFi fast path or standalone"""
+    if CORRELATION_MODE:
+        return fast_path_analysis_prompt if NIFI_FAST_PATH else analysis_prompt_template
+    return standalone_analysis_prompt
+
+
+async def build_analysis_prompt(prompt_template, log_entry, prompt_entry=None, nifi_window=None):
+    """Prompt for one entry - on the NiFi fast path ERROR entries get the NiFi logs around them inline
+    
+    prompt_entry: the (compacted) entry text for the prompt, default log_entry
+    Returns (prompt, NiFi lookup info or None)
+    """
+    prompt_entry = prompt_entry or log_entry
+    if NIFI_FAST_PATH and CORRELATION_MODE and " ERROR " in log_entry.split('\n')[0]:
+        nifi_logs, nifi_lookup = await inline_nifi_context(log_entry, nifi_window)
+        return prompt_template.format(log_entry=prompt_entry, nifi_logs=nifi_logs), nifi_lookup
+    return prompt_template.format(log_entry=prompt_entry, nifi_logs=_NIFI_NOT_NEEDED), None
 
 
-async def process_log_file(log_file_path, status_callback=None):
-    """Process ALL logs for analysis - remediation handled by sub-agent automatically"""
-    logger.info(f"Starting real-time streaming processing from: {log_file_path}")
+def _nifi_step_ms(tool_calls, execution_metadata):
+    """Time spent getting NiFi correlation for one entry (fast-path lookup or NiFi sub-agent round trip)"""
+    if execution_metadata.get("nifi_lookup"):
+        return execution_metadata["nifi_lookup"]["lookup_ms"]
+    timings = [c["response_time_ms"] for c in tool_calls or []
+               if c.get("tool_name") == "nifi_agent_tool" and "response_time_ms" in c]
+    return sum(timings) if timings else None
+
+
+async def analyse_entry(run_llm, prompt_template, prompt_key, log_index, log_entry, status_callback=None,
+                        correlation_map=None):
+    """Analyse one entry: known-normal template → cached analysis → LLM
+    
+    run_llm(prompt, log_index, prompt_entry) performs the LLM step (single call or micro-batch)
+    correlation_map: NiFi windows precomputed by the sweep join (fast path reads them by log index)
+    Returns (prompt, agent_output, tool_calls, execution_metadata)
+    """
+    first_line = log_entry.split('\n')[0]
+    
+    # Multi-line entries are compacted for the prompt only
+    compaction = None
+    prompt_entry = log_entry
+    if LOG_COMPACTION and "\n" in log_entry:
+        prompt_entry, compaction = compact_log_entry(log_entry, max_tokens=LOG_COMPACTION_TOKENS,
+                                                     head_frames=LOG_COMPACTION_FRAMES)
+        if compaction["bytes_saved"] > 0:
+            logger.info(f"🗜️ Log #{log_index} compacted: {compaction['original_bytes']} → "
+                        f"{compaction['compacted_bytes']} bytes (~{compaction['tokens_saved_est']} tokens saved)")
+    # Recorded on every path (template skip, cache hit, LLM) so compaction stats cover all entries
+    entry_metadata = {"compaction": compaction} if compaction is not None else {}
+    prompt = prompt_template.format(log_entry=prompt_entry, nifi_logs=_NIFI_NOT_NEEDED)
+    
+    # ERROR entries always go to the LLM (they may need remediation)
+    cluster = None
+    if TEMPLATE_MINING and " ERROR " not in first_line:
+        cluster = template_miner.add_log_message(log_entry)
+    
+    if cluster is not None and template_miner.is_known_normal(cluster):
+        agent_output = format_analysis_json(template_miner.synthesize_result(cluster))
+        tool_calls = []
+        execution_metadata = {
+            "total_responses": 0,
+            "processing_time_ms": 0,
+            "sub_agent_triggered": False,
+            "all_responses": [],
+            "llm_skipped": True,
+            "template_id": cluster.cluster_id,
+            "template": cluster.template,
+            **entry_metadata
+        }
+        logger.info(f"⏭️ Known-normal template #{cluster.cluster_id} - LLM call skipped")
+        if status_callback:
+            status_callback("response", f"⏭️ Known-normal template #{cluster.cluster_id} - LLM skipped")
+        return prompt, agent_output, tool_calls, execution_metadata
+    
+    key = cache_key(log_entry, prompt_key) if ANALYSIS_CACHE else None
+    # SQLite lookups and commits run in a worker thread, off the event loop
+    cached_output = await asyncio.to_thread(analysis_cache.get, key) if key else None
+    if cached_output is not None:
+        agent_output = cached_output
+        tool_calls = []
+        execution_metadata = {
+            "total_responses": 0,
+            "processing_time_ms": 0,
+            "sub_agent_triggered": False,
+            "all_responses": [],
+            "cache_hit": True,
+            **entry_metadata
+        }
+        logger.info(f"💾 Cache hit for log #{log_index} - reusing earlier analysis")
+        if status_callback:
+            status_callback("response", f"💾 Cached analysis reused for log #{log_index}")
+    else:
+        prompt, nifi_lookup = await build_analysis_prompt(
+            prompt_template, log_entry, prompt_entry, correlation_map.get(log_index) if correlation_map else None
+        )
+        agent_output, tool_calls, execution_metadata = await run_llm(prompt, log_index, prompt_entry)
+        if nifi_lookup is not None:
+            execution_metadata["nifi_lookup"] = nifi_lookup
+        if key and "error" not in execution_metadata:
+            await asyncio.to_thread(analysis_cache.put, key, agent_output)
+        execution_metadata.update(entry_metadata)
+    
+    if cluster is not None:
+        template_miner.record_result(cluster, extract_analysis_json(agent_output))
+        execution_metadata["template_id"] = cluster.cluster_id
+    return prompt, agent_output, tool_calls, execution_metadata
+
+
+async def process_log_file(log_file_path, status_callback=None, follow=False, resume=False, concurrency=None,
+                           batch_size=None):
+    """Process ALL logs for analysis - remediation handled by sub-agent automatically
+    
+    follow=True keeps analysing new entries as the file grows (runs until cancelled)
+    resume=True continues after the last checkpointed entry instead of starting at entry 1
+    concurrency=N keeps up to N LLM calls in flight, each on its own session (default: ANALYSIS_CONCURRENCY);
+    results are still saved and checkpointed in log order
+    batch_size=N packs up to N entries into one LLM call (default: ANALYSIS_BATCH_SIZE)
+    """
+    concurrency = max(1, concurrency or ANALYSIS_CONCURRENCY)
+    batch_size = max(1, batch_size or ANALYSIS_BATCH_SIZE)
+    logger.info(f"Starting real-time streaming processing from: {log_file_path}" + (" (follow mode)" if follow else ""))
     logger.info("📊 ANALYZING: All log types (INFO/WARN/ERROR/DEBUG) will be analyzed")
     logger.info("🔧 REMEDIATION: ERROR logs classified as ANOMALY will trigger remediation sub-agent automatically")
     
-    session = await agent_runner.session_service.create_session(
-        app_name="log_analysis_agent", 
-        user_id="log_analyzer"
-    )
-    logger.info(f"Created session: {session.id}")
+    checkpoint = load_checkpoint(log_file_path) if resume else None
+    start_offset = checkpoint["byte_offset"] if checkpoint else 0
+    error_log_count = checkpoint["entry_count"] if checkpoint else 0
+    
+    session = None
+    if checkpoint:
+        # Keep the original session id so resumed results line up with the first run
+        session = await agent_runner.session_service.get_session(
+            app_name="log_analysis_agent",
+            user_id="log_analyzer",
+            session_id=checkpoint["session_id"]
+        )
+        if session is None:
+            session = await agent_runner.session_service.create_session(
+                app_name="log_analysis_agent",
+                user_id="log_analyzer",
+                session_id=checkpoint["session_id"]
+            )
+        logger.info(f"⏩ Resuming session {session.id} after {error_log_count} committed logs (byte {start_offset})")
+        if status_callback:
+            status_callback("info", f"Resuming after log #{error_log_count}")
+    elif resume:
+        logger.info("No usable checkpoint found - starting from the beginning")
+    
+    if session is None:
+        session = await agent_runner.session_service.create_session(
+            app_name="log_analysis_agent", 
+            user_id="log_analyzer"
+        )
+        logger.info(f"Created session: {session.id}")
     
     if status_callback:
+        status_callback("session", session.id)  # The run's session id - results are saved under it
         status_callback("info", f"Session created: {session.id[:8]}...")
     
-    error_log_count = 0
+    # One session per in-flight entry so concurrent conversations never interleave
+    idle_sessions = asyncio.Queue()
+    idle_sessions.put_nowait(SessionWindow(session, SESSION_WINDOW_ENTRIES, SESSION_WINDOW_TOKENS))
+    for _ in range(concurrency - 1):
+        idle_sessions.put_nowait(SessionWindow(await agent_runner.session_service.create_session(
+            app_name="log_analysis_agent",
+            user_id="log_analyzer"
+        ), SESSION_WINDOW_ENTRIES, SESSION_WINDOW_TOKENS))
+    if concurrency > 1:
+        logger.info(f"⚡ Analysing up to {concurrency} logs concurrently ({concurrency} sessions)")
+    anomaly_summary = AnomalySummary(max_items=SESSION_SUMMARY_ITEMS)
+    
+    # Entries in log order with their analysis task; bounded so a slow entry holds back the reader
+    # (4x the batch size, so a partial batch can never be the entry the saver is waiting on)
+    in_order = asyncio.Queue(maxsize=max(concurrency, batch_size) * 4)
+    in_flight = set()
+    awaiting_submit = set()  # Events of batchable entries, set once the entry is in the batcher (or done)
+    
+    # Checkpoint state - only advanced after an entry's result is saved
+    pending_checkpoint = 0
+    nifi_timings = []  # (NiFi step ms, total ms) per ERROR entry analysed by the LLM in correlation mode
+    checkpoint_frozen = False
+    saved_count = error_log_count
+    saved_offset = start_offset
     
     # Choose prompt template based on correlation mode
-    prompt_template = analysis_prompt_template if CORRELATION_MODE else standalone_analysis_prompt
+    prompt_template = analysis_prompt_for_mode()
+    prompt_key = prompt_version(prompt_template)
+    
+    async def run_on_idle_session(prompt, log_index, log_entry):
+        window = await idle_sessions.get()  # Waits while `concurrency` LLM calls are in flight
+        try:
+            session_prompt = prompt
+            summary = anomaly_summary.render() if window.is_fresh else ""
+            if summary:
+                session_prompt = summary + prompt
+            agent_output, tool_calls, execution_metadata = await run_agent_on_entry(
+                window.session, session_prompt, log_index, log_entry, status_callback
+            )
+            execution_metadata["session_id"] = window.session.id
+            window.record(session_prompt, agent_output, execution_metadata.get("prompt_tokens"))
+            execution_metadata["session_window"] = dict(window.snapshot(), summary_carried=bool(summary))
+            if window.is_full():
+                await rotate_session(window, anomaly_summary)
+            return agent_output, tool_calls, execution_metadata
+        finally:
+            idle_sessions.put_nowait(window)
+    
+    if CORRELATION_MODE:
+        correlation_field, correlation_value = "nifi_correlation", "N/A - not an ERROR log, no NiFi correlation needed"
+    else:
+        correlation_field, correlation_value = "infrastructure_correlation", "N/A - No correlation source configured"
+    
+    async def run_batch(items):
+        """One LLM call for several (log_index, log_entry) items - one (analysis, metadata) or None per item"""
+        if len(items) == 1:
+            return [None]  # A lone entry goes through the regular per-entry prompt
+        first_index, last_index = items[0][0], items[-1][0]
+        log_entries = "\n\n".join(f"[{number}] {entry}" for number, (_, entry) in enumerate(items, 1))
+        batch_prompt = batch_analysis_prompt.format(count=len(items), log_entries=log_entries,
+                                                    correlation_field=correlation_field,
+                                                    correlation_value=correlation_value)
+        logger.info(f"📦 Analysing logs #{first_index}-#{last_index} in one call ({len(items)} entries)")
+        agent_output, _, metadata = await run_on_idle_session(batch_prompt, first_index, log_entries)
+        if "error" in metadata:
+            return []
+        
+        analyses = extract_analysis_list(agent_output) or []
+        by_number = {a.get("log_number"): a for a in analyses}
+        batch_metadata = {
+            "total_responses": metadata.get("total_responses", 0),
+            "processing_time_ms": metadata.get("processing_time_ms", 0),
+            "sub_agent_triggered": False,
+            "all_responses": [],
+            "batch_size": len(items),
+            "batch_log_range": [first_index, last_index],
+            "prompt_tokens": metadata.get("prompt_tokens"),
+            "session_window": metadata.get("session_window"),
+            "session_id": metadata["session_id"]
+        }
+        results = []
+        for number in range(1, len(items) + 1):
+            analysis = by_number.get(number)
+            if analysis is None and len(analyses) == len(items):
+                analysis = analyses[number - 1]  # Model dropped log_number but kept the order
+            if analysis is not None:
+                analysis = {k: v for k, v in analysis.items() if k != "log_number"}
+                results.append((analysis, batch_metadata))
+            else:
+                results.append(None)
+        missing = results.count(None)
+        if missing:
+            logger.warning(f"⚠ Batch answer missing {missing}/{len(items)} entries - analysing those individually")
+        return results
+    
+    batcher = MicroBatcher(run_batch, max_items=batch_size, max_tokens=ANALYSIS_BATCH_TOKENS,
+                           max_wait=ANALYSIS_BATCH_WAIT)
+    if batch_size > 1:
+        logger.info(f"📦 Micro-batching up to {batch_size} logs per LLM call")
+    
+    async def run_batched(queued, prompt, log_index, log_entry):
+        submitted = batcher.submit((log_index, log_entry), tokens=len(log_entry) // 4 + 1)
+        queued.set()
+        result = await submitted
+        if result is not None:
+            analysis, batch_metadata = result
+            needs_remediation = (" ERROR " in log_entry.split('\n')[0]
+                                 and str(analysis.get("classification", "")).upper() == "ANOMALY")
+            if not needs_remediation:
+                return format_analysis_json(analysis), [], dict(batch_metadata)
+            logger.info(f"↩️ Log #{log_index} is an ERROR anomaly - re-analysing individually for remediation")
+        agent_output, tool_calls, execution_metadata = await run_on_idle_session(prompt, log_index, log_entry)
+        execution_metadata["batch_fallback"] = result is not None
+        return agent_output, tool_calls, execution_metadata
+    
+    async def analyse(run_llm, log_index, log_entry):
+        result = await analyse_entry(run_llm, prompt_template, prompt_key, log_index, log_entry, status_callback,
+                                     correlation_map)
+        anomaly_summary.add(log_index, extract_analysis_json(result[1]))
+        return result
+    
+    writer = result_writer()
+    
+    def committed(log_index, entry_end_offset, saved):
+        """Runs on the result writer thread, in log order, once the entry's result is durable (or not)"""
+        nonlocal pending_checkpoint, checkpoint_frozen, saved_count, saved_offset
+        # Commit the checkpoint only once the result is on disk; after a failed save it stays
+        # put so a resumed run re-analyses from the unsaved entry instead of skipping it
+        if not saved and not checkpoint_frozen:
+            checkpoint_frozen = True
+            logger.warning(f"⚠ Checkpoint frozen before log #{log_index} (result not saved)")
+        if saved and not checkpoint_frozen:
+            saved_count, saved_offset = log_index, entry_end_offset
+            pending_checkpoint += 1
+            if pending_checkpoint >= CHECKPOINT_INTERVAL:
+                _commit_checkpoint(log_file_path, saved_offset, saved_count, session.id)
+                pending_checkpoint = 0
+        
+        if log_index % 10 == 0:
+            logger.info(f"Progress: {log_index} logs processed")
+    
+    async def save_in_order():
+        while True:
+            item = await in_order.get()
+            if item is None:
+                return
+            log_index, log_entry, entry_end_offset, task = item
+            try:
+                prompt, agent_output, tool_calls, execution_metadata = await task
+                nifi_ms = _nifi_step_ms(tool_calls, execution_metadata) if CORRELATION_MODE else None
+                if nifi_ms is not None:
+                    total_ms = execution_metadata.get("processing_time_ms", 0)
+                    if execution_metadata.get("nifi_lookup"):
+                        total_ms += nifi_ms  # The fast-path lookup runs before the LLM call
+                    nifi_timings.append((nifi_ms, total_ms))
+                record = build_interaction_record(
+                    log_index=log_index, 
+                    log_entry=log_entry, 
+                    input_prompt=prompt, 
+                    agent_output=agent_output,
+                    session_id=execution_metadata.pop("session_id", session.id),
+                    tool_calls=tool_calls,
+                    execution_metadata=execution_metadata,
+                    run_id=session.id
+                )
+            except Exception as e:
+                logger.error(f"Analysis failed for log #{log_index}: {e}")
+                record = None  # Still takes its place in the commit order - freezes the checkpoint
+            
+            # Appended by the writer thread; the checkpoint advances in `committed` once it is durable
+            writer.submit(record, on_commit=lambda ok, i=log_index, o=entry_end_offset: committed(i, o, ok))
+    
+    # Complete files in correlation mode: one sweep over the app and NiFi logs instead of a lookup per ERROR
+    correlation_map = None
+    if CORRELATION_MODE and NIFI_SWEEP_JOIN and not follow:
+        try:
+            correlation_map = await asyncio.to_thread(NifiCorrelationMap.build, log_file_path, start_offset,
+                                                      error_log_count + 1)
+            register_map(correlation_map)
+        except Exception as e:
+            logger.warning(f"⚠ NiFi sweep join failed - falling back to per-error lookups: {e}")
+    
+    saver = asyncio.create_task(save_in_order())
+    stop_event = threading.Event()  # Ends a follow-mode read blocked in its worker thread
     
     try:
-        for log_entry in stream_logs_by_timestamp(log_file_path):
+        async for log_entry, next_offset in _aiter_log_entries(log_file_path, follow=follow, start_offset=start_offset,
+                                                               stop_event=stop_event):
             error_log_count += 1
             # Show first line of log entry (timestamp line)
             first_line = log_entry.split('\n')[0]
@@ -152,176 +862,48 @@ async def process_log_file(log_file_path, status_callback=None):
                 status_callback("log", log_entry)  # Send the actual log content
                 status_callback("processing", f"Analyzing log #{error_log_count}")
             
-            prompt = prompt_template.format(log_entry=log_entry)
-            
-            try:
-                content = types.Content(
-                    parts=[types.Part.from_text(text=prompt)],
-                    role="user"
-                )
-                
-                logger.info(f"Calling multi-agent system for log #{error_log_count}")
-                
-                # Initialize tracking variables
-                agent_output = "No response from agent"
-                all_responses = []
-                tool_calls = []  # Track all tool calls
-                start_time = datetime.now()
-                
-                response_count = 0
-                # Capture multiple responses to get full flow:
-                # - Agent 1 analysis
-                # - Agent 3 delegation (if triggered)
-                # - Agent 3 response
-                max_responses = 3  # Increased to capture Agent 1's analysis + Agent 3 flow
-                
-                async for event in agent_runner.run_async(
-                    user_id=session.user_id, 
-                    session_id=session.id,
-                    new_message=content
-                ):
-                    # Handle different types of events
-                    if hasattr(event, 'content') and event.content and event.content.parts:
-                        for part in event.content.parts:
-                            # Log function calls and track them
-                            if hasattr(part, 'function_call') and part.function_call:
-                                tool_name = part.function_call.name
-                                call_time = datetime.now()
-                                
-                                # Capture tool call details
-                                tool_call_info = {
-                                    "tool_name": tool_name,
-                                    "timestamp": call_time.isoformat(),
-                                    "call_sequence": len(tool_calls) + 1
-                                }
-                                
-                                # Try to capture arguments if available
-                                try:
-                                    if hasattr(part.function_call, 'args') and part.function_call.args:
-                                        tool_call_info["arguments"] = str(part.function_call.args)[:500]  # Limit size
-                                except:
-                                    pass
-                                
-                                tool_calls.append(tool_call_info)
-                                
-                                logger.info(f"🔧 Tool call #{len(tool_calls)}: {tool_name}")
-                                if status_callback:
-                                    status_callback("tool_call", f"🔧 Tool call: {tool_name}")
-                                
-                            # Log function responses with details
-                            elif hasattr(part, 'function_response') and part.function_response:
-                                tool_name = part.function_response.name
-                                response_time = datetime.now()
-                                
-                                # Update the corresponding tool call with response time
-                                for tool_call in reversed(tool_calls):
-                                    if tool_call["tool_name"] == tool_name and "response_timestamp" not in tool_call:
-                                        tool_call["response_timestamp"] = response_time.isoformat()
-                                        
-                                        # Calculate response time
-                                        call_time = datetime.fromisoformat(tool_call["timestamp"])
-                                        response_duration = (response_time - call_time).total_seconds() * 1000
-                                        tool_call["response_time_ms"] = round(response_duration, 2)
-                                        
-                                        # Capture response preview
-                                        try:
-                                            if hasattr(part.function_response, 'response'):
-                                                response_preview = str(part.function_response.response)[:300]
-                                                tool_call["response_preview"] = response_preview
-                                        except:
-                                            pass
-                                        break
-                                
-                                logger.info(f"📋 Tool response: {tool_name}")
-                                if status_callback:
-                                    status_callback("tool_response", f"📋 Tool response: {tool_name}")
-                                if tool_name == "nifi_agent_tool":
-                                    logger.info(f"📊 NiFi tool response content: {str(part.function_response.response)[:200]}...")
-                    
-                    if event.is_final_response():
-                        response_count += 1
-                        logger.info(f"📨 Capturing response #{response_count}")
-                        if status_callback:
-                            status_callback("response", f"📨 Agent response #{response_count}")
-                        
-                        # Capture response text
-                        current_response = ""
-                        if event.content and event.content.parts:
-                            for part in event.content.parts:
-                                if hasattr(part, 'text') and part.text:
-                                    current_response = part.text
-                                    all_responses.append(current_response)
-                                    logger.debug(f"Response #{response_count} preview: {current_response[:100]}...")
-                        
-                        # Update agent_output only if we got actual text (not just delegation)
-                        if current_response:
-                            agent_output = current_response
-                        
-                        # Exit immediately if we've captured expected responses
-                        if response_count >= max_responses:
-                            logger.info(f"📋 Captured {response_count} responses - exiting")
-                            break
-                
-                # Calculate total processing time
-                end_time = datetime.now()
-                processing_time_ms = round((end_time - start_time).total_seconds() * 1000, 2)
-                
-                # Detect if sub-agent was triggered
-                sub_agent_triggered = response_count > 1 or any("remediation" in str(resp).lower() for resp in all_responses)
-                
-                # Combine multiple responses if any - preserve ALL responses
-                if len(all_responses) > 1:
-                    agent_output = "\n\n--- AGENT FLOW ---\n".join(all_responses)
-                    logger.info(f"📋 Combined {len(all_responses)} responses into final output")
-                elif len(all_responses) == 1:
-                    agent_output = all_responses[0]
-                    logger.info(f"📋 Single response captured")
-                
-                # Prepare execution metadata
-                execution_metadata = {
-                    "total_responses": response_count,
-                    "processing_time_ms": processing_time_ms,
-                    "sub_agent_triggered": sub_agent_triggered,
-                    "all_responses": all_responses,
-                    "start_time": start_time.isoformat(),
-                    "end_time": end_time.isoformat()
-                }
-                    
-            except Exception as e:
-                logger.error(f"Failed to call multi-agent system: {e}")
-                logger.error(f"Error type: {type(e)}")
-                logger.error(f"Error occurred for log entry: {log_entry[:100]}...")
-                agent_output = f"Error calling multi-agent system: {e}"
-                tool_calls = []
-                execution_metadata = {
-                    "total_responses": 0,
-                    "processing_time_ms": 0,
-                    "sub_agent_triggered": False,
-                    "all_responses": [],
-                    "error": str(e)
-                }
-                
-    
-            save_agent_interaction(
-                log_index=error_log_count, 
-                log_entry=log_entry, 
-                input_prompt=prompt, 
-                agent_output=agent_output,
-                session_id=session.id,
-                tool_calls=tool_calls,
-                execution_metadata=execution_metadata
-            )
-            
-            if error_log_count % 10 == 0:
-                logger.info(f"Progress: {error_log_count} logs processed")
-            
+            # In correlation mode ERROR entries need the NiFi tool - they are never batched
+            batchable = batch_size > 1 and not (CORRELATION_MODE and " ERROR " in first_line)
+            run_llm = run_on_idle_session
+            if batchable:
+                queued = asyncio.Event()
+                awaiting_submit.add(queued)
+                run_llm = partial(run_batched, queued)
+            task = asyncio.create_task(analyse(run_llm, error_log_count, log_entry))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            if batchable:
+                task.add_done_callback(lambda _, q=queued: (q.set(), awaiting_submit.discard(q)))
+            await in_order.put((error_log_count, log_entry, next_offset, task))
+        
+        # The last entries may still be looking up the cache - flush once each is in the batcher
+        # (or needed no LLM call), so none waits out ANALYSIS_BATCH_WAIT for a batch of its own
+        await asyncio.gather(*(queued.wait() for queued in list(awaiting_submit)))
+        batcher.flush()
+        await in_order.put(None)
+        await saver
+        await asyncio.to_thread(writer.flush)
             
     except KeyboardInterrupt:
         logger.warning("Processing stopped by user")
     except Exception as e:
         logger.error(f"Error during processing: {e}")
+        raise  # The caller (e.g. the job scheduler) has to see the run failed
     
     finally:
+        stop_event.set()
+        saver.cancel()
+        batcher.cancel()
+        if correlation_map is not None:
+            unregister_map(correlation_map)
+        # Results already handed to the writer still count for the checkpoint (waited for off the event loop)
+        await asyncio.shield(asyncio.to_thread(writer.flush, 30))
+        for task in list(in_flight):
+            task.cancel()
+        
+        if pending_checkpoint and not checkpoint_frozen:
+            _commit_checkpoint(log_file_path, saved_offset, saved_count, session.id)
+        
         # Check if terminal was used and close it
         terminal_info = get_terminal_session_info()
         if terminal_info["is_active"]:
@@ -330,7 +912,27 @@ async def process_log_file(log_file_path, status_callback=None):
             close_persistent_terminal(f"Log file processing complete - {error_log_count} logs analyzed")
     
     logger.info(f"Streaming processing complete - {error_log_count} logs analyzed")
-    logger.info("All interactions saved to agent_outputs/")
+    if TEMPLATE_MINING:
+        stats = template_miner.stats()
+        logger.info(f"🧩 Templates: {stats['templates']} mined, {stats['known_normal_templates']} known-normal, "
+                    f"{stats['llm_calls_skipped']} LLM calls skipped")
+    if nifi_timings:
+        mode = "fast path" if NIFI_FAST_PATH else "NiFi sub-agent"
+        logger.info(f"🔗 NiFi correlation ({mode}): {len(nifi_timings)} ERROR logs - avg NiFi step "
+                    f"{sum(t[0] for t in nifi_timings) / len(nifi_timings):.0f} ms, avg total "
+                    f"{sum(t[1] for t in nifi_timings) / len(nifi_timings):.0f} ms per ERROR log")
+    if ANALYSIS_CACHE:
+        stats = analysis_cache.stats()
+        logger.info(f"💾 Analysis cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})")
+    logger.info(f"All interactions saved to {writer.output_dir}/ ({writer.stats['records']} results in "
+                f"{writer.stats['commits']} group commits)")
+
+
+def _commit_checkpoint(log_file_path, byte_offset, entry_count, session_id):
+    try:
+        save_checkpoint(log_file_path, byte_offset, entry_count, session_id)
+    except Exception as e:
+        logger.error(f"Failed to save checkpoint for {log_file_path}: {e}")
 
 
 def create_log_analysis_agent():
@@ -344,7 +946,11 @@ def create_log_analysis_agent():
         
         # Check if NiFi logs exist and Agent 2 can be loaded
         nifi_log_path = "logs/nifi_app/nifi-app.log"
-        if os.path.exists(nifi_log_path):
+        if os.path.exists(nifi_log_path) and NIFI_FAST_PATH:
+            # NiFi lines are searched by the pipeline and inlined into each ERROR prompt - no sub-agent
+            correlation_available = True
+            logger.info("✓ NiFi correlation ENABLED (fast path - NiFi lines inlined, no NiFi sub-agent)")
+        elif os.path.exists(nifi_log_path):
             try:
                 from agent_2 import nifi_agent
                 nifi_agent_tool = AgentTool(agent=nifi_agent, skip_summarization=False)
@@ -363,13 +969,16 @@ def create_log_analysis_agent():
         from agent_3 import remediation_agent
         
         # Choose instruction based on correlation availability
-        instruction = enhanced_instruction if correlation_available else standalone_instruction
+        if correlation_available:
+            instruction = fast_path_instruction if NIFI_FAST_PATH else enhanced_instruction
+        else:
+            instruction = standalone_instruction
         
         # Create agent with appropriate configuration
         agent = LlmAgent(
             name="log_analysis_agent",
             description="Application log analysis agent that identifies anomalies, correlates with NiFi application logs, and has remediation sub-agent for HITL planning",
-            model="gemini-2.5-flash",
+            model=create_model("gemini-2.5-flash"),
             generate_content_config=types.GenerateContentConfig(temperature=0.1),
             instruction=instruction,
             tools=tools_list,  # Empty if no NiFi correlation
@@ -393,10 +1002,17 @@ root_agent = Analyser_agent
 
 
 # Main execution for standalone file processing
-async def main():
-    """Run standalone log file processing"""
+async def main(log_paths=None, follow=False, resume=False, concurrency=None, batch_size=None):
+    """Run standalone log file processing
+    
+    log_paths: files to process (default: every *.log in the logs folder)
+    follow: keep following each file for new entries (files are then processed concurrently)
+    resume: continue each file after its last checkpointed entry
+    concurrency: entries analysed in parallel per file (default: ANALYSIS_CONCURRENCY)
+    batch_size: entries packed into one LLM call (default: ANALYSIS_BATCH_SIZE)
+    """
     log_folder_path = "/Users/shtlpmac071/Documents/Real_logs_a2a_imple/Real_logs_mulit_agent_Implementation/logs"
-    log_files = glob.glob(os.path.join(log_folder_path, "*.log"))
+    log_files = log_paths or glob.glob(os.path.join(log_folder_path, "*.log"))
     
     if not log_files:
         logger.error(f"No .log files found in folder: {log_folder_path}")
@@ -406,9 +1022,20 @@ async def main():
     for log_file in log_files:
         logger.info(f"  - {os.path.basename(log_file)}")
     
+    if follow:
+        # Followed files never reach EOF - run them side by side
+        logger.info("👀 Follow mode: analysing new entries as they are written (Ctrl+C to stop)")
+        await asyncio.gather(*(process_log_file(path, follow=True, resume=resume, concurrency=concurrency,
+                                                batch_size=batch_size) for path in log_files))
+        return
+    
     for i, log_file_path in enumerate(log_files, 1):
         logger.info(f"\nProcessing file {i}/{len(log_files)}: {os.path.basename(log_file_path)}")
-        await process_log_file(log_file_path)
+        try:
+            await process_log_file(log_file_path, resume=resume, concurrency=concurrency, batch_size=batch_size)
+        except Exception:
+            logger.error(f"Failed {os.path.basename(log_file_path)} - continuing with the next file")
+            continue
         logger.info(f"Completed {os.path.basename(log_file_path)}")
     
     logger.info("All log files processed!")
@@ -417,4 +1044,17 @@ async def main():
 if __name__ == "__main__":
     # This allows running the script directly for file processing
     # while also being importable for ADK web interface
-    asyncio.run(main())
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Analyse log files with the multi-agent system")
+    parser.add_argument("log_files", nargs="*", help="Log files to analyse (default: every *.log in the logs folder)")
+    parser.add_argument("--follow", "-f", action="store_true", help="Keep following the files like tail -F")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last checkpointed entry")
+    parser.add_argument("--concurrency", "-j", type=int, default=None,
+                        help="Entries analysed in parallel per file (default: ANALYSIS_CONCURRENCY)")
+    parser.add_argument("--batch-size", "-b", type=int, default=None,
+                        help="Entries packed into one LLM call (default: ANALYSIS_BATCH_SIZE)")
+    args = parser.parse_args()
+    
+    asyncio.run(main(log_paths=args.log_files, follow=args.follow, resume=args.resume, concurrency=args.concurrency,
+                     batch_size=args.batch_size))
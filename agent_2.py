@@ -7,6 +7,7 @@ from google.adk.models import Gemini
 from google.genai import types
 from google.adk.runners import InMemoryRunner
 from tools.log_tool import search_nifi_logs_tool
+from tools.llm_backend import create_model
 from prompts.nifi_agent_prompt import nifi_agent_instruction
 
 # Load environment variables
@@ -45,7 +46,7 @@ def create_nifi_agent():
         nifi_agent = LlmAgent(
             name="nifi_app_log_analyzer",
             description="Simple NiFi log analyzer focused on timestamp correlation",
-            model="gemini-2.5-flash",
+            model=create_model("gemini-2.5-flash"),
             generate_content_config=types.GenerateContentConfig(temperature=0.1),
             instruction=nifi_agent_instruction,
             tools=[
@@ -8,6 +8,7 @@ from google.adk.runners import InMemoryRunner
 from prompts.remediation_agent_prompt import hitl_remediation_instruction, test_mode_instruction
 from tools.remediation_hitl_tool import human_remediation_tool
 from tools.local_command_tools import local_execution_tools
+from tools.llm_backend import create_model
 from google.genai import types
 
 # Load environment variables
@@ -62,7 +63,7 @@ def create_remediation_agent_with_hitl():
         remediation_agent = LlmAgent(
             name="remediation_agent",
             description="Human-interactive remediation specialist with Human in the loop and local command execution",
-            model="gemini-2.5-pro",
+            model=create_model("gemini-2.5-pro"),
             generate_content_config=types.GenerateContentConfig(temperature=0.1),
             instruction=instruction,
             tools=all_tools
@@ -0,0 +1,82 @@
+"""
+Benchmark: end-to-end process_log_file throughput vs analysis concurrency
+
+The multi-agent call is replaced by a simulated round trip (uniform latency,
+default 2-10 s scaled down by --time-scale) so the numbers measure the
+pipeline itself: session pool, reorder buffer, in-order saves and checkpoints.
+Template mining and the analysis cache are disabled so every entry "calls" the LLM.
+
+Usage:
+    python benchmarks/bench_concurrency.py --entries 200 --levels 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent_1  # noqa: E402
+
+
+def make_log(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(f"2025-10-09 23:{i // 60 % 60:02d}:{i % 60:02d},{i % 1000:03d} ERROR [worker-{i}] "
+                    f"o.a.n.Foo request {i} failed\n")
+
+
+def simulated_agent(min_latency, max_latency):
+    async def run_agent_on_entry(session, prompt, log_index, log_entry, status_callback=None):
+        latency = random.uniform(min_latency, max_latency)
+        await asyncio.sleep(latency)
+        output = '```json\n{"classification": "ANOMALY", "severity": "LOW"}\n```'
+        return output, [], {"total_responses": 1, "processing_time_ms": round(latency * 1000, 2)}
+    return run_agent_on_entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--min-latency", type=float, default=2.0, help="simulated LLM round trip (s)")
+    parser.add_argument("--max-latency", type=float, default=10.0)
+    parser.add_argument("--time-scale", type=float, default=0.01, help="multiply latencies to keep runs short")
+    args = parser.parse_args()
+
+    random.seed(42)
+    agent_1.run_agent_on_entry = simulated_agent(args.min_latency * args.time_scale, args.max_latency * args.time_scale)
+    agent_1.TEMPLATE_MINING = False
+    agent_1.ANALYSIS_CACHE = False
+
+    mean_latency = (args.min_latency + args.max_latency) / 2
+    print(f"{args.entries} entries, simulated round trip {args.min_latency}-{args.max_latency} s "
+          f"(time scale {args.time_scale})")
+    print(f"{'concurrency':>11} {'wall (s)':>10} {'entries/s':>10} {'entries/s @ real latency':>25} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        log_path = os.path.join(workdir, "bench.log")
+        make_log(log_path, args.entries)
+
+        baseline = None
+        for level in args.levels:
+            t0 = time.perf_counter()
+            asyncio.run(agent_1.process_log_file(log_path, concurrency=level))
+            wall = time.perf_counter() - t0
+            rate = args.entries / wall
+            baseline = baseline or rate
+            real_rate = rate * args.time_scale  # what the same run would do at unscaled latency
+            print(f"{level:>11} {wall:>10.2f} {rate:>10.1f} {real_rate:>25.3f} {rate / baseline:>7.1f}x")
+
+    print(f"(ideal at concurrency N: N / {mean_latency:.0f} s = N x {1 / mean_latency:.3f} entries/s)")
+
+
+if __name__ == "__main__":
+    main()
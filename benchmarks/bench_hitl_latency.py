@@ -0,0 +1,113 @@
+"""
+Benchmark: approval-to-execution latency of the HITL approval tool
+
+Runs --requests concurrent human_remediation_approval_tool calls (the way Agent 3
+waits for a human), approves each one after a random think time through
+update_approval_status (what POST /approve does) and measures the time from the
+approval to the tool returning - the dead time before remediation resumes.
+
+Reports p50 / p99 / max of that latency, plus how many times the approval store was
+read while the requests were waiting.
+
+Usage:
+    python benchmarks/bench_hitl_latency.py --requests 200
+    STATE_BACKEND=sqlite python benchmarks/bench_hitl_latency.py   # decisions via the shared store
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "max": samples[-1],
+    }
+
+
+async def run(requests, max_think, remote):
+    from tools import remediation_hitl_tool as hitl
+    from tools.state_store import get_state_store
+
+    store = get_state_store()
+    pending_requests = store.items  # The approver's own lookups are not counted
+    reads = {"count": 0}
+    for name in ("get", "items"):
+        original = getattr(store, name)
+
+        def counted(*args, _original=original, **kwargs):
+            reads["count"] += 1
+            return _original(*args, **kwargs)
+
+        setattr(store, name, counted)
+
+    approved_at = {}
+    latencies = []
+
+    async def request(number):
+        plan = f"Plan {number}: restart the failing processor"
+        result = await hitl.human_remediation_approval_tool(plan)
+        latencies.append((time.perf_counter() - approved_at[plan]) * 1000)
+        assert result == "APPROVED", result
+
+    async def approve(number):
+        plan = f"Plan {number}: restart the failing processor"
+        await asyncio.sleep(random.uniform(0, max_think))
+        while True:
+            pending = {request_id: item for request_id, item in pending_requests(hitl.APPROVALS).items()
+                       if item["plan"] == plan}
+            if pending:
+                break
+            await asyncio.sleep(0.01)
+        request_id = next(iter(pending))
+        approved_at[plan] = time.perf_counter()
+        if remote:
+            # As if POST /approve had reached another server worker: only the shared store changes
+            await store.aupdate(hitl.APPROVALS, request_id, {"status": "approved"}, expect={"status": "pending"})
+        else:
+            await hitl.update_approval_status(request_id, "approved")
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(request(n) for n in range(requests)), *(approve(n) for n in range(requests)))
+    return _percentiles(latencies), reads["count"], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-think", type=float, default=3.0, help="approvals arrive within this many seconds")
+    parser.add_argument("--remote", action="store_true",
+                        help="approve by changing the shared store only (needs STATE_BACKEND=sqlite)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    os.environ.setdefault("STATE_DB", os.path.join(tempfile.mkdtemp(prefix="bench_hitl_"), "state.db"))
+    from loguru import logger
+    logger.remove()
+
+    latency, reads, elapsed = asyncio.run(run(args.requests, args.max_think, args.remote))
+    print(f"{args.requests} approval requests, approved within {args.max_think:.0f}s, "
+          f"STATE_BACKEND={os.getenv('STATE_BACKEND', 'memory')}{' (remote approvals)' if args.remote else ''}")
+    print(f"approval → tool returns: p50 {latency['p50']:.1f} ms, p99 {latency['p99']:.1f} ms, "
+          f"max {latency['max']:.1f} ms")
+    print(f"approval store reads while waiting: {reads} ({elapsed:.1f}s run)")
+
+
+if __name__ == "__main__":
+    main()
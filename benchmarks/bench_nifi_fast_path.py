@@ -0,0 +1,134 @@
+"""
+Benchmark: per-ERROR-entry latency with the NiFi sub-agent vs the NiFi fast path (NIFI_FAST_PATH)
+
+Runs process_log_file over ERROR entries against a synthetic NiFi log, once per mode, each
+in a fresh process. The real ADK agents, AgentTool and NiFi search run; only the model is
+scripted (LLM_BACKEND=replay with a scripted answer): every model call sleeps for a
+simulated round trip, calls the tool it is expected to call, then answers NORMAL.
+
+- sub-agent: analyser → nifi_agent_tool → NiFi agent → search tool → NiFi agent → analyser (4 model calls)
+- fast path: NiFi search in-process → analyser (1 model call)
+
+Usage:
+    python benchmarks/bench_nifi_fast_path.py --entries 20 --nifi-lines 500000
+    python benchmarks/bench_nifi_fast_path.py --min-latency 0.8 --max-latency 3 --time-scale 1
+"""
+
+import argparse
+import glob
+import os
+import random
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_logs import generate_app_log, generate_nifi_log  # noqa: E402
+
+
+def _run_mode(workdir, app_log, fast_path, min_latency, max_latency):
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_ROOT))
+    os.environ.update(LLM_BACKEND="replay", NIFI_FAST_PATH=str(fast_path), TEMPLATE_MINING="False",
+                      ANALYSIS_CACHE="False", RATE_LIMITING="False")
+
+    import asyncio
+    import re
+
+    from google.adk.models import LlmResponse
+    from google.genai import types
+
+    import tools.llm_backend as llm_backend
+
+    calls = {"count": 0}
+    rng = random.Random(42)
+
+    async def scripted(self, llm_request, stream=False):
+        calls["count"] += 1
+        await asyncio.sleep(rng.uniform(min_latency, max_latency))
+        tools = getattr(llm_request, "tools_dict", {}) or {}
+        last = llm_request.contents[-1] if llm_request.contents else None
+        text = "".join(p.text or "" for p in (last.parts or []) if p.text) if last else ""
+        answered = last is not None and any(p.function_response for p in last.parts or [])
+        if not answered and "nifi_agent_tool" in tools:
+            call = types.FunctionCall(name="nifi_agent_tool", args={"request": text[:500]})
+        elif not answered and "search_nifi_logs_by_timestamp" in tools:
+            match = re.search(r"\d{2}:\d{2}:\d{2}", text)
+            call = types.FunctionCall(name="search_nifi_logs_by_timestamp",
+                                      args={"timestamp": match.group(0) if match else "00:00:00"})
+        else:
+            call = None
+        part = types.Part(function_call=call) if call else types.Part(
+            text='```json\n{"classification": "NORMAL", "severity": "LOW", "nifi_correlation": "scripted"}\n```')
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+    llm_backend.ReplayLlm.generate_content_async = scripted
+
+    import agent_1
+    from tools.result_writer import read_results
+
+    asyncio.run(agent_1.process_log_file(app_log))
+
+    totals = []
+    for record in read_results("agent_outputs"):
+        trace = record["execution_trace"]
+        lookup = (trace.get("nifi_lookup") or {}).get("lookup_ms", 0)
+        totals.append(trace["processing_time_ms"] + lookup)
+    return {"entries": len(totals), "model_calls": calls["count"], "totals_ms": totals}
+
+
+def _in_child(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20, help="ERROR entries to analyse")
+    parser.add_argument("--nifi-lines", type=int, default=200_000)
+    parser.add_argument("--min-latency", type=float, default=0.8, help="simulated model round trip (s)")
+    parser.add_argument("--max-latency", type=float, default=3.0)
+    parser.add_argument("--time-scale", type=float, default=0.1, help="multiply latencies to keep runs short")
+    parser.add_argument("--workdir", default="bench_data")
+    args = parser.parse_args()
+
+    nifi_dir = os.path.join(os.path.abspath(args.workdir), "fast_path", "logs", "nifi_app")
+    workdir = os.path.dirname(os.path.dirname(nifi_dir))
+    os.makedirs(nifi_dir, exist_ok=True)
+    nifi_log = os.path.join(nifi_dir, "nifi-app.log")
+    if not os.path.exists(nifi_log) or sum(1 for _ in open(nifi_log)) < args.nifi_lines:
+        print(f"Generating NiFi log: {args.nifi_lines:,} lines → {nifi_log}")
+        generate_nifi_log(nifi_log, args.nifi_lines)
+    app_log = os.path.join(workdir, "errors.log")
+    generate_app_log(app_log, args.entries, error_ratio=1.0, trace_depth=5, step_ms=2000)
+
+    min_latency, max_latency = args.min_latency * args.time_scale, args.max_latency * args.time_scale
+    print(f"{args.entries} ERROR entries, simulated model round trip {args.min_latency}-{args.max_latency} s "
+          f"(time scale {args.time_scale})\n")
+    print(f"{'mode':<12} {'model calls/entry':>18} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    results = {}
+    for fast_path in (False, True):
+        for stale in glob.glob(os.path.join(workdir, "agent_outputs", "*.jsonl")):
+            os.remove(stale)
+        result = _in_child(_run_mode, workdir, app_log, fast_path, min_latency, max_latency)
+        totals = sorted(result["totals_ms"])
+        mode = "fast path" if fast_path else "sub-agent"
+        results[mode] = statistics.mean(totals)
+        print(f"{mode:<12} {result['model_calls'] / max(1, result['entries']):>18.1f} "
+              f"{statistics.mean(totals):>10.0f} {statistics.median(totals):>10.0f} "
+              f"{totals[min(len(totals) - 1, int(len(totals) * 0.95))]:>10.0f}")
+
+    saved = results["sub-agent"] - results["fast path"]
+    print(f"\nSaved per ERROR entry: {saved:.0f} ms ({saved / results['sub-agent']:.0%}) at time scale "
+          f"{args.time_scale} - about {saved / args.time_scale / 1000:.1f} s at real model latency")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: NiFi window lookup - linear scan vs mmap binary search vs sidecar index
+
+Generates synthetic time-ordered nifi-app logs and times a ±2s window lookup with
+the original per-line strptime scan, the index-free mmap binary search and the
+sidecar time index.
+
+Usage:
+    python benchmarks/bench_nifi_search.py --lines 1000000 10000000 50000000
+    python benchmarks/bench_nifi_search.py --lines 1000000 --lookups 50 --linear-max-lines 10000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_logs import BASE_TIME, generate_nifi_log  # noqa: E402
+from tools.nifi_log_index import INDEX_SUFFIX, NifiTimeIndex, mmap_search  # noqa: E402
+from tools.timestamp_parser import parse_timestamp_ms  # noqa: E402
+
+
+def linear_scan(path, start_dt, end_dt):
+    """The original search_nifi_logs_by_timestamp loop: strptime on every line"""
+    matching = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    log_dt = datetime.strptime(line[:23], "%Y-%m-%d %H:%M:%S,%f")
+                    if start_dt <= log_dt <= end_dt:
+                        matching.append(line.strip())
+                except (ValueError, IndexError):
+                    continue
+    return matching
+
+
+def _to_ms(dt):
+    return parse_timestamp_ms(dt.strftime("%Y-%m-%d %H:%M:%S,000").encode())
+
+
+def _timed(fn, windows):
+    samples = []
+    for start_dt, end_dt in windows:
+        t0 = time.perf_counter()
+        fn(start_dt, end_dt)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def run(lines, lookups, linear_max_lines, workdir):
+    path = os.path.join(workdir, f"nifi-app-{lines}.log")
+    if not os.path.exists(path):
+        print(f"Generating {lines:,} lines → {path}")
+        generate_nifi_log(path, lines)
+    last_line_time = BASE_TIME + timedelta(milliseconds=7 * lines)
+
+    rng = random.Random(7)
+    span = int((last_line_time - BASE_TIME).total_seconds())
+    windows = []
+    for _ in range(lookups):
+        target = BASE_TIME + timedelta(seconds=rng.randint(2, max(span - 1, 2)))
+        windows.append((target - timedelta(seconds=2), target + timedelta(seconds=1)))
+
+    results = {"lines": lines, "size_mb": round(os.path.getsize(path) / 1e6, 1)}
+
+    results["mmap"] = _timed(lambda s, e: mmap_search(path, _to_ms(s), _to_ms(e)), windows)
+
+    if os.path.exists(path + INDEX_SUFFIX):
+        os.remove(path + INDEX_SUFFIX)
+    index = NifiTimeIndex(path)
+    t0 = time.perf_counter()
+    index.refresh()
+    results["index_build_s"] = round(time.perf_counter() - t0, 2)
+    results["index"] = _timed(lambda s, e: index.search(_to_ms(s), _to_ms(e)), windows)
+
+    if lines <= linear_max_lines:
+        # The linear scan is O(n) per lookup - a few samples are enough
+        results["linear"] = _timed(lambda s, e: linear_scan(path, s, e), windows[:3])
+        results["mmap_speedup"] = round(results["linear"]["mean_ms"] / results["mmap"]["mean_ms"], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--linear-max-lines", type=int, default=50_000_000,
+                        help="Skip the linear scan above this size")
+    parser.add_argument("--workdir", default="bench_data")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    for lines in args.lines:
+        result = run(lines, args.lookups, args.linear_max_lines, args.workdir)
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
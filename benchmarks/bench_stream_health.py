@@ -0,0 +1,154 @@
+"""
+Benchmark: /health latency while /stream/analyze-file is running
+
+Starts the API server (main.py under uvicorn) in a child process with a scripted model
+(LLM_BACKEND=replay: every model call sleeps for a simulated round trip, then answers
+NORMAL), opens a stream over a synthetic log and polls /health while it runs. The
+stream is read by a deliberately slow client, so the pipeline is held back by
+backpressure for most of the run.
+
+Reports /health p50 / p99 / max with no stream (idle) and with the stream running, plus
+how many entries the stream got through - with a slow client that is bounded by what
+the client reads, not by how fast the file can be read.
+
+Usage:
+    python benchmarks/bench_stream_health.py --entries 2000 --duration 10
+    python benchmarks/bench_stream_health.py --client-delay 0 --latency 0.05
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import requests
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_logs import generate_app_log  # noqa: E402
+
+
+def _serve(workdir, port, latency):
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_ROOT))
+    os.environ.update(LLM_BACKEND="replay", TEMPLATE_MINING="False", ANALYSIS_CACHE="False",
+                      RATE_LIMITING="False", NIFI_FAST_PATH="True")
+
+    import asyncio
+
+    import uvicorn
+    from google.adk.models import LlmResponse
+    from google.genai import types
+
+    import tools.llm_backend as llm_backend
+
+    async def scripted(self, llm_request, stream=False):
+        await asyncio.sleep(latency)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(
+            text='```json\n{"classification": "NORMAL", "severity": "LOW"}\n```')]))
+
+    llm_backend.ReplayLlm.generate_content_async = scripted
+
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "max": samples[-1],
+        "n": len(samples)
+    }
+
+
+def _poll_health(base_url, duration, interval):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    with requests.Session() as http:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            http.get(f"{base_url}/health", timeout=30).raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(interval)
+    return _percentiles(latencies)
+
+
+def _read_stream(base_url, log_path, client_delay, stop, seen):
+    with requests.post(f"{base_url}/stream/analyze-file", json={"file_path": log_path}, stream=True,
+                       timeout=60) as response:
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            event = json.loads(line[len(b"data: "):])
+            seen["events"] += 1
+            if event.get("status") == "processing":
+                seen["entries"] = event["log_number"]
+            elif event.get("status") == "stream_started":
+                seen["stream_id"] = event["stream_id"]
+            if stop.is_set():
+                break
+            time.sleep(client_delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=10, help="seconds of /health polling per phase")
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated model round trip (s)")
+    parser.add_argument("--client-delay", type=float, default=0.02, help="slow client: pause per event (s)")
+    parser.add_argument("--interval", type=float, default=0.01, help="pause between /health requests (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workdir", default="bench_data")
+    args = parser.parse_args()
+
+    workdir = os.path.join(os.path.abspath(args.workdir), "stream_health")
+    os.makedirs(workdir, exist_ok=True)
+    log_path = os.path.join(workdir, "app.log")
+    generate_app_log(log_path, args.entries, error_ratio=0.1, trace_depth=5)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = get_context("spawn").Process(target=_serve, args=(workdir, args.port, args.latency), daemon=True)
+    server.start()
+    try:
+        for _ in range(600):
+            try:
+                requests.get(f"{base_url}/health", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+        idle = _poll_health(base_url, args.duration, args.interval)
+
+        stop, seen = threading.Event(), {"events": 0, "entries": 0, "stream_id": None}
+        reader = threading.Thread(target=_read_stream, args=(base_url, log_path, args.client_delay, stop, seen),
+                                  daemon=True)
+        reader.start()
+        streaming = _poll_health(base_url, args.duration, args.interval)
+        stop.set()
+        if seen["stream_id"]:
+            requests.post(f"{base_url}/stop-stream/{seen['stream_id']}", timeout=10)
+        reader.join(30)
+    finally:
+        server.terminate()
+        server.join()
+
+    print(f"{'/health':<16} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, result in (("idle", idle), ("stream running", streaming)):
+        print(f"{name:<16} {result['n']:>9} {result['p50']:>8.2f} {result['p99']:>8.2f} {result['max']:>8.2f}")
+    print(f"\nStream: {seen['entries']} of {args.entries} entries analysed, {seen['events']} events read "
+          f"by a client pausing {args.client_delay * 1000:.0f} ms per event")
+
+
+if __name__ == "__main__":
+    main()
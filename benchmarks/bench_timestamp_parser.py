@@ -0,0 +1,86 @@
+"""
+Micro-benchmark: fixed-width timestamp parsing vs strptime / regex
+
+Compares the per-line parsers previously used by agent_1 (regex match) and
+tools/log_tool.py (strptime of line[:23]) with tools/timestamp_parser in
+per-line and bulk (array('q')) mode.
+
+Usage:
+    python benchmarks/bench_timestamp_parser.py --lines 1000000
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.timestamp_parser import NO_TIMESTAMP, parse_buffer, parse_timestamp_ms  # noqa: E402
+
+_EPOCH = datetime(1970, 1, 1)
+_REGEX = re.compile(r'^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}[,\.]\d{3}')
+
+
+def make_lines(count, continuation_every=10):
+    current = datetime(2025, 10, 9, 23, 59, 0)
+    lines = []
+    for i in range(count):
+        if i % continuation_every == 0:
+            lines.append("\tat org.apache.nifi.controller.StandardProcessorNode.run(StandardProcessorNode.java:1234)")
+            continue
+        current += timedelta(milliseconds=37)
+        lines.append(f"{current:%Y-%m-%d %H:%M:%S},{current.microsecond // 1000:03d} INFO [main] o.a.n.Foo message {i}")
+    return lines
+
+
+def strptime_ms(line):
+    try:
+        dt = datetime.strptime(line[:23], "%Y-%m-%d %H:%M:%S,%f")
+    except ValueError:
+        return None
+    return (dt - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _bench(name, fn, repeat=3):
+    best = min(_once(fn) for _ in range(repeat))
+    print(f"{name:<32} {best * 1000:10.1f} ms")
+    return best
+
+
+def _once(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    byte_lines = [line.encode() for line in lines]
+    buffer = b"\n".join(byte_lines) + b"\n"
+
+    # Correctness: the fast parser must agree with strptime on every line
+    expected = [strptime_ms(line) for line in lines]
+    assert [parse_timestamp_ms(line) for line in byte_lines] == expected
+    assert [None if ts == NO_TIMESTAMP else ts for ts in parse_buffer(buffer)] == expected
+
+    print(f"{args.lines:,} lines (10% continuation lines)")
+    baseline = _bench("strptime(line[:23])", lambda: [strptime_ms(line) for line in lines])
+    _bench("regex match (shape only)", lambda: [_REGEX.match(line) for line in lines])
+    per_line_str = _bench("parse_timestamp_ms(str)", lambda: [parse_timestamp_ms(line) for line in lines])
+    per_line = _bench("parse_timestamp_ms(bytes)", lambda: [parse_timestamp_ms(line) for line in byte_lines])
+    bulk = _bench("parse_buffer -> array('q')", lambda: parse_buffer(buffer))
+
+    print(f"\nspeedup vs strptime: str {baseline / per_line_str:.1f}x, "
+          f"bytes {baseline / per_line:.1f}x, bulk {baseline / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmark suite: ingestion, NiFi search and result persistence, with JSON baselines
+
+Benchmarks (each runs in a fresh process so peak RSS is per benchmark):
+- ingest:      agent_1.stream_logs_by_timestamp over a synthetic app log (entries/s, MB/s, peak RSS)
+- nifi_search: tools.log_tool.search_nifi_logs_by_timestamp per-lookup latency as the NiFi log grows
+               (cold = first lookup, before the sidecar index exists; warm = with the index)
+- persist:     result store appends the way process_log_file saves results (writes/s)
+
+Usage:
+    python benchmarks/suite.py run --size small --name my-branch
+    python benchmarks/suite.py run --entries 500000 --error-ratio 0.2 --trace-depth 60 --nifi-lines 1000000 5000000
+    python benchmarks/suite.py compare benchmarks/baselines/main.json benchmarks/baselines/my-branch.json
+    python benchmarks/suite.py compare OLD.json NEW.json --threshold 0.15   # exit code 1 on regression
+
+Generated data goes to --workdir (bench_data/, git-ignored); baselines to benchmarks/baselines/.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+# Add parent directory to path to import from the main project
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_logs import generate_app_log, generate_nifi_log  # noqa: E402
+from tools.nifi_log_index import INDEX_SUFFIX  # noqa: E402
+
+SIZES = {
+    "small": {"entries": 20_000, "nifi_lines": [100_000, 300_000], "writes": 500},
+    "medium": {"entries": 200_000, "nifi_lines": [1_000_000, 3_000_000], "writes": 2_000},
+    "large": {"entries": 1_000_000, "nifi_lines": [1_000_000, 10_000_000, 30_000_000], "writes": 5_000},
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _latency_stats(samples_ms):
+    samples = sorted(samples_ms)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+# ----------------------------------------------------------------------
+# Benchmarks (executed in child processes)
+# ----------------------------------------------------------------------
+
+def _bench_ingest(workdir, log_path):
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(workdir)
+    import agent_1
+
+    rss_before = _peak_rss_mb()
+    t0 = time.perf_counter()
+    entries = sum(1 for _ in agent_1.stream_logs_by_timestamp(log_path))
+    elapsed = time.perf_counter() - t0
+    peak = _peak_rss_mb()
+    return {
+        "entries": entries,
+        "seconds": round(elapsed, 3),
+        "entries_per_s": round(entries / elapsed, 1),
+        "mb_per_s": round(os.path.getsize(log_path) / elapsed / 1e6, 2),
+        "peak_rss_mb": round(peak, 1),
+        "rss_growth_mb": round(peak - rss_before, 1),
+    }
+
+
+def _bench_nifi_search(workdir, lookups, first_dt, last_dt, seed=7):
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(workdir)
+    from tools.log_tool import search_nifi_logs_by_timestamp
+    from tools.nifi_log_index import get_time_index
+    from tools.nifi_log_set import active_log_file
+
+    rng = random.Random(seed)
+    first, last = datetime.fromisoformat(first_dt), datetime.fromisoformat(last_dt)
+    span = max(3, int((last - first).total_seconds()))
+    targets = [(first + timedelta(seconds=rng.randint(2, span - 1))).strftime("%Y-%m-%d %H:%M:%S")
+               for _ in range(lookups)]
+
+    t0 = time.perf_counter()
+    search_nifi_logs_by_timestamp(targets[0])
+    cold_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    get_time_index(active_log_file())  # Waits for / finishes the background build
+    index_build_s = time.perf_counter() - t0
+
+    samples = []
+    for target in targets:
+        t0 = time.perf_counter()
+        search_nifi_logs_by_timestamp(target)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return dict(_latency_stats(samples), cold_ms=round(cold_ms, 3), index_build_s=round(index_build_s, 3))
+
+
+def _bench_persist(workdir, writes, log_entry):
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(workdir)
+    import agent_1
+
+    output_dir = os.path.join(workdir, "persist_outputs")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    agent_output = "```json\n" + json.dumps({"classification": "ANOMALY", "severity": "HIGH",
+                                             "likely_cause": "x" * 400}, indent=2) + "\n```"
+    metadata = {"total_responses": 2, "processing_time_ms": 1234.5, "sub_agent_triggered": True,
+                "all_responses": [agent_output, "Remediation plan ..." * 20]}
+    writer = agent_1.result_writer(output_dir)
+    t0 = time.perf_counter()
+    for i in range(1, writes + 1):
+        writer.submit(agent_1.build_interaction_record(i, log_entry, "prompt " * 200, agent_output, session_id="bench",
+                                                       tool_calls=[{"tool_name": "nifi_agent_tool"}],
+                                                       execution_metadata=metadata))
+    writer.flush()
+    elapsed = time.perf_counter() - t0
+    return {"writes": writes, "seconds": round(elapsed, 3), "writes_per_s": round(writes / elapsed, 1),
+            "commits": writer.stats["commits"]}
+
+
+def _in_child(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+# ----------------------------------------------------------------------
+# run / compare
+# ----------------------------------------------------------------------
+
+def _metric(value, better, unit):
+    return {"value": value, "better": better, "unit": unit}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    preset = SIZES[args.size]
+    entries = args.entries or preset["entries"]
+    nifi_lines = args.nifi_lines or preset["nifi_lines"]
+    writes = args.writes or preset["writes"]
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+
+    params = {"entries": entries, "error_ratio": args.error_ratio, "trace_depth": args.trace_depth,
+              "nifi_lines": nifi_lines, "lookups": args.lookups, "writes": writes}
+    metrics, details = {}, {}
+
+    # --- ingest ---
+    app_log = os.path.join(workdir, f"app-{entries}-{args.error_ratio}-{args.trace_depth}.log")
+    if not os.path.exists(app_log):
+        print(f"Generating app log: {entries:,} entries → {app_log}")
+        generate_app_log(app_log, entries, error_ratio=args.error_ratio, trace_depth=args.trace_depth)
+    ingest = _in_child(_bench_ingest, workdir, app_log)
+    details["ingest"] = ingest
+    metrics["ingest.entries_per_s"] = _metric(ingest["entries_per_s"], "higher", "entries/s")
+    metrics["ingest.mb_per_s"] = _metric(ingest["mb_per_s"], "higher", "MB/s")
+    metrics["ingest.peak_rss_mb"] = _metric(ingest["peak_rss_mb"], "lower", "MB")
+    print(f"ingest        {ingest}")
+
+    # --- NiFi search, per file size ---
+    details["nifi_search"] = {}
+    for lines in nifi_lines:
+        size_dir = os.path.join(workdir, f"nifi-{lines}")
+        nifi_dir = os.path.join(size_dir, "logs", "nifi_app")
+        nifi_log = os.path.join(nifi_dir, "nifi-app.log")
+        os.makedirs(nifi_dir, exist_ok=True)
+        if not os.path.exists(nifi_log):
+            print(f"Generating NiFi log: {lines:,} lines → {nifi_log}")
+            first, last = generate_nifi_log(nifi_log, lines)
+            with open(os.path.join(size_dir, "range.json"), "w") as f:
+                json.dump([first.isoformat(), last.isoformat()], f)
+        for stale in [*Path(nifi_dir).glob(".*"), *Path(nifi_dir).glob(f"*{INDEX_SUFFIX}")]:
+            stale.unlink()  # Sidecar index / range cache - each run measures a cold start
+        with open(os.path.join(size_dir, "range.json")) as f:
+            first_dt, last_dt = json.load(f)
+
+        result = _in_child(_bench_nifi_search, size_dir, args.lookups, first_dt, last_dt)
+        result["size_mb"] = round(os.path.getsize(nifi_log) / 1e6, 1)
+        details["nifi_search"][str(lines)] = result
+        metrics[f"nifi_search.{lines}.p50_ms"] = _metric(result["p50_ms"], "lower", "ms")
+        metrics[f"nifi_search.{lines}.p95_ms"] = _metric(result["p95_ms"], "lower", "ms")
+        metrics[f"nifi_search.{lines}.cold_ms"] = _metric(result["cold_ms"], "lower", "ms")
+        print(f"nifi_search   {lines:>11,} lines {result}")
+
+    # --- persistence ---
+    with open(app_log) as f:
+        sample_entry = "".join(f.readline() for _ in range(3))
+    persist = _in_child(_bench_persist, workdir, writes, sample_entry)
+    details["persist"] = persist
+    metrics["persist.writes_per_s"] = _metric(persist["writes_per_s"], "higher", "writes/s")
+    print(f"persist       {persist}")
+
+    baseline = {
+        "name": args.name,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "metrics": metrics,
+        "details": details,
+    }
+    out = Path(args.output) if args.output else BASELINE_DIR / f"{args.name}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(baseline, indent=2) + "\n")
+    print(f"\nBaseline written to {out}")
+
+
+def compare(args):
+    old = json.loads(Path(args.baseline).read_text())
+    new = json.loads(Path(args.candidate).read_text())
+    if old.get("params") != new.get("params"):
+        print(f"⚠ Parameters differ:\n  baseline:  {old.get('params')}\n  candidate: {new.get('params')}\n")
+
+    regressions = []
+    print(f"{'metric':<34} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name, base in old["metrics"].items():
+        cand = new["metrics"].get(name)
+        if cand is None or not base["value"]:
+            print(f"{name:<34} {base['value']:>12} {'-':>12} {'n/a':>9}")
+            continue
+        change = (cand["value"] - base["value"]) / base["value"]
+        worse = -change if base["better"] == "higher" else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  ✗ REGRESSION"
+            regressions.append(name)
+        elif worse < -args.threshold:
+            flag = "  ✓ improved"
+        print(f"{name:<34} {base['value']:>12} {cand['value']:>12} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the suite and write a JSON baseline")
+    run_parser.add_argument("--name", default="baseline", help="Baseline name (benchmarks/baselines/NAME.json)")
+    run_parser.add_argument("--output", help="Write the baseline here instead")
+    run_parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    run_parser.add_argument("--entries", type=int, help="App log entries (overrides --size)")
+    run_parser.add_argument("--nifi-lines", type=int, nargs="+", help="NiFi log sizes in lines (overrides --size)")
+    run_parser.add_argument("--writes", type=int, help="results saved (overrides --size)")
+    run_parser.add_argument("--error-ratio", type=float, default=0.05)
+    run_parser.add_argument("--trace-depth", type=int, default=20, help="Stack frames per ERROR entry")
+    run_parser.add_argument("--lookups", type=int, default=50)
+    run_parser.add_argument("--workdir", default="bench_data")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser("compare", help="Compare two baselines and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Synthetic log generators for the benchmark suite
+
+- Application logs: the format agent_1 reads (timestamp line + optional Java stack trace)
+- NiFi logs: time-ordered nifi-app.log lines with occasional stack traces
+
+Size, ERROR ratio and stack-trace depth are configurable; output is deterministic per seed.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+BASE_TIME = datetime(2025, 10, 9, 16, 0, 0)
+
+_APP_MESSAGES = [
+    "Request {n} completed in {ms} ms",
+    "Cache refresh finished: {n} keys in {ms} ms",
+    "User session {n} authenticated",
+    "Scheduled job {n} started",
+]
+_APP_ERRORS = [
+    "Failed to connect to database at 10.0.{a}.{b}:5432 after {n} retries",
+    "Timeout while calling payment service (request {n}, {ms} ms)",
+    "NullPointerException while processing order {n}",
+]
+_NIFI_MESSAGES = [
+    "o.a.n.c.StandardProcessorNode Processor {n} scheduled",
+    "o.a.n.c.r.StandardProcessSession Committed session for {n} flowfiles",
+    "o.a.n.c.s.StandardProcessScheduler Started Processor[id={n}]",
+]
+_NIFI_ERRORS = [
+    "o.a.n.p.s.PutSQL PutSQL[id={n}] Failed to update database due to java.sql.SQLException",
+    "o.a.n.c.t.ContinuallyRunProcessorTask Processing halted: yielding for 1 sec",
+]
+
+
+def _stack_trace(rng, depth):
+    lines = ["java.io.IOException: Connection refused"]
+    lines += [f"\tat org.apache.nifi.processor.Step{rng.randint(0, 999)}.run(Step.java:{rng.randint(1, 500)})"
+              for _ in range(depth)]
+    if depth:
+        lines.append("Caused by: java.net.ConnectException: Connection refused (Connection refused)")
+        lines += [f"\tat java.net.PlainSocketImpl.socketConnect{i}(Native Method)" for i in range(max(1, depth // 4))]
+    return lines
+
+
+def _timestamp(dt):
+    return f"{dt:%Y-%m-%d %H:%M:%S},{dt.microsecond // 1000:03d}"
+
+
+def generate_app_log(path, entries, error_ratio=0.05, trace_depth=20, step_ms=50, seed=42):
+    """Write an application log with `entries` entries; returns (first, last) entry time"""
+    rng = random.Random(seed)
+    current = BASE_TIME
+    with open(path, "w", buffering=1 << 20) as f:
+        for i in range(entries):
+            current += timedelta(milliseconds=rng.randint(1, step_ms * 2))
+            values = {"n": i, "ms": rng.randint(1, 5000), "a": rng.randint(0, 255), "b": rng.randint(0, 255)}
+            if rng.random() < error_ratio:
+                f.write(f"{_timestamp(current)} ERROR [http-nio-8080-exec-{i % 20}] "
+                        f"{rng.choice(_APP_ERRORS).format(**values)}\n")
+                if trace_depth:
+                    f.write("\n".join(_stack_trace(rng, trace_depth)) + "\n")
+            else:
+                level = "WARN" if rng.random() < 0.05 else "INFO"
+                f.write(f"{_timestamp(current)} {level} [main] {rng.choice(_APP_MESSAGES).format(**values)}\n")
+    return BASE_TIME, current
+
+
+def generate_nifi_log(path, lines, error_ratio=0.002, trace_depth=2, step_ms=7, seed=42):
+    """Write a time-ordered nifi-app.log with `lines` log lines; returns (first, last) line time"""
+    rng = random.Random(seed)
+    current = BASE_TIME
+    second_key, prefix = None, ""
+    with open(path, "w", buffering=1 << 20) as f:
+        for i in range(lines):
+            current += timedelta(milliseconds=rng.randint(0, step_ms * 2))
+            key = current.replace(microsecond=0)
+            if key != second_key:
+                second_key, prefix = key, key.strftime("%Y-%m-%d %H:%M:%S")
+            error = rng.random() < error_ratio
+            template = rng.choice(_NIFI_ERRORS if error else _NIFI_MESSAGES)
+            f.write(f"{prefix},{current.microsecond // 1000:03d} {'ERROR' if error else 'INFO'} "
+                    f"[Timer-Driven Process Thread-{i % 10}] {template.format(n=i % 97)}\n")
+            if error and trace_depth:
+                f.write("\n".join(_stack_trace(rng, trace_depth)) + "\n")
+    return BASE_TIME, current
+
+
+__all__ = ['generate_app_log', 'generate_nifi_log', 'BASE_TIME']
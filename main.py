@@ -3,9 +3,12 @@ FastAPI Web Application for Multi-Agent Log Analysis System
 Provides REST API endpoints for the log analysis agents
 """
 import os
+import time
+import asyncio
+import threading
 from datetime import datetime
 from typing import Optional, List
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, HTMLResponse
 from pydantic import BaseModel
@@ -19,12 +22,24 @@ load_dotenv()
 # Server configuration from .env file
 SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")  # Bind to all interfaces
 SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # uvicorn worker processes (more than 1 needs STATE_BACKEND=sqlite)
 # For URLs in responses - use actual server hostname/IP from .env
 PUBLIC_HOST = os.getenv("PUBLIC_HOST", None)  # Will auto-detect if not set in .env
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "16"))  # items waiting between /stream pipeline stages
+STREAM_BUFFER_EVENTS = int(os.getenv("STREAM_BUFFER_EVENTS", "1000"))  # events kept per stream for reconnects
+STREAM_RESUME_TIMEOUT = float(os.getenv("STREAM_RESUME_TIMEOUT", "300"))  # seconds a stream waits for a client
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # analysis jobs running at once (/jobs)
+JOB_ADMISSION = os.getenv("JOB_ADMISSION", "fifo").lower()  # fifo or priority
+STATE_SYNC_INTERVAL = float(os.getenv("STATE_SYNC_INTERVAL", "2"))  # seconds between shared job / stream status updates
+PUSH_PROGRESS_INTERVAL = float(os.getenv("PUSH_PROGRESS_INTERVAL", "1"))  # seconds between job_progress pushes per job
+PUSH_KEEPALIVE = float(os.getenv("PUSH_KEEPALIVE", "25"))  # seconds without events before a WebSocket keep-alive
 
 # Import your agents
 from agent_1 import agent_runner
 from google.genai import types
+from tools.job_scheduler import JobScheduler, QUEUED, RUNNING
+from tools.state_store import get_state_store, worker_id, STATE_BACKEND
+from tools.update_bus import get_update_bus, JOB_PROGRESS
 
 def get_server_url():
     """Get the public server URL for API responses"""
@@ -73,6 +88,13 @@ class LogAnalysisRequest(BaseModel):
 
 class LogFileRequest(BaseModel):
     file_path: str
+    follow: bool = False  # Keep analysing new entries as the file grows (tail -F)
+    resume: bool = False  # Continue after the last checkpointed entry
+    concurrency: Optional[int] = None  # Entries analysed in parallel (default: ANALYSIS_CONCURRENCY)
+    batch_size: Optional[int] = None  # Entries per LLM call (default: ANALYSIS_BATCH_SIZE)
+    
+class JobRequest(LogFileRequest):
+    priority: int = 0  # Higher runs first when JOB_ADMISSION=priority
     
 class LogAnalysisResponse(BaseModel):
     status: str
@@ -95,9 +117,14 @@ class HealthResponse(BaseModel):
     agents: List[str]
     timestamp: str
 
-# Global variables for session management
-active_sessions = {}
-active_streams = {}  # Track active streaming sessions
+# Shared between server workers (tools/state_store.py): stream sessions, stream status, jobs, approvals
+state = get_state_store()
+updates = get_update_bus()  # Push channel for dashboards (/updates, /ws/updates)
+SESSIONS, STREAMS, JOB_FILES = "sessions", "streams", "job_files"  # State store namespaces
+SHARED_TTL = max(30.0, 10 * STATE_SYNC_INTERVAL)  # Entries of a worker that stopped updating them expire
+# Streams running in this process (stream_id → pipeline, event buffer, task) - an SSE
+# connection is served by the worker that runs the stream
+active_streams = {}
 
 # API Endpoints
 
@@ -117,6 +144,13 @@ async def root():
             "file_analysis": f"{server_url}/analyze/file",
             "stop_stream": f"{server_url}/stop-stream/{{stream_id}}",
             "active_streams": f"{server_url}/active-streams",
+            "cache_stats": f"{server_url}/cache/stats",
+            "rate_limits": f"{server_url}/metrics/rate-limits",
+            "jobs": f"{server_url}/jobs",
+            "updates": f"{server_url}/updates",
+            "updates_websocket": f"{server_url.replace('http', 'ws', 1)}/ws/updates",
+            "results": f"{server_url}/results",
+            "results_aggregate": f"{server_url}/results/aggregate",
             "documentation": f"{server_url}/docs"
         }
     }
@@ -133,310 +167,523 @@ async def health_check():
 @app.post("/stream/analyze-file")
 async def stream_analyze_log_file(request: LogFileRequest):
     """
-    Stream log file analysis exactly like agent_1.py - processes logs line by line
-    Returns real-time streaming updates as each log is processed
+    Stream log file analysis exactly like agent_1.py - processes logs entry by entry
+    Returns real-time Server-Sent Events (text/event-stream, JSON data, increasing event ids)
     
     - **file_path**: Path to the log file to stream and analyze
+    - **follow**: Keep analysing new entries as the file grows
     
-    This endpoint replicates the exact behavior of running agent_1.py directly:
-    1. Streams logs line-by-line from file
-    2. For each log: calls full multi-agent system (Analyser → NiFi → Remediation)  
-    3. Agent decides automatically what to do with each log
-    4. Continues until file ends (or client disconnects)
+    Runs as a bounded pipeline - file reader → multi-agent system → event stream, at most
+    STREAM_QUEUE_SIZE items waiting between stages:
+    1. Reads complete log entries (multi-line aware) in a worker thread
+    2. For each log: calls full multi-agent system (Analyser → NiFi → Remediation)
+    3. Streams each step to the client; a slow client slows reading and analysis down
+       instead of holding up the server
+    4. Continues until file ends or the stream is stopped
     5. Saves all interactions to agent_outputs/
+    
+    The analysis does not depend on the connection: the last STREAM_BUFFER_EVENTS events are
+    kept per stream, and after a dropped connection `GET /stream/{stream_id}/events` with a
+    `Last-Event-ID` header replays only the events that were missed. A stream with no client
+    connected for STREAM_RESUME_TIMEOUT seconds is stopped.
     """
+    from agent_1 import (agent_runner, stream_logs_by_timestamp, run_agent_on_entry, build_interaction_record,
+                         result_writer, rotate_session, analysis_prompt_for_mode, build_analysis_prompt,
+                         SESSION_WINDOW_ENTRIES, SESSION_WINDOW_TOKENS, SESSION_SUMMARY_ITEMS)
+    from tools.analysis_output import extract_analysis_json
+    from tools.event_stream import EventBuffer, sse_frames, SSE_MEDIA_TYPE, SSE_HEADERS
+    from tools.session_window import AnomalySummary, SessionWindow
+    from tools.stream_pipeline import StreamPipeline, iter_in_thread
+    
+    if not os.path.exists(request.file_path):
+        raise HTTPException(status_code=404, detail=f"File not found: {request.file_path}")
+    
+    session = await agent_runner.session_service.create_session(
+        app_name="log_analysis_agent", 
+        user_id="log_analyzer"
+    )
+    stream_id = f"stream_{session.id}"
+    events = EventBuffer(STREAM_BUFFER_EVENTS)
+    
+    writer = result_writer()
+    # Rotate onto fresh sessions like process_log_file - each call re-sends the session's history
+    window = SessionWindow(session, SESSION_WINDOW_ENTRIES, SESSION_WINDOW_TOKENS)
+    anomaly_summary = AnomalySummary(max_items=SESSION_SUMMARY_ITEMS)
+    prompt_template = analysis_prompt_for_mode()  # Same prompt (and NiFi fast path) as process_log_file
+    logs_processed = 0
+    
+    async def analyse(log_entry, emit):
+        nonlocal logs_processed
+        logs_processed += 1
+        log_number = logs_processed
+        logger.info(f"📋 Processing log #{log_number}: {log_entry[:80]}...")
+        await emit({"status": "processing", "log_number": log_number, "log_preview": f"{log_entry[:60]}..."})
+        await emit({"status": "agent_call", "message": f"Calling multi-agent system for log #{log_number}"})
+        
+        prompt, nifi_lookup = await build_analysis_prompt(prompt_template, log_entry)
+        session_prompt = (anomaly_summary.render() if window.is_fresh else "") + prompt
+        agent_output, tool_calls, execution_metadata = await run_agent_on_entry(
+            window.session, session_prompt, log_number, log_entry,
+            status_callback=lambda event_type, message: pipeline.emit_nowait({"status": event_type, "message": message})
+        )
+        if nifi_lookup is not None:
+            execution_metadata["nifi_lookup"] = nifi_lookup
+        if execution_metadata.get("error"):
+            await emit({"status": "error", "message": agent_output})
+        
+        # Queued for the background writer - never waits for the disk here
+        writer.submit(build_interaction_record(log_number, log_entry, session_prompt, agent_output,
+                                               window.session.id, tool_calls, execution_metadata,
+                                               run_id=session.id))
+        anomaly_summary.add(log_number, extract_analysis_json(agent_output))
+        window.record(session_prompt, agent_output, execution_metadata.get("prompt_tokens"))
+        if window.is_full():
+            await rotate_session(window, anomaly_summary)
+        if log_number % 10 == 0:
+            await emit({"status": "progress", "logs_processed": log_number})
     
-    async def log_stream_generator():
+    stop_event = threading.Event()
+    entries = stream_logs_by_timestamp(request.file_path, follow=request.follow, stop_event=stop_event)
+    pipeline = StreamPipeline(iter_in_thread(entries, chunk_size=1 if request.follow else 64), analyse,
+                              queue_size=STREAM_QUEUE_SIZE, stop_event=stop_event)
+    
+    async def run_stream():
+        """Feed the pipeline's events into the stream's buffer - independent of any connection"""
+        server_url = get_server_url()
         try:
-            # Import exactly what agent_1.py uses
-            from agent_1 import agent_runner, stream_logs_line_by_line, save_agent_interaction
-            from prompts.analyser_prompt import analysis_prompt_template
-            import time
-            
-            logger.info(f"🔍 Using agent_runner from agent_1 module")
-            
-            # Validate file exists
-            if not os.path.exists(request.file_path):
-                yield f"data: {{'error': 'File not found: {request.file_path}'}}\n\n"
-                return
-            
-            yield f"data: {{'status': 'starting', 'message': 'Starting real-time streaming processing from: {request.file_path}'}}\n\n"
-            yield f"data: {{'status': 'info', 'message': '📊 ANALYZING: All log types (INFO/WARN/ERROR/DEBUG) will be analyzed'}}\n\n"
-            yield f"data: {{'status': 'info', 'message': '🔧 REMEDIATION: ERROR logs classified as ANOMALY will trigger remediation sub-agent automatically'}}\n\n"
-            
-            # Create session exactly like agent_1.py
-            session = await agent_runner.session_service.create_session(
-                app_name="log_analysis_agent", 
-                user_id="log_analyzer"
-            )
-            yield f"data: {{'status': 'session_created', 'session_id': '{session.id}'}}\n\n"
-            
-            error_log_count = 0
-            stream_id = f"stream_{session.id}"
-            active_streams[stream_id] = True  # Mark stream as active
-            
-            server_url = get_server_url()
-            yield f"data: {{'status': 'stream_started', 'stream_id': '{stream_id}', 'message': 'Stream started - use {server_url}/stop-stream/{stream_id} to stop'}}\n\n"
-            
+            await events.append({"status": "starting", "message": f"Starting real-time streaming processing from: {request.file_path}"})
+            await events.append({"status": "info", "message": "📊 ANALYZING: All log types (INFO/WARN/ERROR/DEBUG) will be analyzed"})
+            await events.append({"status": "info", "message": "🔧 REMEDIATION: ERROR logs classified as ANOMALY will trigger remediation sub-agent automatically"})
+            await events.append({"status": "session_created", "session_id": session.id})
+            await events.append({"status": "stream_started", "stream_id": stream_id,
+                                 "message": f"Stream started - use {server_url}/stop-stream/{stream_id} to stop, "
+                                            f"{server_url}/stream/{stream_id}/events to reconnect"})
             try:
-                # Stream logs exactly like agent_1.py does
-                for log_entry in stream_logs_line_by_line(request.file_path):
-                    # Check if stream should stop
-                    if not active_streams.get(stream_id, False):
-                        yield f"data: {{'status': 'stopped', 'message': 'Stream stopped by user request'}}\n\n"
-                        break
-                    error_log_count += 1
-                    logger.info(f"📋 Processing log #{error_log_count}: {log_entry[:80]}...")
-                    yield f"data: {{'status': 'processing', 'log_number': {error_log_count}, 'log_preview': '{log_entry[:60]}...'}}\n\n"
-                    
-                    # Use same prompt template as agent_1.py
-                    prompt = analysis_prompt_template.format(log_entry=log_entry)
-                    
-                    try:
-                        content = types.Content(
-                            parts=[types.Part.from_text(text=prompt)],
-                            role="user"
-                        )
-                        
-                        logger.info(f"🤖 Calling agent for log #{error_log_count}")
-                        yield f"data: {{'status': 'agent_call', 'message': 'Calling multi-agent system for log #{error_log_count}'}}\n\n"
-                        
-                        agent_output = "No response from agent"
-                        all_responses = []
-                        
-                        response_count = 0
-                        max_responses = 5  # Same as agent_1.py
-                        
-                        # Exact same agent runner call as agent_1.py
-                        logger.info(f"⏳ Waiting for agent response...")
-                        logger.info(f"🔍 Session: {session.id}, User: {session.user_id}")
-                        
-                        import asyncio
-                        event_count = 0
-                        
-                        async for event in agent_runner.run_async(
-                            user_id=session.user_id, 
-                            session_id=session.id,
-                            new_message=content
-                        ):
-                            event_count += 1
-                            if event_count == 1:
-                                logger.info(f"✅ First event received from agent!")
-                            logger.debug(f"📨 Received event: {type(event).__name__}")
-                            # Handle events exactly like agent_1.py
-                            if hasattr(event, 'content') and event.content and event.content.parts:
-                                for part in event.content.parts:
-                                    # Log function calls
-                                    if hasattr(part, 'function_call') and part.function_call:
-                                        tool_name = part.function_call.name
-                                        logger.info(f"🔧 Agent calling tool: {tool_name}")
-                                        yield f"data: {{'status': 'tool_call', 'tool': '{tool_name}'}}\n\n"
-                                        
-                                    # Log function responses  
-                                    elif hasattr(part, 'function_response') and part.function_response:
-                                        tool_name = part.function_response.name
-                                        logger.info(f"✅ Tool response from: {tool_name}")
-                                        yield f"data: {{'status': 'tool_response', 'tool': '{tool_name}'}}\n\n"
-                                        if tool_name == "nifi_agent_tool":
-                                            yield f"data: {{'status': 'nifi_correlation', 'message': 'NiFi correlation performed'}}\n\n"
-                            
-                            if event.is_final_response():
-                                response_count += 1
-                                logger.info(f"💬 Agent response #{response_count} received")
-                                yield f"data: {{'status': 'response', 'response_number': {response_count}}}\n\n"
-                                
-                                if event.content and event.content.parts:
-                                    for part in event.content.parts:
-                                        if hasattr(part, 'text') and part.text:
-                                            response_text = part.text
-                                            all_responses.append(response_text)
-                                            agent_output = response_text
-                                            
-                                # Stop if reached max responses (same as agent_1.py)
-                                if response_count >= max_responses:
-                                    yield f"data: {{'status': 'max_responses', 'message': 'Reached maximum responses ({max_responses}) - stopping capture'}}\n\n"
-                                    break
-                        
-                        # Combine responses exactly like agent_1.py
-                        if len(all_responses) > 1:
-                            agent_output = "\\n\\n--- AGENT FLOW ---\\n".join(all_responses)
-                        
-                        logger.info(f"✅ Agent processing complete for log #{error_log_count}")
-                            
-                    except Exception as e:
-                        error_msg = f"Failed to call multi-agent system: {e}"
-                        logger.error(f"❌ Agent error: {e}")
-                        yield f"data: {{'status': 'error', 'message': '{error_msg}'}}\n\n"
-                        agent_output = f"Error calling multi-agent system: {e}"
-                        time.sleep(2)
-                    
-                    # Save interaction exactly like agent_1.py
-                    save_agent_interaction(
-                        log_index=error_log_count, 
-                        log_entry=log_entry, 
-                        input_prompt=prompt, 
-                        agent_output=agent_output,
-                        session_id=session.id
-                    )
-                    
-                    # Progress updates like agent_1.py
-                    if error_log_count % 10 == 0:
-                        yield f"data: {{'status': 'progress', 'logs_processed': {error_log_count}}}\n\n"
-                    
-                    # Same delay as agent_1.py
-                    time.sleep(0.5)
-                    
+                async for event in pipeline.events():
+                    await events.append(event)
             except Exception as e:
-                yield f"data: {{'status': 'error', 'message': 'Error during processing: {e}'}}\n\n"
-            
-            yield f"data: {{'status': 'completed', 'total_logs': {error_log_count}, 'message': 'Streaming processing complete - {error_log_count} logs analyzed'}}\n\n"
-            yield f"data: {{'status': 'completed', 'message': 'All interactions saved to agent_outputs/'}}\n\n"
+                await events.append({"status": "error", "message": f"Error during processing: {e}"})
+            if pipeline.stopped:
+                await events.append({"status": "stopped", "message": "Stream stopped by user request"})
             
+            await events.append({"status": "completed", "total_logs": logs_processed,
+                                 "message": f"Streaming processing complete - {logs_processed} logs analyzed"})
+            await events.append({"status": "completed", "message": "All interactions saved to agent_outputs/"})
         except Exception as e:
-            yield f"data: {{'status': 'fatal_error', 'message': 'Stream failed: {str(e)}'}}\n\n"
+            await events.append({"status": "fatal_error", "message": f"Stream failed: {str(e)}"})
         finally:
-            # Clean up stream tracking
-            if 'stream_id' in locals():
-                active_streams.pop(stream_id, None)
-    
-    return StreamingResponse(
-        log_stream_generator(),
-        media_type="text/plain",
-        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
-    )
+            await events.close()
+    
+    active_streams[stream_id] = {"pipeline": pipeline, "events": events, "task": asyncio.create_task(run_stream()),
+                                 "file_path": request.file_path, "session_id": session.id,
+                                 "started_at": datetime.now().isoformat()}
+    await state.aset(SESSIONS, session.id, {"stream_id": stream_id, "file_path": request.file_path,
+                                            "created_at": datetime.now().isoformat()}, ttl=SHARED_TTL)
+    await publish_stream(stream_id)
+    asyncio.create_task(expire_stream(stream_id))
+    
+    return StreamingResponse(sse_frames(events), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
 
 
-@app.post("/start-analysis")
-async def start_analysis_background(request: LogFileRequest):
+def stream_status(stream_id):
+    stream = active_streams[stream_id]
+    return {
+        "file_path": stream["file_path"],
+        "session_id": stream["session_id"],
+        "started_at": stream["started_at"],
+        "worker": worker_id(),
+        "running": not stream["task"].done(),
+        "last_event_id": stream["events"].last_id,
+        "clients": stream["events"].subscribers
+    }
+
+
+async def publish_stream(stream_id):
+    """Refresh a local stream's shared status (keeps a stop_requested flag set by another worker)"""
+    if not await state.aupdate(STREAMS, stream_id, stream_status(stream_id), ttl=SHARED_TTL):
+        await state.aset(STREAMS, stream_id, stream_status(stream_id), ttl=SHARED_TTL)
+    await state.aupdate(SESSIONS, active_streams[stream_id]["session_id"], {}, ttl=SHARED_TTL)
+
+
+async def expire_stream(stream_id):
+    """Keep a stream's shared status up to date and apply stops requested on other workers;
+    forget the stream once no client has been connected to it for STREAM_RESUME_TIMEOUT seconds
+    
+    A stream that is still running at that point was abandoned and is cancelled.
     """
-    Start log analysis in the background - returns immediately
-    Use this from Streamlit to avoid timeout issues
+    stream = active_streams[stream_id]
+    events = stream["events"]
+    while True:
+        await asyncio.sleep(min(STATE_SYNC_INTERVAL, STREAM_RESUME_TIMEOUT))
+        shared = await state.aget(STREAMS, stream_id) or {}
+        if shared.get("stop_requested") and not stream["pipeline"].stopped:
+            logger.info(f"🛑 {stream_id} stopped from another worker")
+            stream["pipeline"].stop()
+        if events.subscribers or time.monotonic() - events.idle_since < STREAM_RESUME_TIMEOUT:
+            await publish_stream(stream_id)
+            continue
+        if not stream["task"].done():
+            logger.warning(f"⚠ No client reconnected to {stream_id} for {STREAM_RESUME_TIMEOUT:.0f}s - stopping it")
+            stream["task"].cancel()
+        active_streams.pop(stream_id, None)
+        await state.adelete(STREAMS, stream_id)
+        await state.adelete(SESSIONS, stream["session_id"])
+        return
+
+
+@app.get("/stream/{stream_id}/events")
+async def resume_stream(stream_id: str, last_event_id: Optional[str] = Header(None), after: Optional[int] = None):
     """
-    import asyncio
-    from agent_1 import process_log_file
-    
-    def add_event(event_type, message):
-        """Add important event to status"""
-        # Special handling for log content
-        if event_type == "log":
-            analysis_status["current_log"] = message
-            return
-        
-        # Update logs processed counter
-        if event_type == "processing":
-            analysis_status["logs_processed"] += 1
-        
+    Reconnect to a running (or just finished) stream
+    
+    - **Last-Event-ID** header: id of the last event received - only later events are sent
+      (browsers' EventSource sends it automatically when reconnecting)
+    - **after**: the same as a query parameter, for clients that cannot set headers
+    
+    If some of the missed events are no longer buffered, an `events_missed` event says how many.
+    """
+    from tools.event_stream import sse_frames, parse_last_event_id, SSE_MEDIA_TYPE, SSE_HEADERS
+    
+    stream = active_streams.get(stream_id)
+    if stream is None:
+        shared = await state.aget(STREAMS, stream_id)
+        if shared is None:
+            raise HTTPException(status_code=404, detail="Stream not found or expired")
+        # The event buffer lives in the worker running the stream - the load balancer has
+        # to route a stream's requests there (sticky on the stream id)
+        raise HTTPException(status_code=409, detail=f"Stream {stream_id} is served by worker {shared['worker']}")
+    start_after = after if after is not None else parse_last_event_id(last_event_id)
+    return StreamingResponse(sse_frames(stream["events"], start_after), media_type=SSE_MEDIA_TYPE,
+                             headers=SSE_HEADERS)
+
+
+async def run_analysis_job(job):
+    """Run one scheduled analysis - JobScheduler's run_job"""
+    from agent_1 import process_log_file, count_log_entries
+    params = job.params
+    last_push = 0.0
+    session_saved = None
+    
+    def status_callback(event_type, message):
+        nonlocal last_push, session_saved
         # Log approval requests specially
-        if "approval" in message.lower() or "remediation" in message.lower():
-            logger.info(f"🔔 APPROVAL EVENT: {message}")
-        
-        analysis_status["agent_events"].append({
-            "type": event_type,
-            "message": message,
-            "time": datetime.now().strftime("%H:%M:%S")
-        })
-        # Keep only last 30 events
-        if len(analysis_status["agent_events"]) > 30:
-            analysis_status["agent_events"].pop(0)
-    
-    async def run_analysis():
-        """Run the analysis in background"""
-        global analysis_status
-        try:
-            analysis_status["is_running"] = True
-            analysis_status["logs_processed"] = 0
-            analysis_status["agent_events"] = []
-            analysis_status["current_activity"] = "🚀 Starting analysis..."
-            
-            add_event("start", f"Analysis started: {request.file_path}")
-            logger.info(f"🚀 Starting background analysis of: {request.file_path}")
-            
-            # Use the same process_log_file from agent_1.py with callback
-            from agent_1 import process_log_file
-            await process_log_file(request.file_path, status_callback=add_event)
-            
-            analysis_status["current_activity"] = "✅ Analysis complete!"
-            add_event("complete", "Analysis finished successfully")
-            logger.info(f"✅ Background analysis complete: {request.file_path}")
-            
-        except Exception as e:
-            analysis_status["current_activity"] = f"❌ Error: {str(e)}"
-            add_event("error", f"Analysis failed: {str(e)}")
-            logger.error(f"❌ Background analysis failed: {e}")
-        finally:
-            analysis_status["is_running"] = False
+        if event_type != "log" and ("approval" in message.lower() or "remediation" in message.lower()):
+            logger.info(f"🔔 APPROVAL EVENT ({job.id}): {message}")
+        job.record(event_type, message)
+        if event_type == "session":
+            # Lets any worker tell which job a session's results come from (see session_status)
+            # (callbacks run on the event loop - the store write goes on in the background)
+            session_saved = asyncio.ensure_future(state.aset(SESSIONS, message, {
+                "job_id": job.id, "file_path": params["file_path"], "created_at": datetime.now().isoformat()}))
+        if time.monotonic() - last_push >= PUSH_PROGRESS_INTERVAL:
+            last_push = time.monotonic()
+            updates.publish_soon(JOB_PROGRESS, job_scheduler.view(job))
+    
+    if not params["follow"] and not params["resume"]:
+        # Total for the progress figure - counted in a worker thread, the file is read anyway
+        job.total_entries = await asyncio.to_thread(count_log_entries, params["file_path"])
+    status_callback("start", f"Analysis started: {params['file_path']}")
+    try:
+        await process_log_file(params["file_path"], status_callback=status_callback, follow=params["follow"],
+                               resume=params["resume"], concurrency=params["concurrency"],
+                               batch_size=params["batch_size"])
+    finally:
+        if session_saved is not None:
+            await asyncio.gather(session_saved, return_exceptions=True)  # Written before it is removed
+            await state.adelete(SESSIONS, job.session_id)
+
+
+job_scheduler = JobScheduler(run_analysis_job, max_workers=JOB_WORKERS, admission=JOB_ADMISSION, store=state,
+                             sync_interval=STATE_SYNC_INTERVAL,
+                             on_change=lambda job: updates.publish_soon(JOB_PROGRESS, job))
+
+
+async def claim_file(file_path):
+    """Reserve a file for one job across all workers - two jobs on one file would share its checkpoint
+    
+    Returns None once claimed, or the id of the job holding it. A claim whose job has
+    finished (or whose worker is gone) is taken over.
+    """
+    claim = {"job_id": None, "worker": worker_id(), "claimed_at": time.time()}
+    for _ in range(2):
+        if await state.aadd(JOB_FILES, file_path, claim):
+            return None
+        holder = await state.aget(JOB_FILES, file_path)
+        if holder is None:
+            continue
+        if holder["job_id"] is None:
+            if time.time() - holder["claimed_at"] < SHARED_TTL:
+                return "a job being submitted"
+        else:
+            job = await job_scheduler.get(holder["job_id"])
+            if job is not None and job["status"] in (QUEUED, RUNNING):
+                return holder["job_id"]
+        await state.adelete(JOB_FILES, file_path)
+    return "another job"
+
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    """
+    Queue a log file analysis - returns immediately with the job id
+    
+    - **priority**: higher runs first when JOB_ADMISSION=priority (FIFO otherwise)
     
-    # Create task in current event loop - it will run after response is sent
-    asyncio.create_task(run_analysis())
+    Up to JOB_WORKERS jobs run at once, the others wait in line. Follow a job with
+    GET /jobs/{job_id} and cancel it with DELETE /jobs/{job_id}.
+    """
+    if not os.path.exists(request.file_path):
+        raise HTTPException(status_code=404, detail=f"File not found: {request.file_path}")
+    holder = await claim_file(request.file_path)
+    if holder is not None:
+        raise HTTPException(status_code=409, detail=f"{request.file_path} is already being analysed by {holder}")
     
+    job = await job_scheduler.submit(request.model_dump(exclude={"priority"}), priority=request.priority)
+    await state.aupdate(JOB_FILES, request.file_path, {"job_id": job.id})
+    return await job_scheduler.get(job.id)
+
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None):
+    """All known jobs of every worker (optionally only queued / running / completed / failed / cancelled) and pool usage"""
     return {
-        "status": "started",
+        **await job_scheduler.stats(),
+        "jobs": await job_scheduler.list_jobs(status)
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress, throughput and recent events of one job (of any worker)"""
+    job = await job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job (a cancelled analysis can be continued later with resume=true)"""
+    job = await job_scheduler.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/start-analysis")
+async def start_analysis_background(request: LogFileRequest):
+    """
+    Start log analysis in the background - returns immediately
+    Use this from Streamlit to avoid timeout issues (queued as a job - see /jobs)
+    """
+    job = await submit_job(JobRequest(**request.model_dump()))
+    return {
+        "status": "queued" if job_scheduler.running_count() >= job_scheduler.max_workers else "started",
+        "job_id": job["job_id"],
         "message": f"Analysis started for {request.file_path}",
         "file_path": request.file_path,
         "note": "Check FastAPI terminal for progress. Approval requests will appear in the dashboard."
     }
 
 
-# Store analysis status in memory
-analysis_status = {
-    "is_running": False,
-    "logs_processed": 0,
-    "current_activity": "Idle",
-    "current_log": None,
-    "agent_events": []  # Keep important agent events only
-}
-
 @app.get("/analysis-status")
 async def get_analysis_status():
-    """Get current analysis status for real-time updates"""
-    return analysis_status
+    """Get current analysis status for real-time updates (the most recently started job)"""
+    jobs = await job_scheduler.list_jobs(include_events=True)
+    started = [job for job in jobs if job["started_at"]]
+    latest = max(started, key=lambda job: job["started_at"]) if started else None
+    return {
+        "is_running": any(job["status"] == RUNNING for job in jobs),
+        "logs_processed": latest["logs_processed"] if latest else 0,
+        "current_activity": latest["current_activity"] if latest else "Idle",
+        "current_log": latest["current_log"] if latest else None,
+        "agent_events": latest["events"] if latest else [],
+        "job_id": latest["job_id"] if latest else None,
+        "job_counts": (await job_scheduler.stats())["job_counts"]
+    }
+
+
+async def updates_snapshot():
+    """Current state the update events apply to: pending approvals, jobs and analysis status"""
+    from tools.remediation_hitl_tool import get_all_approval_requests
+    return {
+        "pending_approvals": {request_id: request for request_id, request in
+                              (await get_all_approval_requests()).items() if request.get("status") == "pending"},
+        "jobs": await job_scheduler.list_jobs(),
+        "analysis_status": await get_analysis_status()
+    }
+
+
+@app.get("/updates")
+async def get_updates(after: Optional[int] = None, timeout: float = 25.0):
+    """
+    Push channel (long poll): approval_created, approval_resolved and job_progress events
+    
+    - without **after**: returns at once with a `snapshot` of the current state and its `version`
+    - **after**: the `version` from the previous response - returns as soon as there are newer
+      events, or with none after **timeout** seconds (at most 60)
+    
+    `reset: true` means the cursor is no longer valid (events already dropped or the server
+    restarted): the response carries a fresh `snapshot` to start over from.
+    """
+    if after is None:
+        version = await updates.latest_version()  # Before the snapshot - later events are delivered next time
+        return {"version": version, "events": [], "reset": True, "snapshot": await updates_snapshot()}
+    result = await updates.wait(after, min(max(timeout, 0.0), 60.0))
+    if result["reset"]:
+        result["snapshot"] = await updates_snapshot()
+    return result
+
+
+@app.websocket("/ws/updates")
+async def updates_websocket(websocket: WebSocket, after: Optional[int] = None):
+    """
+    Push channel over a WebSocket: a `snapshot` message first (unless resuming with ?after=),
+    then every event as it is published, and a `keepalive` after PUSH_KEEPALIVE idle seconds
+    """
+    await websocket.accept()
+    cursor = after
+    try:
+        if cursor is None:
+            cursor = await updates.latest_version()
+            await websocket.send_json({"type": "snapshot", "version": cursor, "data": await updates_snapshot()})
+        while True:
+            result = await updates.wait(cursor, PUSH_KEEPALIVE)
+            cursor = result["version"]
+            if result["reset"]:
+                await websocket.send_json({"type": "snapshot", "version": cursor, "data": await updates_snapshot()})
+            elif not result["events"]:
+                await websocket.send_json({"type": "keepalive", "version": cursor})
+            for event in result["events"]:
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+
+RESULTS_DIR = "agent_outputs"
+_result_index = None
+
+
+def get_result_index():
+    """Read-side connection to the result index (WAL - readers don't block the writer thread)"""
+    global _result_index
+    from tools.result_index import ResultIndex, INDEX_DB_NAME
+    if _result_index is None:
+        _result_index = ResultIndex(os.path.join(RESULTS_DIR, INDEX_DB_NAME))
+    return _result_index
+
+
+async def query_results(session_id=None, filters=None, offset=0, limit=100, cursor=None, include_records=True):
+    """Page of results from the SQLite index, with the full stored records if requested"""
+    from tools.result_index import load_record
+    
+    def page():
+        result = get_result_index().query(session_id=session_id, filters=filters, offset=offset,
+                                          limit=limit, cursor=cursor)
+        if include_records:
+            for row in result["rows"]:
+                row["record"] = load_record(RESULTS_DIR, row["segment"], row["line_offset"])
+        return result
+    
+    try:
+        return await asyncio.to_thread(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def session_status(session_id, run_id=None):
+    """"processing" while the job or stream that owns a session's results is still running"""
+    owner = await state.aget(SESSIONS, run_id or session_id) or {}
+    if owner.get("job_id"):
+        job = await job_scheduler.get(owner["job_id"])
+        running = job is not None and job["status"] in (QUEUED, RUNNING)
+    elif owner.get("stream_id"):
+        stream = await state.aget(STREAMS, owner["stream_id"])
+        running = stream is not None and stream["running"]
+    else:
+        running = False
+    return "processing" if running else "completed"
 
 
 @app.get("/analyze/file/results/{session_id}")
-async def get_file_analysis_results(session_id: str):
-    """Get results from a file analysis session"""
+async def get_file_analysis_results(session_id: str, classification: Optional[str] = None,
+                                    severity: Optional[str] = None, component: Optional[str] = None,
+                                    level: Optional[str] = None, offset: int = 0, limit: int = 100,
+                                    cursor: Optional[int] = None, include_records: bool = True):
+    """Get results from a file analysis session (the run's session id, or one of its worker sessions)
+    
+    - **classification** / **severity** / **component** / **level**: optional filters
+    - **offset** / **limit**: page through the results in save order
+    - **cursor**: `next_cursor` of the previous page (faster than offset for deep pages)
+    - **include_records**: include the full stored result of each row
+    """
     try:
-        # Look for output files with session pattern
-        output_dir = "agent_outputs"
-        if not os.path.exists(output_dir):
-            raise HTTPException(status_code=404, detail="No analysis results found")
-        
-        # Find the most recent output file (simplified)
-        import glob
-        output_files = glob.glob(f"{output_dir}/complete_log_*.json")
-        
-        if not output_files:
-            return {"status": "processing", "message": "Analysis still in progress"}
-        
-        # Return the most recent file info
-        latest_file = max(output_files, key=os.path.getctime)
-        file_size = os.path.getsize(latest_file)
+        filters = {"classification": classification, "severity": severity, "component": component, "level": level}
+        result = await query_results(session_id, filters, offset, min(limit, 1000), cursor, include_records)
+        if not result["total"]:
+            return {"status": "processing", "session_id": session_id, "message": "No results saved for this session yet"}
         
         return {
-            "status": "completed",
-            "results_file": latest_file,
-            "file_size_bytes": file_size,
-            "message": f"Analysis complete. Results saved to {latest_file}"
+            # Worker sessions of a run resolve to the run's session through the saved run_id
+            "status": await session_status(session_id, result["rows"][0]["run_id"] if result["rows"] else None),
+            "session_id": session_id,
+            "total_results": result["total"],
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": result["next_cursor"],
+            "results": result["rows"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ API Error getting results: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get results: {str(e)}")
 
+
+@app.get("/results")
+async def search_results(session_id: Optional[str] = None, classification: Optional[str] = None,
+                         severity: Optional[str] = None, component: Optional[str] = None,
+                         level: Optional[str] = None, offset: int = 0, limit: int = 100,
+                         cursor: Optional[int] = None, include_records: bool = False):
+    """Query all stored results by session, classification, severity, component or log level"""
+    filters = {"classification": classification, "severity": severity, "component": component, "level": level}
+    result = await query_results(session_id, filters, offset, min(limit, 1000), cursor, include_records)
+    return {
+        "total_results": result["total"],
+        "offset": offset,
+        "limit": limit,
+        "next_cursor": result["next_cursor"],
+        "results": result["rows"]
+    }
+
+
+@app.get("/results/aggregate")
+async def aggregate_results(group_by: str = "severity", session_id: Optional[str] = None,
+                            classification: Optional[str] = None, severity: Optional[str] = None,
+                            component: Optional[str] = None, level: Optional[str] = None):
+    """Counts, average processing time and tool calls per classification / severity / component / ..."""
+    filters = {"classification": classification, "severity": severity, "component": component, "level": level}
+    try:
+        groups = await asyncio.to_thread(get_result_index().aggregate, group_by, session_id, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"group_by": group_by, "session_id": session_id, "groups": groups}
+
 @app.get("/sessions")
 async def list_active_sessions():
-    """List all active analysis sessions"""
+    """List all active analysis sessions (of every worker)"""
+    sessions = await state.aitems(SESSIONS)
     return {
-        "active_sessions": list(active_sessions.keys()),
-        "total_sessions": len(active_sessions),
+        "active_sessions": list(sessions.keys()),
+        "total_sessions": len(sessions),
         "timestamp": datetime.now().isoformat()
     }
 
 @app.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
     """Delete a specific session"""
-    if session_id in active_sessions:
-        del active_sessions[session_id]
+    if await state.adelete(SESSIONS, session_id):
         return {"status": "deleted", "session_id": session_id}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -451,24 +698,62 @@ async def stop_stream(stream_id: str):
     This gracefully stops the log streaming process, similar to Ctrl+C in agent_1.py
     """
     if stream_id in active_streams:
-        active_streams[stream_id] = False  # Signal stream to stop
+        active_streams[stream_id]["pipeline"].stop()  # Stop reading - the log in progress is finished first
         return {
             "status": "stopping", 
             "stream_id": stream_id,
             "message": "Stream stop signal sent - processing will halt after current log"
         }
+    elif await state.aupdate(STREAMS, stream_id, {"stop_requested": True}):
+        # Running on another worker - it stops the stream on its next status update
+        return {
+            "status": "stopping",
+            "stream_id": stream_id,
+            "message": f"Stream stop signal sent - processing will halt after current log (within {STATE_SYNC_INTERVAL:.0f}s)"
+        }
     else:
         raise HTTPException(status_code=404, detail="Stream not found or already stopped")
 
 @app.get("/active-streams")
 async def list_active_streams():
-    """List all currently active streaming sessions"""
+    """List all currently active streaming sessions (of every worker)"""
+    streams = await state.aitems(STREAMS)
+    streams.update({stream_id: stream_status(stream_id) for stream_id in active_streams})
     return {
-        "active_streams": list(active_streams.keys()),
-        "total_active": len(active_streams),
+        "active_streams": list(streams.keys()),
+        "total_active": len(streams),
+        "streams": streams,
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Analysis cache counters (hits/misses/evictions) plus template mining stats"""
+    from agent_1 import analysis_cache, template_miner
+    return {
+        "analysis_cache": await asyncio.to_thread(analysis_cache.stats),
+        "template_miner": template_miner.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics/rate-limits")
+async def get_rate_limit_metrics():
+    """Per-model limiter state: wait times (total/avg/max/histogram), throttles, retries, queue depth"""
+    from tools.rate_limiter import rate_limit_metrics, RATE_LIMITING
+    return {
+        "enabled": RATE_LIMITING,
+        "models": rate_limit_metrics(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.delete("/cache")
+async def clear_cache():
+    """Drop every cached analysis (memory and disk)"""
+    from agent_1 import analysis_cache
+    await asyncio.to_thread(analysis_cache.clear)
+    logger.info("🧹 Analysis cache cleared")
+    return {"status": "cleared", "timestamp": datetime.now().isoformat()}
+
 # ============================================================
 # HUMAN-IN-THE-LOOP APPROVAL ENDPOINTS & DASHBOARD
 # ============================================================
@@ -491,7 +776,7 @@ async def list_pending_approvals():
     """List all pending approval requests"""
     from tools.remediation_hitl_tool import get_all_approval_requests
     
-    all_requests = get_all_approval_requests()
+    all_requests = await get_all_approval_requests()
     pending = {k: v for k, v in all_requests.items() if v.get("status") == "pending"}
     
     # DEBUG: Log what we're returning
@@ -505,12 +790,21 @@ async def list_pending_approvals():
         "timestamp": datetime.now().isoformat()
     }
 
+async def raise_undecidable(request_id: str):
+    """404 for an unknown approval request, 409 for one that was already decided"""
+    from tools.remediation_hitl_tool import APPROVALS
+    
+    request = await state.aget(APPROVALS, request_id)
+    if request is None:
+        raise HTTPException(status_code=404, detail=f"Request {request_id} not found")
+    raise HTTPException(status_code=409, detail=f"Request {request_id} already {request.get('status')}")
+
 @app.post("/approve/{request_id}")
 async def approve_request_endpoint(request_id: str):
     """Approve an approval request (in-memory, no files)"""
     from tools.remediation_hitl_tool import update_approval_status
     
-    success = update_approval_status(request_id, "approved")
+    success = await update_approval_status(request_id, "approved")
     
     if success:
         logger.info(f"✅ API: Request {request_id} approved")
@@ -520,14 +814,14 @@ async def approve_request_endpoint(request_id: str):
             "timestamp": datetime.now().isoformat()
         }
     else:
-        raise HTTPException(status_code=404, detail=f"Request {request_id} not found")
+        await raise_undecidable(request_id)
 
 @app.post("/reject/{request_id}")
 async def reject_request_endpoint(request_id: str, feedback: Optional[str] = None):
     """Reject an approval request (in-memory, no files)"""
     from tools.remediation_hitl_tool import update_approval_status
     
-    success = update_approval_status(request_id, "rejected", feedback)
+    success = await update_approval_status(request_id, "rejected", feedback)
     
     if success:
         if feedback:
@@ -541,7 +835,7 @@ async def reject_request_endpoint(request_id: str, feedback: Optional[str] = Non
             "timestamp": datetime.now().isoformat()
         }
     else:
-        raise HTTPException(status_code=404, detail=f"Request {request_id} not found")
+        await raise_undecidable(request_id)
 
 @app.post("/feedback/{request_id}")
 async def send_feedback_endpoint(request_id: str, feedback: str):
@@ -551,7 +845,7 @@ async def send_feedback_endpoint(request_id: str, feedback: str):
     if not feedback or not feedback.strip():
         raise HTTPException(status_code=400, detail="Feedback cannot be empty")
     
-    success = update_approval_status(request_id, "rejected", feedback.strip())
+    success = await update_approval_status(request_id, "rejected", feedback.strip())
     
     if success:
         logger.info(f"💬 API: Request {request_id} received feedback: {feedback}")
@@ -563,7 +857,7 @@ async def send_feedback_endpoint(request_id: str, feedback: str):
             "timestamp": datetime.now().isoformat()
         }
     else:
-        raise HTTPException(status_code=404, detail=f"Request {request_id} not found")
+        await raise_undecidable(request_id)
 
 # Configuration and startup
 if __name__ == "__main__":
@@ -573,12 +867,17 @@ if __name__ == "__main__":
 
     os.makedirs("agent_outputs", exist_ok=True)
     
+    if SERVER_WORKERS > 1 and STATE_BACKEND == "memory":
+        logger.warning("⚠ SERVER_WORKERS > 1 with STATE_BACKEND=memory - approvals, jobs and streams "
+                       "will only be visible to the worker that created them")
+    
     # Start the server with configurable host and port
     logger.info(f"🌍 Server will be accessible at: {get_server_url()}")
     uvicorn.run(
         "main:app",
         host=SERVER_HOST,
         port=SERVER_PORT,
-        reload=True,
+        reload=SERVER_WORKERS == 1,  # Reloading runs a single process
+        workers=SERVER_WORKERS,
         log_level="info"
     )
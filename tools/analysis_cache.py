@@ -0,0 +1,184 @@
+"""
+Analysis result cache
+Maps a normalized log entry (timestamps and ids masked) + prompt version to the agent output
+
+- In memory: an LRU (OrderedDict) bounded by max_entries, entries expire after ttl seconds
+- On disk: a SQLite table (agent_cache/analysis_cache.db) written through on every put,
+  so the cache survives restarts; it is bounded separately by max_disk_entries
+- Counters (memory/disk hits, misses, evictions, expirations) are exposed via stats()
+
+Only timestamps, UUIDs, hex ids, request/flowfile-style ids and thread numbers are
+masked. Other numbers (HTTP status, exit code, port, size, percentage) change the
+diagnosis, so "HTTP 500" and "HTTP 404" get separate entries.
+
+The prompt version is a hash of the prompt template text, so editing a prompt
+invalidates every cached answer produced with the old one.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from loguru import logger
+
+CACHE_DIR = "agent_cache"
+CACHE_DB_NAME = "analysis_cache.db"
+
+_ID_NAMES = r"(?:request|req|flow ?file|trace|span|correlation|transaction|txn|session|order|job|message|msg|event)"
+_MASKS = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TS>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{12,}\b"), "<HEX>"),
+    # "request 42", "flowfile id=ab12", "session: 7", "[id=3f2a]" - the value must contain a digit
+    (re.compile(rf"(?i)\b({_ID_NAMES}(?:[ _-]?(?:id|uuid))?|id|uuid)(\s*[=:#]\s*|\s+#?)(?=[\w.-]*\d)[\w.-]+"),
+     r"\1\2<ID>"),
+    # Thread names: [Timer-Driven Process Thread-7], [http-nio-8080-exec-12]
+    (re.compile(r"(\[[^\]\n]*?(?:Thread|exec|worker|pool)[- ])\d+\]", re.IGNORECASE), r"\1<N>]"),
+]
+
+
+def prompt_version(prompt_template: str) -> str:
+    """Short stable id for a prompt template"""
+    return hashlib.sha1(prompt_template.encode()).hexdigest()[:12]
+
+
+def normalize_entry(log_entry: str) -> str:
+    """Entry text with timestamps and ids masked and whitespace collapsed; other numbers are kept"""
+    lines = []
+    for line in log_entry.strip().split("\n"):
+        for pattern, placeholder in _MASKS:
+            line = pattern.sub(placeholder, line)
+        lines.append(" ".join(line.split()))
+    return "\n".join(lines)
+
+
+def cache_key(log_entry: str, version: str) -> str:
+    """Key for a log entry: normalized entry text + prompt version"""
+    return hashlib.sha256(f"{version}\n{normalize_entry(log_entry)}".encode()).hexdigest()
+
+
+class AnalysisCache:
+    """LRU + TTL cache with SQLite write-through persistence"""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, max_disk_entries: int = 10000,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.db_path = db_path or os.path.join(CACHE_DIR, CACHE_DB_NAME)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = self.disk_hits = self.misses = 0
+        self.evictions = self.expirations = 0
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache(last_used)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                value, created_at = item
+                if now - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            try:
+                db = self._connect()
+                row = db.execute("SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    db.commit()
+                    self.expirations += 1
+                    row = None
+                if row is not None:
+                    db.execute("UPDATE analysis_cache SET last_used = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+            except sqlite3.Error as e:
+                logger.warning(f"⚠ Analysis cache read failed: {e}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            try:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO analysis_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                           (key, value, now, now))
+                db.execute(
+                    "DELETE FROM analysis_cache WHERE key IN ("
+                    "SELECT key FROM analysis_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠ Analysis cache write failed: {e}")
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            try:
+                db = self._connect()
+                db.execute("DELETE FROM analysis_cache")
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠ Analysis cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            try:
+                disk_entries = self._connect().execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            except sqlite3.Error:
+                disk_entries = None
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_entries": len(self._entries),
+                "disk_entries": disk_entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl
+            }
+
+
+__all__ = ['AnalysisCache', 'cache_key', 'normalize_entry', 'prompt_version', 'CACHE_DIR']
@@ -0,0 +1,60 @@
+"""
+Helpers for the Analyser agent's JSON output
+The agent answers with a ```json fenced block (sometimes followed by delegation text)
+"""
+
+import json
+import re
+from typing import Optional
+
+_FENCED_JSON = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.DOTALL)
+
+
+def extract_analysis_json(agent_output: str) -> Optional[dict]:
+    """Return the first JSON object in the agent output (fenced or bare), or None"""
+    if not agent_output:
+        return None
+
+    candidates = [m.group(1) for m in _FENCED_JSON.finditer(agent_output)]
+    start = agent_output.find("{")
+    end = agent_output.rfind("}")
+    if start != -1 and end > start:
+        candidates.append(agent_output[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def extract_analysis_list(agent_output: str) -> Optional[list]:
+    """Return the first JSON array of objects in the agent output (batch answers), or None"""
+    if not agent_output:
+        return None
+
+    candidates = [m.group(1) for m in _FENCED_JSON.finditer(agent_output)]
+    start = agent_output.find("[")
+    end = agent_output.rfind("]")
+    if start != -1 and end > start:
+        candidates.append(agent_output[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(parsed, list):
+            return [item for item in parsed if isinstance(item, dict)]
+    return None
+
+
+def format_analysis_json(analysis: dict) -> str:
+    """Render an analysis dict the way the agent does (fenced JSON block)"""
+    return f"```json\n{json.dumps(analysis, indent=2)}\n```"
+
+
+__all__ = ['extract_analysis_json', 'extract_analysis_list', 'format_analysis_json']
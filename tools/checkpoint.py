@@ -0,0 +1,85 @@
+"""
+Resumable analysis checkpoints
+One small JSON file per log file in agent_checkpoints/ (next to agent_outputs/)
+
+A checkpoint records the byte offset where the next unanalysed entry starts,
+how many entries have been committed and the session id of the run. It is
+written atomically (temp file + fsync + os.replace), and process_log_file only
+advances it after the entry's result has been saved, so a resumed run neither
+re-analyses nor skips entries.
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+
+CHECKPOINT_DIR = "agent_checkpoints"
+
+
+def checkpoint_path(log_file_path: str, checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+    """Checkpoint file for a log - keyed by absolute path so same-named logs don't collide"""
+    abs_path = os.path.abspath(log_file_path)
+    digest = hashlib.sha1(abs_path.encode()).hexdigest()[:12]
+    return os.path.join(checkpoint_dir, f"{os.path.basename(abs_path)}.{digest}.json")
+
+
+def _first_line_crc(log_file_path: str) -> int:
+    with open(log_file_path, "rb") as f:
+        return zlib.crc32(f.readline(4096))
+
+
+def save_checkpoint(log_file_path: str, byte_offset: int, entry_count: int, session_id: str,
+                    checkpoint_dir: str = CHECKPOINT_DIR):
+    """Atomically record that every entry before byte_offset has been analysed and saved"""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    stat = os.stat(log_file_path)
+    checkpoint = {
+        "log_file": os.path.abspath(log_file_path),
+        "byte_offset": byte_offset,
+        "entry_count": entry_count,
+        "session_id": session_id,
+        "inode": stat.st_ino,
+        "first_line_crc": _first_line_crc(log_file_path),
+        "updated_at": datetime.now().isoformat()
+    }
+
+    path = checkpoint_path(log_file_path, checkpoint_dir)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(log_file_path: str, checkpoint_dir: str = CHECKPOINT_DIR) -> Optional[dict]:
+    """Return the checkpoint if it still applies to the file on disk, else None"""
+    path = checkpoint_path(log_file_path, checkpoint_dir)
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠ Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+    try:
+        stat = os.stat(log_file_path)
+        same_file = (stat.st_ino == checkpoint.get("inode")
+                     and _first_line_crc(log_file_path) == checkpoint.get("first_line_crc"))
+    except OSError:
+        return None
+
+    if not same_file or stat.st_size < checkpoint.get("byte_offset", 0):
+        logger.warning(f"⚠ Checkpoint for {log_file_path} is stale (file rotated or truncated) - starting over")
+        return None
+    return checkpoint
+
+
+__all__ = ['save_checkpoint', 'load_checkpoint', 'checkpoint_path', 'CHECKPOINT_DIR']
@@ -0,0 +1,126 @@
+"""
+Resumable Server-Sent Events
+Events of a stream are numbered and kept in a bounded per-stream ring buffer, so a
+client that loses its connection can reconnect with Last-Event-ID and get only
+what it missed while the work behind the stream carries on
+
+- EventBuffer.append() numbers events 1, 2, 3, ... and waits while `capacity`
+  events have not been delivered to any client yet: a slow or disconnected
+  client pauses the producer instead of losing events (backpressure)
+- subscribe(last_event_id) replays the buffered events after last_event_id, then
+  follows new ones; if some were already dropped from the ring it says how many
+- sse_frames() renders a subscription as text/event-stream: `id:` + JSON `data:`
+  per event, a `retry:` hint for EventSource and comment keep-alives while idle
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, Optional, Tuple
+
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+
+
+class EventBuffer:
+    """Numbered events of one stream, the last `capacity` of them replayable"""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(1, capacity)
+        self._events = deque(maxlen=self.capacity)  # (event_id, event)
+        self._changed = asyncio.Condition()
+        self.last_id = 0
+        self.delivered = 0  # Highest event id sent to a client
+        self.closed = False
+        self.subscribers = 0
+        self.idle_since = time.monotonic()  # When the last subscriber left (or the buffer was created)
+
+    @property
+    def oldest_id(self) -> int:
+        return self._events[0][0] if self._events else self.last_id + 1
+
+    async def append(self, event: dict) -> int:
+        """Add an event; waits while the ring is full of events no client has received yet"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.closed or self.last_id - self.delivered < self.capacity)
+            self.last_id += 1
+            self._events.append((self.last_id, event))
+            self._changed.notify_all()
+            return self.last_id
+
+    async def close(self):
+        """No more events - subscribers finish once they have everything"""
+        async with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+    async def _ack(self, event_id: int):
+        async with self._changed:
+            if event_id > self.delivered:
+                self.delivered = event_id
+                self._changed.notify_all()
+
+    async def subscribe(self, last_event_id: int = 0,
+                        keepalive: Optional[float] = None) -> AsyncIterator[Tuple[Optional[int], Optional[dict]]]:
+        """(event_id, event) after last_event_id until the buffer is closed
+
+        Yields (None, {"status": "events_missed", ...}) when events after last_event_id
+        have already left the ring, and (None, None) every `keepalive` seconds without events.
+        """
+        cursor = max(0, last_event_id)
+        self.subscribers += 1
+        try:
+            while True:
+                async with self._changed:
+                    try:
+                        await asyncio.wait_for(
+                            self._changed.wait_for(lambda: self.closed or self.last_id > cursor), keepalive)
+                    except asyncio.TimeoutError:
+                        pending = None
+                    else:
+                        missed = self.oldest_id - cursor - 1
+                        pending = [(event_id, event) for event_id, event in self._events if event_id > cursor]
+                if pending is None:
+                    yield None, None
+                    continue
+                if missed > 0:
+                    yield None, {"status": "events_missed", "missed": missed, "resumed_at": self.oldest_id}
+                    cursor = self.oldest_id - 1
+                if not pending:
+                    return  # Closed and fully delivered
+                for event_id, event in pending:
+                    yield event_id, event
+                    cursor = event_id
+                    await self._ack(event_id)
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers:
+                self.idle_since = time.monotonic()
+
+
+def sse_frame(event: Optional[dict], event_id: Optional[int] = None) -> str:
+    """One text/event-stream frame (a keep-alive comment for event=None)"""
+    if event is None:
+        return ": keep-alive\n\n"
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    return frame + f"data: {json.dumps(event, default=str)}\n\n"
+
+
+async def sse_frames(buffer: EventBuffer, last_event_id: int = 0, retry_ms: int = 3000,
+                     keepalive: float = 15.0) -> AsyncIterator[str]:
+    """A buffer subscription rendered as Server-Sent Events"""
+    yield f"retry: {retry_ms}\n\n"
+    async for event_id, event in buffer.subscribe(last_event_id, keepalive):
+        yield sse_frame(event, event_id)
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Last-Event-ID header / query value → event id (0 = from the start)"""
+    try:
+        return max(0, int(value or 0))
+    except ValueError:
+        return 0
+
+
+__all__ = ['EventBuffer', 'sse_frame', 'sse_frames', 'parse_last_event_id', 'SSE_MEDIA_TYPE', 'SSE_HEADERS']
@@ -0,0 +1,297 @@
+"""
+Analysis job scheduler
+Jobs (one log file each) are queued and run by a fixed pool of workers, so any number
+of submissions share a bounded amount of LLM traffic and event-loop time
+
+- JOB_WORKERS jobs run at once; the rest wait in the admission queue
+- Admission is FIFO, or by priority (higher first, FIFO within a priority)
+- Each job has its own status, progress (entries analysed, of how many), recent
+  events and throughput - nothing is shared between jobs
+- cancel() drops a queued job or cancels a running one (a cancelled analysis keeps
+  its checkpoint, so it can be resumed later)
+- Finished jobs are kept for inspection, the most recent `history` of them
+- Job snapshots are published to a StateStore (at submit, start and finish, and every
+  `sync_interval` seconds while queued or running), so every server worker can list,
+  inspect and cancel any job; a cancel for a job owned by another worker is a flag
+  in the store that the owner applies on its next sync
+- on_change(view) is called whenever a job is queued, starts or finishes
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from tools.state_store import MemoryStateStore, StateStore, worker_id
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+JOBS = "jobs"  # State store namespace of job snapshots
+FINISHED_TTL = 24 * 3600  # seconds a finished job's snapshot is kept in the store
+
+
+class Job:
+    """One scheduled analysis and its progress"""
+
+    def __init__(self, params: dict, priority: int = 0):
+        self.id = f"job_{uuid.uuid4().hex[:12]}"
+        self.worker = worker_id()
+        self.params = params
+        self.priority = priority
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.logs_processed = 0
+        self.total_entries: Optional[int] = None
+        self.session_id: Optional[str] = None  # The analysis run's session (results are saved under it)
+        self.current_log: Optional[str] = None
+        self.current_activity = "⏳ Queued"
+        self.events = deque(maxlen=30)
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def record(self, event_type: str, message: str):
+        """status_callback for the job's analysis"""
+        if event_type == "log":
+            self.current_log = message
+            return
+        if event_type == "session":
+            self.session_id = message
+            return
+        if event_type == "processing":
+            self.logs_processed += 1
+        self.current_activity = message
+        self.events.append({"type": event_type, "message": message, "time": datetime.now().strftime("%H:%M:%S")})
+
+    @property
+    def throughput(self) -> float:
+        """Entries analysed per second while running"""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return round(self.logs_processed / elapsed, 2) if elapsed > 0 else 0.0
+
+    def to_dict(self, queue_position: Optional[int] = None, include_events: bool = True) -> dict:
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        progress = None
+        if self.total_entries:
+            progress = round(min(1.0, self.logs_processed / self.total_entries), 4)
+        elif self.status == COMPLETED:
+            progress = 1.0
+        job = {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "params": self.params,
+            "session_id": self.session_id,
+            "queue_position": queue_position,
+            "worker": self.worker,
+            "submitted_at": iso(self.submitted_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "logs_processed": self.logs_processed,
+            "total_entries": self.total_entries,
+            "progress": progress,
+            "throughput_per_s": self.throughput,
+            "current_activity": self.current_activity,
+            "current_log": self.current_log,
+            "error": self.error
+        }
+        if include_events:
+            job["events"] = list(self.events)
+        return job
+
+
+class JobScheduler:
+    """Bounded worker pool running run_job(job) for submitted jobs"""
+
+    def __init__(self, run_job: Callable[[Job], Awaitable[None]], max_workers: int = 4, admission: str = "fifo",
+                 history: int = 100, store: Optional[StateStore] = None, sync_interval: float = 2.0,
+                 on_change: Optional[Callable[[dict], None]] = None):
+        if admission not in ("fifo", "priority"):
+            raise ValueError(f"Unknown admission policy {admission!r} (fifo or priority)")
+        self.run_job = run_job
+        self.max_workers = max(1, max_workers)
+        self.admission = admission
+        self.history = history
+        self.store = store or MemoryStateStore()
+        self.sync_interval = sync_interval
+        self.on_change = on_change
+        self.live_ttl = max(30.0, 10 * sync_interval)  # A dead worker's unfinished jobs vanish after this
+        self.jobs: Dict[str, Job] = {}  # This process's jobs
+        self._pending: List[tuple] = []  # heap of (sort key, sequence, job)
+        self._sequence = itertools.count()
+        self._changed: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+        self._sync_task: Optional[asyncio.Task] = None
+
+    # -- submitting --------------------------------------------------------
+
+    async def submit(self, params: dict, priority: int = 0) -> Job:
+        """Queue a job; it starts as soon as a worker is free and it is first in line"""
+        job = Job(params, priority)
+        self.jobs[job.id] = job
+        self._start_workers()
+        async with self._changed:
+            key = -priority if self.admission == "priority" else 0
+            heapq.heappush(self._pending, (key, next(self._sequence), job))
+            self._changed.notify()
+        await self._publish(job)
+        logger.info(f"📥 Job {job.id} queued ({len(self._pending)} waiting, "
+                    f"{self.running_count()}/{self.max_workers} running): {params.get('file_path')}")
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job, wherever it runs; returns its view (None if unknown)"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            snapshot = await self.store.aget(JOBS, job_id)
+            if snapshot is not None and snapshot["status"] not in FINISHED:
+                # Owned by another worker - it cancels the job on its next sync
+                await self.store.aupdate(JOBS, job_id, {"cancel_requested": True})
+                snapshot.update(cancel_requested=True, current_activity="🛑 Cancelling...")
+            return snapshot
+        if job.status == QUEUED:
+            self._pending = [item for item in self._pending if item[2] is not job]
+            heapq.heapify(self._pending)
+            await self._finish(job, CANCELLED)
+        elif job.status == RUNNING and job.task is not None:
+            job.current_activity = "🛑 Cancelling..."
+            job.task.cancel()
+        return self.view(job)
+
+    # -- inspecting --------------------------------------------------------
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        if job.status != QUEUED:
+            return None
+        order = [item[2] for item in sorted(self._pending, key=lambda item: item[:2])]
+        return order.index(job) + 1 if job in order else None
+
+    def running_count(self) -> int:
+        """Jobs running in this process"""
+        return sum(1 for job in self.jobs.values() if job.status == RUNNING)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """One job's view - live for this process's jobs, the last published snapshot for others"""
+        job = self.jobs.get(job_id)
+        return self.view(job) if job is not None else await self.store.aget(JOBS, job_id)
+
+    async def list_jobs(self, status: Optional[str] = None, include_events: bool = False) -> List[dict]:
+        """Jobs of every worker, oldest submission first"""
+        views = await self.store.aitems(JOBS)
+        views.update({job.id: self.view(job) for job in self.jobs.values()})
+        jobs = []
+        for view in views.values():
+            if status is None or view["status"] == status:
+                if not include_events:
+                    view.pop("events", None)
+                jobs.append(view)
+        return sorted(jobs, key=lambda view: view["submitted_at"])
+
+    async def stats(self) -> dict:
+        jobs = await self.list_jobs()
+        counts = {state: 0 for state in (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)}
+        for job in jobs:
+            counts[job["status"]] += 1
+        return {"max_workers": self.max_workers, "admission": self.admission, "job_counts": counts,
+                "throughput_per_s": round(sum(job["throughput_per_s"] for job in jobs
+                                              if job["status"] == RUNNING), 2)}
+
+    def view(self, job: Job) -> dict:
+        """Current view of one of this process's jobs"""
+        return job.to_dict(queue_position=self.queue_position(job))
+
+    async def _publish(self, job: Job):
+        ttl = FINISHED_TTL if job.status in FINISHED else self.live_ttl
+        view = self.view(job)
+        await self.store.aset(JOBS, job.id, view, ttl=ttl)
+        self._changed_job(view)
+
+    def _changed_job(self, view: dict):
+        if self.on_change is not None:
+            try:
+                self.on_change(view)
+            except Exception as e:
+                logger.warning(f"⚠ Job change listener failed for {view['job_id']}: {e}")
+
+    # -- workers -----------------------------------------------------------
+
+    def _start_workers(self):
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_workers:
+            self._workers.append(asyncio.create_task(self._worker()))
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync())
+
+    async def _sync(self):
+        """Refresh this process's unfinished jobs in the store and apply cancels requested elsewhere"""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            for job in [job for job in self.jobs.values() if job.status not in FINISHED]:
+                try:
+                    snapshot = await self.store.aget(JOBS, job.id)
+                    if snapshot and snapshot.get("cancel_requested"):
+                        logger.info(f"🛑 Job {job.id} cancelled from another worker")
+                        await self.cancel(job.id)
+                    elif not await self.store.aupdate(JOBS, job.id, self.view(job), ttl=self.live_ttl):
+                        await self._publish(job)
+                except Exception as e:
+                    logger.warning(f"⚠ Could not sync job {job.id}: {e}")
+
+    async def _worker(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._pending)
+                _, _, job = heapq.heappop(self._pending)
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.current_activity = "🚀 Starting analysis..."
+        view = self.view(job)
+        await self.store.aupdate(JOBS, job.id, view, ttl=self.live_ttl)
+        self._changed_job(view)
+        logger.info(f"▶️ Job {job.id} started: {job.params.get('file_path')}")
+        job.task = asyncio.create_task(self.run_job(job))
+        try:
+            await job.task
+        except asyncio.CancelledError:
+            if not job.task.cancelled():
+                raise  # The worker itself is being cancelled
+            await self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = str(e)
+            await self._finish(job, FAILED)
+        else:
+            await self._finish(job, COMPLETED)
+
+    async def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        job.task = None
+        job.record(status, f"Job {status}")
+        job.current_activity = {COMPLETED: "✅ Analysis complete!", CANCELLED: "🛑 Cancelled",
+                                FAILED: f"❌ Error: {job.error}"}[status]
+        await self._publish(job)
+        logger.info(f"⏹️ Job {job.id} {status} - {job.logs_processed} logs in "
+                    f"{(job.finished_at - (job.started_at or job.finished_at)):.1f}s")
+        finished = [j for j in self.jobs.values() if j.status in FINISHED]
+        for old in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(finished) - self.history)]:
+            self.jobs.pop(old.id, None)
+            await self.store.adelete(JOBS, old.id)
+
+
+__all__ = ['Job', 'JobScheduler', 'JOBS', 'QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED', 'FINISHED']
@@ -0,0 +1,209 @@
+"""
+Pluggable model backend: live Gemini, record, or offline replay
+Selected with LLM_BACKEND (gemini | record | replay) for every agent at creation time
+
+- gemini: the rate-limited live model (default)
+- record: live model, and every model call (request + all streamed responses,
+  including function calls and final texts + latency) is appended to a JSONL fixture
+- replay: no network - responses come from the fixture, with a configurable latency
+  distribution; tools still run locally, so function responses are reproduced too
+
+Calls are matched on model + system instruction + the last content of the request
+(function call ids stripped), which is what each model call actually answers. Repeated
+identical requests replay their recordings in order, cycling when exhausted.
+
+Replay latency (LLM_REPLAY_LATENCY): recorded | none | fixed:S | uniform:A,B |
+normal:MEAN,SD | lognormal:MU,SIGMA  (seconds), scaled by LLM_REPLAY_LATENCY_SCALE.
+On a replay miss LLM_REPLAY_ON_MISS=error raises, stub answers with a NORMAL analysis.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import AsyncGenerator, Dict, List, Union
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+from loguru import logger
+
+from tools.rate_limiter import RateLimitedGemini, rate_limited_model
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_FIXTURE_PATH = os.getenv("LLM_FIXTURE_PATH", "llm_fixtures/recording.jsonl")
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+LLM_REPLAY_ON_MISS = os.getenv("LLM_REPLAY_ON_MISS", "error").lower()
+LLM_REPLAY_SEED = os.getenv("LLM_REPLAY_SEED")
+
+_STUB_ANALYSIS = {
+    "application": "Unknown",
+    "classification": "NORMAL",
+    "severity": "LOW",
+    "component": "Unknown",
+    "likely_cause": "Replay stub - no recorded response for this request",
+    "recommendation": "No action required"
+}
+
+
+def _strip_ids(value):
+    if isinstance(value, dict):
+        return {k: _strip_ids(v) for k, v in value.items() if k != "id"}
+    if isinstance(value, list):
+        return [_strip_ids(v) for v in value]
+    return value
+
+
+def request_key(model: str, llm_request) -> str:
+    """Stable key for a model call (model, system instruction, last request content)"""
+    config = getattr(llm_request, "config", None)
+    system_instruction = str(getattr(config, "system_instruction", "") or "") if config else ""
+    contents = getattr(llm_request, "contents", None) or []
+    last = _strip_ids(contents[-1].model_dump(mode="json", exclude_none=True)) if contents else None
+    payload = json.dumps([model, system_instruction, last], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _request_preview(llm_request) -> str:
+    contents = getattr(llm_request, "contents", None) or []
+    if not contents:
+        return ""
+    return json.dumps(contents[-1].model_dump(mode="json", exclude_none=True), default=str)[:300]
+
+
+class Fixture:
+    """JSONL file of recorded model calls"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._loaded = False
+
+    def append(self, record: dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def _load(self):
+        if self._loaded:
+            return
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._records[record["key"]].append(record)
+        except FileNotFoundError:
+            logger.error(f"LLM fixture not found: {self.path} - record one with LLM_BACKEND=record")
+        self._loaded = True
+        logger.info(f"📼 Loaded {sum(len(r) for r in self._records.values())} recorded model calls from {self.path}")
+
+    def next_for(self, key: str):
+        with self._lock:
+            self._load()
+            records = self._records.get(key)
+            if not records:
+                return None
+            record = records[self._cursor[key] % len(records)]
+            self._cursor[key] += 1
+            return record
+
+
+_fixtures: Dict[str, Fixture] = {}
+_fixtures_lock = threading.Lock()
+
+
+def get_fixture(path: str = None) -> Fixture:
+    path = path or LLM_FIXTURE_PATH
+    with _fixtures_lock:
+        if path not in _fixtures:
+            _fixtures[path] = Fixture(path)
+        return _fixtures[path]
+
+
+class RecordingGemini(RateLimitedGemini):
+    """Live (rate-limited) Gemini that appends every call to the fixture"""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator:
+        key = request_key(self.model, llm_request)
+        started = time.monotonic()
+        responses = []
+        async for response in super().generate_content_async(llm_request, stream=stream):
+            responses.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+        get_fixture().append({
+            "key": key,
+            "model": self.model,
+            "request_preview": _request_preview(llm_request),
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "responses": responses,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        })
+
+
+def _latency_sampler(spec: str, rng: random.Random):
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "none":
+        return lambda recorded: 0.0
+    if kind == "fixed":
+        return lambda recorded: values[0]
+    if kind == "uniform":
+        return lambda recorded: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda recorded: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda recorded: rng.lognormvariate(values[0], values[1])
+    if kind != "recorded":
+        logger.warning(f"Unknown LLM_REPLAY_LATENCY '{spec}' - using recorded latencies")
+    return lambda recorded: recorded
+
+
+class ReplayLlm(BaseLlm):
+    """Offline model that answers from a recorded fixture"""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator:
+        key = request_key(self.model, llm_request)
+        record = get_fixture().next_for(key)
+        if record is None:
+            if LLM_REPLAY_ON_MISS != "stub":
+                raise LookupError(f"No recorded {self.model} response for request: {_request_preview(llm_request)[:120]}")
+            logger.warning(f"📼 Replay miss for {self.model} - answering with stub analysis")
+            record = {"latency_ms": 0, "responses": [LlmResponse(content=types.Content(
+                role="model",
+                parts=[types.Part(text=f"```json\n{json.dumps(_STUB_ANALYSIS, indent=2)}\n```")]
+            )).model_dump(mode="json", exclude_none=True)]}
+
+        delay = _replay_sampler(record.get("latency_ms", 0) / 1000) * LLM_REPLAY_LATENCY_SCALE
+        if delay > 0:
+            await asyncio.sleep(delay)
+        for response in record["responses"]:
+            yield LlmResponse.model_validate(response)
+
+
+_replay_sampler = _latency_sampler(LLM_REPLAY_LATENCY,
+                                   random.Random(int(LLM_REPLAY_SEED) if LLM_REPLAY_SEED else None))
+
+
+def create_model(model: str) -> Union[str, BaseLlm]:
+    """Model argument for LlmAgent according to LLM_BACKEND"""
+    if LLM_BACKEND == "record":
+        logger.info(f"📼 Recording {model} calls to {LLM_FIXTURE_PATH}")
+        return RecordingGemini(model=model)
+    if LLM_BACKEND == "replay":
+        logger.info(f"📼 Replaying {model} calls from {LLM_FIXTURE_PATH} (latency: {LLM_REPLAY_LATENCY})")
+        return ReplayLlm(model=model)
+    if LLM_BACKEND != "gemini":
+        logger.warning(f"Unknown LLM_BACKEND '{LLM_BACKEND}' - using live Gemini")
+    return rate_limited_model(model)
+
+
+__all__ = ['create_model', 'RecordingGemini', 'ReplayLlm', 'Fixture', 'get_fixture', 'request_key', 'LLM_BACKEND']
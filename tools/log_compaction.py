@@ -0,0 +1,134 @@
+"""
+Prompt compaction for multi-line log entries (Java / NiFi stack traces)
+Shrinks what is sent to the model; the original entry is still saved untouched
+
+- Recursive frames: runs of identical "at ..." lines collapse to one line + a repeat count
+- Each exception section (header, "Caused by:", "Suppressed:") keeps its first frames only
+- A "Caused by:" that repeats an earlier exception + message is dropped (nested wrappers)
+- If the entry is still over the token budget, frames per section are reduced, then the
+  middle of the cause chain is dropped (the top exception and root cause are always kept),
+  and as a last resort the text is cut with a marker
+
+Tokens are estimated at ~4 characters per token, which is close enough for budgeting.
+"""
+
+import re
+from typing import List, Tuple
+
+_FRAME = re.compile(r"^\s*at\s")
+_OMITTED = re.compile(r"^\s*\.\.\.\s*\d+\s+(?:more|common frames omitted)")
+_CAUSE = re.compile(r"^\s*(?:Caused by|Suppressed):\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class _Section:
+    __slots__ = ("header", "frames")
+
+    def __init__(self, header: List[str]):
+        self.header = header
+        self.frames: List[str] = []
+
+
+def _split_sections(lines: List[str]) -> List[_Section]:
+    sections = [_Section([lines[0]])]
+    for line in lines[1:]:
+        if _CAUSE.match(line):
+            sections.append(_Section([line]))
+        elif _FRAME.match(line) or _OMITTED.match(line):
+            sections[-1].frames.append(line)
+        elif sections[-1].frames:
+            sections.append(_Section([line]))  # Text after frames - e.g. a second logged exception
+        else:
+            sections[-1].header.append(line)
+    return sections
+
+
+def _collapse_repeats(frames: List[str]) -> List[str]:
+    collapsed = []
+    i = 0
+    while i < len(frames):
+        j = i
+        while j + 1 < len(frames) and frames[j + 1] == frames[i]:
+            j += 1
+        collapsed.append(frames[i])
+        if j > i:
+            collapsed.append(f"\t... previous frame repeated {j - i} more times")
+        i = j + 1
+    return collapsed
+
+
+def _render(sections: List[_Section], head_frames: int) -> Tuple[str, int]:
+    lines, dropped = [], 0
+    for section in sections:
+        lines.extend(section.header)
+        frames = [f for f in section.frames if not _OMITTED.match(f)]
+        lines.extend(frames[:head_frames])
+        hidden = len(frames) - head_frames
+        if hidden > 0:
+            lines.append(f"\t... {hidden} frames omitted")
+            dropped += hidden
+        lines.extend(f for f in section.frames if _OMITTED.match(f))  # Java's own "... N more"
+    return "\n".join(lines), dropped
+
+
+def compact_log_entry(log_entry: str, max_tokens: int = 1500, head_frames: int = 8) -> Tuple[str, dict]:
+    """Return (compacted entry, stats) - single-line entries come back unchanged"""
+    lines = log_entry.split("\n")
+    stats = {
+        "original_bytes": len(log_entry.encode()),
+        "original_tokens_est": estimate_tokens(log_entry),
+        "frames_dropped": 0,
+        "causes_dropped": 0,
+        "truncated": False,
+    }
+
+    if len(lines) > 1:
+        sections = _split_sections(lines)
+        for section in sections:
+            section.frames = _collapse_repeats(section.frames)
+
+        # Dedupe nested causes: keep the first occurrence of each "Caused by: Type: message"
+        seen, unique = set(), [sections[0]]
+        for section in sections[1:]:
+            key = _CAUSE.sub("", section.header[0]).strip()
+            if key in seen:
+                stats["causes_dropped"] += 1
+                continue
+            seen.add(key)
+            unique.append(section)
+        sections = unique
+
+        frames = head_frames
+        compacted, dropped = _render(sections, frames)
+        while estimate_tokens(compacted) > max_tokens and frames > 1:
+            frames //= 2
+            compacted, dropped = _render(sections, frames)
+
+        while estimate_tokens(compacted) > max_tokens and len(sections) > 2:
+            # Drop the middle of the chain - keep the top exception and the root cause
+            del sections[len(sections) // 2]
+            stats["causes_dropped"] += 1
+            compacted, dropped = _render(sections, frames)
+        stats["frames_dropped"] = dropped
+    else:
+        compacted = log_entry
+
+    max_chars = max_tokens * 4
+    if len(compacted) > max_chars:
+        marker = "\n... [truncated] ...\n"
+        keep = max(0, max_chars - len(marker))
+        tail = keep // 3
+        compacted = compacted[:keep - tail] + marker + (compacted[-tail:] if tail else "")
+        stats["truncated"] = True
+
+    stats["compacted_bytes"] = len(compacted.encode())
+    stats["compacted_tokens_est"] = estimate_tokens(compacted)
+    stats["bytes_saved"] = stats["original_bytes"] - stats["compacted_bytes"]
+    stats["tokens_saved_est"] = stats["original_tokens_est"] - stats["compacted_tokens_est"]
+    return compacted, stats
+
+
+__all__ = ['compact_log_entry', 'estimate_tokens']
@@ -0,0 +1,104 @@
+"""
+Follow (tail -F) reader for live log files
+Yields complete lines as they are appended, surviving rotation and truncation
+
+- Rotation: the path is re-stat'ed at EOF; when it points to a new inode the old
+  handle is drained to EOF first, then the new file is read from the start
+- Truncation (copytruncate): size smaller than our position → restart at 0
+- Idle: after idle_timeout seconds without new data an IDLE marker is yielded
+  once, so callers can flush an entry they were holding for continuation lines
+- An unterminated last line is held until its newline arrives; it is only
+  yielded as it is on rotation, truncation or stop
+- A RESET marker is yielded whenever reading restarts at byte 0 of a (new or
+  truncated) file, so callers tracking byte offsets can reset them
+- Polling backs off from poll_interval up to max_poll_interval while idle
+"""
+
+import os
+import time
+from typing import Iterator, Optional, Union
+
+from loguru import logger
+
+IDLE = object()  # Marker yielded once per idle period
+RESET = object()  # Marker yielded when reading restarts at offset 0
+
+
+def follow_lines(path: str, poll_interval: float = 0.25, max_poll_interval: float = 2.0,
+                 idle_timeout: float = 2.0, stop_event=None, start_offset: int = 0) -> Iterator[Union[bytes, object]]:
+    """Yield raw lines (bytes, newline included) from path forever, plus IDLE/RESET markers
+
+    stop_event: optional threading.Event that ends the generator at the next EOF
+    start_offset: byte offset to start reading at (must be a line start)
+    """
+    file = open(path, "rb")
+    file.seek(start_offset)
+    inode = os.fstat(file.fileno()).st_ino
+    partial = b""
+    idle_since: Optional[float] = None
+    idle_reported = False
+    rotated = False
+    delay = poll_interval
+
+    try:
+        while True:
+            chunk = file.readline()
+            if chunk:
+                if not chunk.endswith(b"\n"):
+                    partial += chunk  # Writer is mid-line - wait for the rest
+                    continue
+                line, partial = partial + chunk, b""
+                idle_since, idle_reported, delay = None, False, poll_interval
+                yield line
+                continue
+
+            # --- EOF ---
+            if rotated:
+                # Old file drained - switch to the new one
+                if partial:
+                    yield partial
+                    partial = b""
+                file.close()
+                file = open(path, "rb")
+                inode = os.fstat(file.fileno()).st_ino
+                rotated = False
+                logger.info(f"🔄 Log rotated - following new file: {path}")
+                yield RESET
+                continue
+
+            if stop_event is not None and stop_event.is_set():
+                if partial:
+                    yield partial
+                return
+
+            now = time.monotonic()
+            if idle_since is None:
+                idle_since = now
+            elif not idle_reported and now - idle_since >= idle_timeout:
+                idle_reported = True  # A held partial line stays held - the writer may still finish it
+                yield IDLE
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None  # Between rename and re-create - keep waiting
+
+            if stat is not None and stat.st_ino != inode:
+                rotated = True
+                continue
+            if stat is not None and stat.st_size < file.tell():
+                logger.info(f"✂️ Log truncated - re-reading from start: {path}")
+                if partial:
+                    yield partial  # Its rest is gone with the truncation
+                    partial = b""
+                file.seek(0)
+                yield RESET
+                continue
+
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+    finally:
+        file.close()
+
+
+__all__ = ['follow_lines', 'IDLE', 'RESET']
@@ -1,11 +1,15 @@
 from google.adk.tools import FunctionTool
 from loguru import logger
+from tools.nifi_correlation import correlation_window
+from tools.nifi_log_set import active_log_file, list_nifi_log_files, open_log, search_log_set
+from tools.timestamp_parser import parse_timestamp_ms
 
 def search_nifi_logs_by_timestamp(timestamp: str) -> dict:
     """Search NiFi infrastructure logs around a timestamp for correlation.
     
     Args:
-        timestamp: Time in HH:MM:SS format (e.g., "10:00:09")
+        timestamp: Time in HH:MM:SS format (e.g., "10:00:09"), or "YYYY-MM-DD HH:MM:SS"
+                   when the error is not from the current NiFi log's day
         
     Returns:
         Dictionary with NiFi logs and correlation analysis
@@ -13,12 +17,8 @@ def search_nifi_logs_by_timestamp(timestamp: str) -> dict:
     logger.info(f"NIFI TOOL CALLED: search_nifi_logs_by_timestamp({timestamp})")
     logger.info(f"Agent 1 is requesting NiFi correlation for timestamp: {timestamp}")
     
-    # Find NiFi log files dynamically
-    import os
-    import glob
-    
-    nifi_log_pattern = "logs/nifi_app/nifi-app.log"
-    nifi_files = glob.glob(nifi_log_pattern)
+    # Find NiFi log files dynamically - the active log plus rotated/compressed archives
+    nifi_files = list_nifi_log_files()
     
     if not nifi_files:
         logger.warning("No NiFi log files found in logs/nifi_app/")
@@ -29,65 +29,69 @@ def search_nifi_logs_by_timestamp(timestamp: str) -> dict:
             "nifi_logs_found": 0
         }
     
-    # Use the most recent NiFi log file
-    nifi_file = max(nifi_files, key=os.path.getctime)
-    logger.info(f"Using dynamic NiFi log file: {nifi_file}")
+    nifi_file = active_log_file()
+    logger.info(f"Using NiFi log set: {len(nifi_files)} files (active: {nifi_file})")
     
     try:
         # Parse the target timestamp to find logs within 2 seconds before
         from datetime import datetime, timedelta
         
         try:
-            # Extract date dynamically from the first line of the log file
-            log_date = None
-            with open(nifi_file, 'r') as f:
-                first_line = f.readline().strip()
-                if first_line and len(first_line) >= 10:
-                    log_date = first_line[:10]  # Extract "YYYY-MM-DD"
-            
-            if not log_date:
-                raise ValueError("Could not extract date from log file")
-            
-            # Parse target timestamp with extracted date
-            target_dt = datetime.strptime(f"{log_date} {timestamp}", "%Y-%m-%d %H:%M:%S")
-            logger.info(f"Using extracted log date: {log_date} for timestamp {timestamp}")
+            timestamp = timestamp.strip()
+            if len(timestamp) > 8:
+                # Full "YYYY-MM-DD HH:MM:SS[,mmm]" timestamp - no date guessing needed
+                target_dt = datetime.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S")
+            else:
+                # Extract date dynamically from the first line of the active log file
+                log_date = None
+                with open_log(nifi_file) as f:
+                    first_line = f.readline().decode("utf-8", errors="replace").strip()
+                    if first_line and len(first_line) >= 10:
+                        log_date = first_line[:10]  # Extract "YYYY-MM-DD"
+                
+                if not log_date:
+                    raise ValueError("Could not extract date from log file")
+                
+                # Parse target timestamp with extracted date
+                target_dt = datetime.strptime(f"{log_date} {timestamp}", "%Y-%m-%d %H:%M:%S")
+                logger.info(f"Using extracted log date: {log_date} for timestamp {timestamp}")
             start_time = target_dt - timedelta(seconds=2)  # 2 seconds before
             end_time = target_dt + timedelta(seconds=1)    # Include same second with milliseconds
             
-            matching_logs = []
-            with open(nifi_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            # Extract timestamp from log line (first 23 characters: "2025-09-14 10:01:09,437")
-                            log_timestamp_str = line[:23]
-                            log_dt = datetime.strptime(log_timestamp_str, "%Y-%m-%d %H:%M:%S,%f")
-                            
-                            # Check if log is between start_time and end_time
-                            if start_time <= log_dt <= end_time:
-                                matching_logs.append(line.strip())
-                        except (ValueError, IndexError):
-                            continue
+            # Only files whose time range overlaps the window are read; each is searched via
+            # its time index / mmap (or streamed if gzipped) and the results merged by time
+            start_ms = parse_timestamp_ms(start_time.strftime("%Y-%m-%d %H:%M:%S,000"))
+            end_ms = parse_timestamp_ms(end_time.strftime("%Y-%m-%d %H:%M:%S,000"))
+            window = correlation_window(start_ms, end_ms)
+            if window is not None:
+                # Precomputed by the sweep join over the whole application log
+                logger.info(f"🧭 NiFi window for {timestamp} served from the correlation map")
+                matching_logs, logs_found = window.lines, window.total
+            else:
+                matching_logs = search_log_set(start_ms, end_ms)
+                logs_found = len(matching_logs)
         except ValueError:
             # Fallback: simple string matching for exact timestamp
             matching_logs = []
-            with open(nifi_file, 'r') as f:
+            with open_log(nifi_file) as f:
                 for line in f:
+                    line = line.decode("utf-8", errors="replace")
                     if timestamp in line:
                         matching_logs.append(line.strip())
+            logs_found = len(matching_logs)
         
         # Return top 10 relevant logs
         result = {
             "status": "success",
             "timestamp_searched": timestamp,
-            "nifi_logs_found": len(matching_logs),
+            "nifi_logs_found": logs_found,
             "nifi_infrastructure_logs": matching_logs[:10],
             "search_scope": f"NiFi infrastructure logs around {timestamp}",
             "correlation_ready": True
         }
         
-        logger.info(f"📊 Found {len(matching_logs)} NiFi infrastructure logs around {timestamp}")
-        logger.info(f"✅ NIFI TOOL COMPLETED: Returning {len(matching_logs)} logs to Agent 1")
+        logger.info(f"📊 Found {logs_found} NiFi infrastructure logs around {timestamp}")
+        logger.info(f"✅ NIFI TOOL COMPLETED: Returning {logs_found} logs to Agent 1")
         return result
         
     except Exception as e:
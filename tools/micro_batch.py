@@ -0,0 +1,87 @@
+"""
+Micro-batching for LLM calls
+Collects items submitted from concurrent tasks and runs them as one batch
+
+A batch is flushed when it reaches max_items, when the next item would push it
+over max_tokens, or max_wait seconds after its first item arrived (so a quiet
+followed log never strands entries). Each submit() returns a future resolved
+with that item's result; run_batch must return one result per item, None
+meaning "no usable result - handle this item on its own".
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from loguru import logger
+
+
+class MicroBatcher:
+    """Groups submitted items into batches for run_batch(items) -> results"""
+
+    def __init__(self, run_batch: Callable[[list], Awaitable[list]], max_items: int = 10,
+                 max_tokens: int = 8000, max_wait: float = 2.0):
+        self.run_batch = run_batch
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.max_wait = max_wait
+        self._items: list = []
+        self._futures: List[asyncio.Future] = []
+        self._tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.batches_run = 0
+
+    def submit(self, item, tokens: int = 0) -> asyncio.Future:
+        """Queue an item; the returned future resolves to its result (or None)"""
+        if self._items and self._tokens + tokens > self.max_tokens:
+            self.flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        self._tokens += tokens
+
+        if len(self._items) >= self.max_items:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        """Start running whatever is queued"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures, self._tokens = [], [], 0
+        task = asyncio.create_task(self._run(items, futures))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, items: list, futures: List[asyncio.Future]):
+        self.batches_run += 1
+        try:
+            results = list(await self.run_batch(items))
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}")
+            results = []
+        results += [None] * (len(items) - len(results))
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def cancel(self):
+        """Drop queued items and stop running batches"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for future in self._futures:
+            future.cancel()
+        self._items, self._futures, self._tokens = [], [], 0
+        for task in list(self._running):
+            task.cancel()
+
+
+__all__ = ['MicroBatcher']
@@ -0,0 +1,180 @@
+"""
+Single-pass correlation of application ERROR entries with NiFi log windows
+Both logs are written in time order, so instead of one NiFi lookup per error the
+windows for a whole application log are collected in one sweep over both files
+
+- Pre-pass over the application log: (log_index, epoch_ms) of every ERROR entry,
+  numbered exactly like process_log_file numbers entries
+- Sweep: the NiFi log set is streamed once in time order (rotated files merged);
+  a buffer holds the NiFi lines of the current window and every ERROR window is
+  filled from it with two pointers - overlapping windows share the buffer
+- The resulting map is keyed by log index; while registered, NiFi tool lookups for
+  the same window are answered from memory (see correlation_window)
+
+Windows use the NiFi tool's bounds: from 2 s before the error's second up to the
+end of that second. NiFi lines written after the sweep are not seen, so the map
+is meant for analysing files that are complete (not follow mode).
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from tools.nifi_log_set import NIFI_LOG_DIR, file_time_ranges, list_nifi_log_files, open_log
+from tools.timestamp_parser import parse_timestamp_ms
+
+WINDOW_BEFORE_MS = 2000
+WINDOW_AFTER_MS = 1000
+MAX_WINDOW_LINES = 10  # Lines kept per window - the NiFi tool returns the first 10 too
+
+
+def nifi_window(entry_ms: int) -> Tuple[int, int]:
+    """[start_ms, end_ms] NiFi window for an entry logged at entry_ms"""
+    second = entry_ms - entry_ms % 1000
+    return second - WINDOW_BEFORE_MS, second + WINDOW_AFTER_MS
+
+
+class NifiWindow:
+    __slots__ = ("start_ms", "end_ms", "lines", "total")
+
+    def __init__(self, start_ms: int, end_ms: int):
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.lines: List[str] = []
+        self.total = 0
+
+
+def error_entries(log_file_path: str, start_offset: int = 0, first_index: int = 1) -> List[Tuple[int, int]]:
+    """(log_index, epoch_ms) of each ERROR entry - an entry starts at every timestamped line"""
+    errors = []
+    log_index = first_index - 1
+    with open(log_file_path, "rb") as f:
+        f.seek(start_offset)
+        for line in f:
+            ts = parse_timestamp_ms(line)
+            if ts is None:
+                continue  # Continuation line of the current entry
+            log_index += 1
+            if b" ERROR " in line:
+                errors.append((log_index, ts))
+    return errors
+
+
+def _timestamped_lines(path: str, start_ms: int, end_ms: int) -> Iterator[Tuple[int, bytes]]:
+    with open_log(path) as f:
+        for line in f:
+            ts = parse_timestamp_ms(line)
+            if ts is None or ts < start_ms:
+                continue
+            if ts > end_ms:
+                return
+            yield ts, line
+
+
+def iter_nifi_lines(start_ms: int, end_ms: int, log_dir: str = NIFI_LOG_DIR) -> Iterator[Tuple[int, bytes]]:
+    """Timestamped NiFi lines in [start_ms, end_ms] across the log set, in time order"""
+    files = list_nifi_log_files(log_dir)
+    ranges = file_time_ranges(files)
+    streams = []
+    for path in files:
+        min_ms, max_ms = ranges.get(path, (None, None))
+        if min_ms is None or max_ms < start_ms or min_ms > end_ms:
+            continue
+        streams.append(_timestamped_lines(path, start_ms, end_ms))
+    return heapq.merge(*streams, key=lambda item: item[0])
+
+
+def sweep_join(errors: Iterable[Tuple[int, int]], nifi_lines: Iterator[Tuple[int, bytes]],
+               max_lines: int = MAX_WINDOW_LINES) -> Dict[int, NifiWindow]:
+    """Fill the NiFi window of every (log_index, epoch_ms) error in one pass over time-ordered NiFi lines"""
+    windows = {}
+    buffer = deque()  # (ts, line) of NiFi lines not older than the current window start
+    pending = None
+    for log_index, entry_ms in sorted(errors, key=lambda item: item[1]):
+        start_ms, end_ms = nifi_window(entry_ms)
+        window = NifiWindow(start_ms, end_ms)
+        while buffer and buffer[0][0] < start_ms:
+            buffer.popleft()
+        while True:
+            if pending is None:
+                pending = next(nifi_lines, None)
+                if pending is None:
+                    break
+            if pending[0] > end_ms:
+                break
+            if pending[0] >= start_ms:
+                buffer.append((pending[0], pending[1].decode("utf-8", errors="replace").strip()))
+            pending = None
+        window.total = len(buffer)
+        window.lines = [line for _, line in buffer][:max_lines]
+        windows[log_index] = window
+    return windows
+
+
+class NifiCorrelationMap:
+    """NiFi windows for the ERROR entries of one application log, keyed by log index"""
+
+    def __init__(self, windows: Dict[int, NifiWindow], stats: dict):
+        self.windows = windows
+        self.stats = stats
+        self._by_range = {(w.start_ms, w.end_ms): w for w in windows.values()}
+
+    @classmethod
+    def build(cls, log_file_path: str, start_offset: int = 0, first_index: int = 1,
+              log_dir: str = NIFI_LOG_DIR) -> "NifiCorrelationMap":
+        started = time.perf_counter()
+        errors = error_entries(log_file_path, start_offset, first_index)
+        windows = {}
+        if errors:
+            first_ms = min(ts for _, ts in errors)
+            last_ms = max(ts for _, ts in errors)
+            windows = sweep_join(errors, iter_nifi_lines(nifi_window(first_ms)[0], nifi_window(last_ms)[1], log_dir))
+        stats = {
+            "error_entries": len(errors),
+            "windows_with_nifi_lines": sum(1 for w in windows.values() if w.total),
+            "build_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        logger.info(f"🧭 NiFi sweep join: {stats['error_entries']} ERROR entries, "
+                    f"{stats['windows_with_nifi_lines']} with NiFi lines, in {stats['build_ms']} ms")
+        return cls(windows, stats)
+
+    def get(self, log_index: int) -> Optional[NifiWindow]:
+        return self.windows.get(log_index)
+
+    def window(self, start_ms: int, end_ms: int) -> Optional[NifiWindow]:
+        return self._by_range.get((start_ms, end_ms))
+
+
+_active_maps: List[NifiCorrelationMap] = []
+_active_lock = threading.Lock()
+
+
+def register_map(correlation_map: NifiCorrelationMap):
+    """Serve NiFi tool lookups from this map until unregister_map"""
+    with _active_lock:
+        _active_maps.append(correlation_map)
+
+
+def unregister_map(correlation_map: NifiCorrelationMap):
+    with _active_lock:
+        if correlation_map in _active_maps:
+            _active_maps.remove(correlation_map)
+
+
+def correlation_window(start_ms: int, end_ms: int) -> Optional[NifiWindow]:
+    """A precomputed NiFi window for exactly [start_ms, end_ms], if a registered map has one"""
+    with _active_lock:
+        maps = list(_active_maps)
+    for correlation_map in maps:
+        window = correlation_map.window(start_ms, end_ms)
+        if window is not None:
+            return window
+    return None
+
+
+__all__ = ['NifiCorrelationMap', 'NifiWindow', 'nifi_window', 'error_entries', 'iter_nifi_lines', 'sweep_join',
+           'register_map', 'unregister_map', 'correlation_window', 'MAX_WINDOW_LINES']
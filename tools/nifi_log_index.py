@@ -0,0 +1,319 @@
+"""
+Sidecar time index for NiFi logs
+Maps log timestamps to byte offsets so window lookups can seek instead of scan
+
+Index layout (<log>.tidx, little-endian):
+- Header: magic, inode, indexed_bytes, fingerprint of the first line
+- Body: (epoch_ms, byte_offset) pairs, one per INDEX_STRIDE bytes of log
+
+NiFi writes nifi-app.log in time order, so a sparse index is enough: seek to the
+last indexed line older than the window start and read forward until the window
+end. The index is extended incrementally as the log grows and rebuilt when the
+file is rotated or truncated.
+
+When no usable sidecar exists yet (first lookup, freshly rotated file) the
+window is found by binary search over a memory-mapped view of the log while
+the index is built in a background thread.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+from tools.timestamp_parser import NO_TIMESTAMP, TIMESTAMP_WIDTH, parse_lines, parse_timestamp_ms
+
+INDEX_SUFFIX = ".tidx"
+INDEX_STRIDE = 16 * 1024  # bytes of log between index entries
+_SEARCH_CHUNK = 64 * 1024
+
+_MAGIC = b"NTIDX001"
+_HEADER = struct.Struct("<8sqqI")
+
+_index_cache: Dict[str, "NifiTimeIndex"] = {}
+_index_locks: Dict[str, threading.Lock] = {}
+_index_builds: Set[str] = set()
+_registry_lock = threading.Lock()
+
+
+def _line_start_at_or_after(mm: mmap.mmap, pos: int) -> int:
+    if pos <= 0:
+        return 0
+    newline = mm.find(b"\n", pos - 1)
+    return newline + 1 if newline != -1 else len(mm)
+
+
+def _fingerprint(path: str) -> int:
+    """CRC of the first line - detects a rotated file that reused the inode"""
+    with open(path, "rb") as f:
+        return zlib.crc32(f.readline(4096))
+
+
+class NifiTimeIndex:
+    """Sparse timestamp → byte offset index stored next to a NiFi log file"""
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.index_path = log_path + INDEX_SUFFIX
+        self.inode = 0
+        self.indexed_bytes = 0
+        self.fingerprint = 0
+        self.timestamps = array("q")
+        self.offsets = array("q")
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self) -> bool:
+        """Load the sidecar from disk, returns False if missing or unreadable"""
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(_HEADER.size)
+                if len(header) != _HEADER.size:
+                    return False
+                magic, inode, indexed_bytes, fingerprint = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    return False
+                pairs = array("q")
+                body = f.read()
+        except OSError:
+            return False
+
+        # Drop a torn trailing pair left by a crash mid-append
+        body = body[:len(body) - len(body) % 16]
+        pairs.frombytes(body)
+        self.inode, self.indexed_bytes, self.fingerprint = inode, indexed_bytes, fingerprint
+        self.timestamps = pairs[0::2]
+        self.offsets = pairs[1::2]
+        return True
+
+    def _write_header(self, f):
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, self.inode, self.indexed_bytes, self.fingerprint))
+
+    def _reset(self, stat):
+        self.inode = stat.st_ino
+        self.indexed_bytes = 0
+        self.fingerprint = _fingerprint(self.log_path)
+        self.timestamps = array("q")
+        self.offsets = array("q")
+        with open(self.index_path, "wb") as f:
+            self._write_header(f)
+
+    # ------------------------------------------------------------------
+    # Build / extend
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        """Bring the index up to date with the log file (build, extend or rebuild)"""
+        stat = os.stat(self.log_path)
+
+        stale = (
+            stat.st_ino != self.inode
+            or stat.st_size < self.indexed_bytes
+            or (stat.st_size > 0 and _fingerprint(self.log_path) != self.fingerprint)
+        )
+        if stale:
+            if self.indexed_bytes:
+                logger.info(f"🔄 NiFi log rotated or truncated - rebuilding index for {self.log_path}")
+            self._reset(stat)
+
+        if stat.st_size > self.indexed_bytes:
+            self._extend()
+
+    def _extend(self):
+        """Index complete lines appended since the last refresh, jumping INDEX_STRIDE bytes at a time"""
+        new_pairs = array("q")
+
+        with open(self.log_path, "rb") as log, mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Partial last line still being written - index it next time
+            complete = mm.rfind(b"\n", self.indexed_bytes) + 1
+            if complete <= self.indexed_bytes:
+                return
+
+            last_offset = self.offsets[-1] if self.offsets else -INDEX_STRIDE
+            pos = _line_start_at_or_after(mm, max(self.indexed_bytes, last_offset + INDEX_STRIDE))
+            while pos < complete:
+                ts = parse_timestamp_ms(mm[pos:pos + TIMESTAMP_WIDTH])
+                if ts is None:
+                    pos = _line_start_at_or_after(mm, pos + 1)
+                    continue
+                new_pairs.append(ts)
+                new_pairs.append(pos)
+                pos = _line_start_at_or_after(mm, pos + INDEX_STRIDE)
+
+        self.timestamps.extend(new_pairs[0::2])
+        self.offsets.extend(new_pairs[1::2])
+        logger.debug(f"NiFi index extended: {self.indexed_bytes} → {complete} bytes, "
+                     f"+{len(new_pairs) // 2} entries")
+        self.indexed_bytes = complete
+
+        with open(self.index_path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.write(new_pairs.tobytes())
+            f.flush()
+            # Header last: a crash before this point just re-indexes the tail
+            self._write_header(f)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def seek_offset(self, start_ms: int) -> int:
+        """Byte offset of the last indexed line strictly older than start_ms"""
+        pos = bisect_left(self.timestamps, start_ms)
+        return self.offsets[pos - 1] if pos else 0
+
+    def search(self, start_ms: int, end_ms: int) -> List[str]:
+        """Return stripped lines whose timestamp falls in [start_ms, end_ms]"""
+        matching = []
+        with open(self.log_path, "rb") as f:
+            f.seek(self.seek_offset(start_ms))
+            carry = b""
+            while True:
+                chunk = f.read(_SEARCH_CHUNK)
+                lines = (carry + chunk).split(b"\n")
+                carry = lines.pop() if chunk else b""
+                # Bulk-parse the whole chunk, then filter
+                for line, ts in zip(lines, parse_lines(lines)):
+                    if ts == NO_TIMESTAMP:
+                        continue
+                    if ts > end_ms:
+                        return matching
+                    if ts >= start_ms:
+                        matching.append(line.decode("utf-8", errors="replace").strip())
+                if not chunk:
+                    return matching
+
+
+def _index_lock(log_path: str) -> threading.Lock:
+    with _registry_lock:
+        return _index_locks.setdefault(log_path, threading.Lock())
+
+
+def get_time_index(log_path: str) -> NifiTimeIndex:
+    """Return an up-to-date index for log_path, loading or building the sidecar as needed"""
+    with _index_lock(log_path):
+        index = _index_cache.get(log_path)
+        if index is None:
+            index = NifiTimeIndex(log_path)
+            if index._load():
+                logger.info(f"📇 Loaded NiFi time index: {index.index_path} ({len(index.offsets)} entries)")
+            else:
+                logger.info(f"📇 Building NiFi time index: {index.index_path}")
+            _index_cache[log_path] = index
+        index.refresh()
+        return index
+
+
+def _usable_index(log_path: str) -> Optional[NifiTimeIndex]:
+    """Return the index only if it already matches the current file (no rebuild needed)"""
+    with _index_lock(log_path):
+        index = _index_cache.get(log_path)
+        if index is None:
+            index = NifiTimeIndex(log_path)
+            if not index._load():
+                return None
+            _index_cache[log_path] = index
+        stat = os.stat(log_path)
+        if stat.st_ino != index.inode or stat.st_size < index.indexed_bytes:
+            return None
+        if stat.st_size and _fingerprint(log_path) != index.fingerprint:
+            return None
+    return get_time_index(log_path)
+
+
+def _build_index_in_background(log_path: str):
+    """Build/rebuild the sidecar off the request path, at most one build per file"""
+    with _registry_lock:
+        if log_path in _index_builds:
+            return
+        _index_builds.add(log_path)
+
+    def build():
+        try:
+            get_time_index(log_path)
+        except Exception as e:
+            logger.warning(f"⚠ NiFi time index build failed for {log_path}: {e}")
+        finally:
+            with _registry_lock:
+                _index_builds.discard(log_path)
+
+    threading.Thread(target=build, name=f"nifi-index-{os.path.basename(log_path)}", daemon=True).start()
+
+
+# ----------------------------------------------------------------------
+# Index-free lookup: binary search over a memory-mapped log
+# ----------------------------------------------------------------------
+
+def _next_timestamped_line(mm: mmap.mmap, pos: int, limit: int):
+    """First (offset, epoch_ms) of a timestamped line starting in [pos, limit), else (limit, None)"""
+    pos = _line_start_at_or_after(mm, pos)
+    while pos < limit:
+        ts = parse_timestamp_ms(mm[pos:pos + TIMESTAMP_WIDTH])
+        if ts is not None:
+            return pos, ts
+        pos = _line_start_at_or_after(mm, pos + 1)
+    return limit, None
+
+
+def mmap_search(log_path: str, start_ms: int, end_ms: int) -> List[str]:
+    """Binary-search a time-ordered log for lines in [start_ms, end_ms] without an index"""
+    with open(log_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Invariant: timestamped lines starting before lo are older than start_ms,
+            # and none starting at or after hi are
+            lo, hi = 0, len(mm)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                pos, ts = _next_timestamped_line(mm, mid, hi)
+                if ts is None or ts >= start_ms:
+                    hi = mid
+                else:
+                    lo = pos + 1
+
+            matching = []
+            size = len(mm)
+            pos = _line_start_at_or_after(mm, lo)
+            while pos < size:
+                newline = mm.find(b"\n", pos)
+                end = newline if newline != -1 else size
+                ts = parse_timestamp_ms(mm[pos:pos + TIMESTAMP_WIDTH])
+                if ts is not None:
+                    if ts > end_ms:
+                        break
+                    if ts >= start_ms:
+                        matching.append(mm[pos:end].decode("utf-8", errors="replace").strip())
+                pos = end + 1
+            return matching
+
+
+def search_window(log_path: str, start_ms: int, end_ms: int) -> List[str]:
+    """Lines of log_path in [start_ms, end_ms] - sidecar index if usable, otherwise mmap binary search"""
+    try:
+        index = _usable_index(log_path)
+    except OSError as e:
+        logger.warning(f"⚠ NiFi time index unavailable for {log_path}: {e}")
+        return mmap_search(log_path, start_ms, end_ms)
+
+    if index is not None:
+        return index.search(start_ms, end_ms)
+
+    logger.info(f"🔎 No usable time index for {log_path} - using mmap binary search")
+    _build_index_in_background(log_path)
+    return mmap_search(log_path, start_ms, end_ms)
+
+
+__all__ = [
+    'NifiTimeIndex', 'get_time_index', 'mmap_search', 'search_window',
+    'INDEX_SUFFIX', 'INDEX_STRIDE'
+]
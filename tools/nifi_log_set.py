@@ -0,0 +1,194 @@
+"""
+Rotated NiFi log set search
+Treats nifi-app.log plus its rotated (and gzipped) siblings as one time-ordered stream
+
+- Discovers every nifi-app*.log / nifi-app*.log.gz file in the NiFi log directory
+- Keeps per-file min/max timestamps in a small JSON cache keyed by mtime + size,
+  so an archive is only read once to learn its time range
+- For a window lookup, only files whose range overlaps the window are opened:
+  plain files go through the time index / mmap search, archives are decompressed
+  as a stream and abandoned as soon as the window has passed
+- Per-file results are k-way merged by timestamp with heapq.merge
+"""
+
+import glob
+import gzip
+import heapq
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from tools.nifi_log_index import search_window
+from tools.timestamp_parser import parse_timestamp_ms
+
+NIFI_LOG_DIR = "logs/nifi_app"
+ACTIVE_LOG_NAME = "nifi-app.log"
+RANGES_CACHE_NAME = ".nifi-app.ranges.json"
+_FILE_PATTERNS = ("nifi-app*.log", "nifi-app*.log.gz")
+_TAIL_PROBE = 64 * 1024
+
+_ranges_lock = threading.Lock()
+_ranges_cache: Dict[str, Dict[str, dict]] = {}  # log_dir -> {filename: range entry}
+
+
+def list_nifi_log_files(log_dir: str = NIFI_LOG_DIR) -> List[str]:
+    """All NiFi log files (active and rotated), oldest first"""
+    files = set()
+    for pattern in _FILE_PATTERNS:
+        files.update(glob.glob(os.path.join(log_dir, pattern)))
+    return sorted(files, key=lambda f: (os.path.basename(f) == ACTIVE_LOG_NAME, os.path.getmtime(f), f))
+
+
+def active_log_file(log_dir: str = NIFI_LOG_DIR) -> Optional[str]:
+    """The log NiFi is currently writing to (nifi-app.log, else the newest file)"""
+    files = list_nifi_log_files(log_dir)
+    if not files:
+        return None
+    active = os.path.join(log_dir, ACTIVE_LOG_NAME)
+    return active if active in files else files[-1]
+
+
+# ----------------------------------------------------------------------
+# Per-file time ranges
+# ----------------------------------------------------------------------
+
+def open_log(path: str):
+    """Open a NiFi log in binary mode, transparently decompressing rotated .gz archives"""
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _first_timestamp(path: str) -> Optional[int]:
+    with open_log(path) as f:
+        for line in f:
+            ts = parse_timestamp_ms(line)
+            if ts is not None:
+                return ts
+    return None
+
+
+def _last_timestamp(path: str) -> Optional[int]:
+    if path.endswith(".gz"):
+        # Archives can't be read backwards - one streaming pass, cached by mtime afterwards
+        last = None
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                ts = parse_timestamp_ms(line)
+                if ts is not None:
+                    last = ts
+        return last
+
+    size = os.path.getsize(path)
+    probe = _TAIL_PROBE
+    with open(path, "rb") as f:
+        while True:
+            f.seek(max(0, size - probe))
+            lines = f.read(probe).split(b"\n")
+            if size > probe:
+                lines = lines[1:]  # First line of the probe is probably partial
+            for line in reversed(lines):
+                ts = parse_timestamp_ms(line)
+                if ts is not None:
+                    return ts
+            if probe >= size:
+                return None
+            probe *= 4
+
+
+def _load_ranges(log_dir: str) -> Dict[str, dict]:
+    if log_dir not in _ranges_cache:
+        try:
+            with open(os.path.join(log_dir, RANGES_CACHE_NAME)) as f:
+                _ranges_cache[log_dir] = json.load(f)
+        except (OSError, ValueError):
+            _ranges_cache[log_dir] = {}
+    return _ranges_cache[log_dir]
+
+
+def _save_ranges(log_dir: str, ranges: Dict[str, dict]):
+    path = os.path.join(log_dir, RANGES_CACHE_NAME)
+    try:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(ranges, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug(f"Could not persist NiFi range cache: {e}")
+
+
+def file_time_ranges(files: List[str]) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """(min_ms, max_ms) for each file, recomputed only when mtime or size changed"""
+    result = {}
+    with _ranges_lock:
+        dirty = set()
+        for path in files:
+            log_dir, name = os.path.split(path)
+            ranges = _load_ranges(log_dir)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Rotated away since it was listed
+            entry = ranges.get(name)
+            if not entry or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+                entry = {
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "min_ms": _first_timestamp(path),
+                    "max_ms": _last_timestamp(path),
+                }
+                ranges[name] = entry
+                dirty.add(log_dir)
+                logger.debug(f"NiFi range refreshed for {name}: {entry['min_ms']} → {entry['max_ms']}")
+            result[path] = (entry["min_ms"], entry["max_ms"])
+
+        for log_dir in dirty:
+            ranges = _ranges_cache[log_dir]
+            present = {os.path.basename(p) for p in files if os.path.dirname(p) == log_dir}
+            for name in [n for n in ranges if n not in present]:
+                del ranges[name]  # Drop rotated-away files
+            _save_ranges(log_dir, ranges)
+    return result
+
+
+# ----------------------------------------------------------------------
+# Window search across the set
+# ----------------------------------------------------------------------
+
+def _plain_window(path: str, start_ms: int, end_ms: int) -> Iterator[Tuple[int, str]]:
+    for line in search_window(path, start_ms, end_ms):
+        yield parse_timestamp_ms(line), line
+
+
+def _gzip_window(path: str, start_ms: int, end_ms: int) -> Iterator[Tuple[int, str]]:
+    """Stream-decompress an archive, stopping at the first line past the window"""
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            ts = parse_timestamp_ms(line)
+            if ts is None or ts < start_ms:
+                continue
+            if ts > end_ms:
+                return
+            yield ts, line.decode("utf-8", errors="replace").strip()
+
+
+def search_log_set(start_ms: int, end_ms: int, log_dir: str = NIFI_LOG_DIR) -> List[str]:
+    """Lines from every NiFi log file overlapping [start_ms, end_ms], merged in time order"""
+    files = list_nifi_log_files(log_dir)
+    ranges = file_time_ranges(files)
+
+    segments = []
+    for path in files:
+        min_ms, max_ms = ranges.get(path, (None, None))
+        if min_ms is None or max_ms < start_ms or min_ms > end_ms:
+            continue
+        opener = _gzip_window if path.endswith(".gz") else _plain_window
+        segments.append(opener(path, start_ms, end_ms))
+        logger.debug(f"NiFi window overlaps {os.path.basename(path)}")
+
+    logger.info(f"🗂️ NiFi log set: {len(files)} files, {len(segments)} overlap the window")
+    return [line for _, line in heapq.merge(*segments, key=lambda item: item[0])]
+
+
+__all__ = ['list_nifi_log_files', 'active_log_file', 'open_log', 'file_time_ranges', 'search_log_set', 'NIFI_LOG_DIR']
@@ -0,0 +1,248 @@
+"""
+Shared adaptive rate limiting for Gemini models
+One process-wide limiter per model name, used by every agent on that model
+
+- Two token buckets per model: requests per minute and tokens per minute.
+  Callers reserve capacity up front (buckets may go negative) and sleep for
+  their share of the deficit, so bursts queue up FIFO instead of failing
+- Token reservations use an estimate of the request size; the difference to
+  the real usage_metadata count is settled when the response arrives
+- Quota errors (429 / RESOURCE_EXHAUSTED, 503 overloaded) are retried with
+  full-jitter exponential backoff (or the server's retry delay, if given),
+  and the limiter cuts its rate to 70% - it recovers 5% per success
+- Wait times, throttles and retries are kept per model for /metrics/rate-limits
+
+Limits default to paid tier 1 quotas and can be overridden per model with
+RATE_LIMIT_<MODEL>_RPM / RATE_LIMIT_<MODEL>_TPM, e.g. RATE_LIMIT_GEMINI_2_5_PRO_RPM=100.
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from typing import AsyncGenerator, Dict, Optional, Union
+
+from google.adk.models import Gemini
+from loguru import logger
+
+RATE_LIMITING = os.getenv("RATE_LIMITING", "True").lower() == "true"
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+RATE_LIMIT_BASE_BACKOFF = float(os.getenv("RATE_LIMIT_BASE_BACKOFF", "1.0"))  # seconds
+RATE_LIMIT_MAX_BACKOFF = float(os.getenv("RATE_LIMIT_MAX_BACKOFF", "60.0"))  # seconds
+
+DEFAULT_LIMITS = {  # model -> (requests per minute, tokens per minute)
+    "gemini-2.5-flash": (1000, 1_000_000),
+    "gemini-2.5-pro": (150, 2_000_000),
+}
+_FALLBACK_LIMITS = (60, 250_000)
+
+_MIN_RATE_FACTOR = 0.1  # Adaptive slow-down never goes below 10% of the configured rate
+_RETRY_DELAY = re.compile(r"retry(?:Delay)?[\"'\s:]*(?:in\s*)?([\d.]+)\s*s", re.IGNORECASE)
+_WAIT_BUCKETS = (0.0, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0)  # seconds - histogram upper bounds
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """True for errors worth retrying after a pause (quota exhausted / model overloaded)"""
+    code = getattr(error, "code", None)
+    if code in (429, 503):
+        return True
+    text = str(error)
+    return "RESOURCE_EXHAUSTED" in text or "429" in text.split(" ", 1)[0] or "overloaded" in text.lower()
+
+
+def estimate_request_tokens(llm_request) -> int:
+    """Rough input size of an LlmRequest (~4 characters per token)"""
+    chars = 0
+    config = getattr(llm_request, "config", None)
+    system_instruction = getattr(config, "system_instruction", None) if config else None
+    if system_instruction:
+        chars += len(str(system_instruction))
+    for content in getattr(llm_request, "contents", None) or []:
+        for part in getattr(content, "parts", None) or []:
+            text = getattr(part, "text", None)
+            chars += len(text) if text else len(str(part))
+    return chars // 4 + 1
+
+
+class RateLimiter:
+    """Requests/min + tokens/min buckets with FIFO reservations and adaptive slow-down"""
+
+    def __init__(self, model: str, rpm: float, tpm: float):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rate_factor = 1.0
+        self._requests = float(rpm)  # Bucket levels - negative while callers are queued
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.metrics = {
+            "requests": 0,
+            "tokens_reserved": 0,
+            "tokens_used": 0,
+            "waits": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "last_wait_s": 0.0,
+            "wait_histogram": {f"le_{b}": 0 for b in _WAIT_BUCKETS} | {"le_inf": 0},
+            "throttled": 0,
+            "retries": 0,
+            "gave_up": 0,
+        }
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm * self.rate_factor / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm * self.rate_factor / 60)
+
+    def reserve(self, tokens: int) -> float:
+        """Take one request + tokens from the buckets; returns how long the caller must wait"""
+        with self._lock:
+            self._refill(time.monotonic())
+            tokens = min(tokens, self.tpm)  # A single oversized request must still be admitted
+            self._requests -= 1
+            self._tokens -= tokens
+            wait = max(0.0,
+                       -self._requests * 60 / (self.rpm * self.rate_factor),
+                       -self._tokens * 60 / (self.tpm * self.rate_factor))
+            self.metrics["requests"] += 1
+            self.metrics["tokens_reserved"] += tokens
+            self._record_wait(wait)
+            return wait
+
+    async def acquire(self, tokens: int = 1):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"⏳ {self.model}: waiting {wait:.2f}s for rate limit")
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real token count is known"""
+        with self._lock:
+            self._tokens -= actual - min(estimated, self.tpm)
+            self.metrics["tokens_used"] += actual
+
+    def record_success(self):
+        with self._lock:
+            self.rate_factor = min(1.0, self.rate_factor + 0.05)
+
+    def record_give_up(self):
+        with self._lock:
+            self.metrics["gave_up"] += 1
+
+    def record_throttle(self, error: BaseException, attempt: int) -> float:
+        """Slow down after a quota error; returns the backoff delay before retrying"""
+        with self._lock:
+            self.rate_factor = max(_MIN_RATE_FACTOR, self.rate_factor * 0.7)
+            self._requests = min(self._requests, 0.0)  # Make queued callers wait for fresh capacity
+            self.metrics["throttled"] += 1
+            self.metrics["retries"] += 1
+        hint = _RETRY_DELAY.search(str(error))
+        if hint:
+            return min(RATE_LIMIT_MAX_BACKOFF, float(hint.group(1))) + random.uniform(0, 1)
+        return random.uniform(0, min(RATE_LIMIT_MAX_BACKOFF, RATE_LIMIT_BASE_BACKOFF * 2 ** attempt))
+
+    def _record_wait(self, wait: float):
+        m = self.metrics
+        if wait > 0:
+            m["waits"] += 1
+        m["total_wait_s"] += wait
+        m["max_wait_s"] = max(m["max_wait_s"], wait)
+        m["last_wait_s"] = wait
+        for bound in _WAIT_BUCKETS:
+            if wait <= bound:
+                m["wait_histogram"][f"le_{bound}"] += 1
+                break
+        else:
+            m["wait_histogram"]["le_inf"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            m = dict(self.metrics, wait_histogram=dict(self.metrics["wait_histogram"]))
+            m.update({
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "rate_factor": round(self.rate_factor, 3),
+                "queued_requests": max(0, int(-self._requests)),
+                "avg_wait_s": round(m["total_wait_s"] / m["requests"], 4) if m["requests"] else 0.0,
+                "total_wait_s": round(m["total_wait_s"], 3),
+                "max_wait_s": round(m["max_wait_s"], 3),
+                "last_wait_s": round(m["last_wait_s"], 3),
+            })
+            return m
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_limit(model: str, kind: str) -> Optional[float]:
+    value = os.getenv(f"RATE_LIMIT_{re.sub(r'[^A-Za-z0-9]', '_', model).upper()}_{kind}")
+    return float(value) if value else None
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """The process-wide limiter for a model (created on first use)"""
+    with _limiters_lock:
+        if model not in _limiters:
+            rpm, tpm = DEFAULT_LIMITS.get(model, _FALLBACK_LIMITS)
+            rpm = _env_limit(model, "RPM") or rpm
+            tpm = _env_limit(model, "TPM") or tpm
+            _limiters[model] = RateLimiter(model, rpm, tpm)
+            logger.info(f"🚦 Rate limiter for {model}: {rpm:g} req/min, {tpm:g} tokens/min")
+        return _limiters[model]
+
+
+def rate_limit_metrics() -> dict:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.model: limiter.snapshot() for limiter in limiters}
+
+
+class RateLimitedGemini(Gemini):
+    """Gemini model whose calls go through the shared limiter and retry quota errors"""
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator:
+        limiter = get_rate_limiter(self.model)
+        estimated = estimate_request_tokens(llm_request)
+        attempt = 0
+        while True:
+            await limiter.acquire(estimated)
+            produced = False
+            try:
+                async for response in super().generate_content_async(llm_request, stream=stream):
+                    produced = True
+                    usage = getattr(response, "usage_metadata", None)
+                    total = getattr(usage, "total_token_count", None) if usage else None
+                    if total and not getattr(response, "partial", False):
+                        limiter.settle(estimated, total)
+                    yield response
+                limiter.record_success()
+                return
+            except Exception as e:
+                # Never retry once output was streamed to the caller
+                if produced or not is_quota_error(e):
+                    raise
+                if attempt >= RATE_LIMIT_MAX_RETRIES:
+                    limiter.record_give_up()
+                    logger.error(f"🚦 {self.model}: quota error after {attempt} retries - giving up: {e}")
+                    raise
+                delay = limiter.record_throttle(e, attempt)
+                attempt += 1
+                logger.warning(f"🚦 {self.model}: quota error ({str(e)[:80]}) - retry {attempt}/"
+                               f"{RATE_LIMIT_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+def rate_limited_model(model: str) -> Union[str, Gemini]:
+    """Model argument for LlmAgent: a RateLimitedGemini, or the plain name when RATE_LIMITING is off"""
+    return RateLimitedGemini(model=model) if RATE_LIMITING else model
+
+
+__all__ = ['RateLimiter', 'RateLimitedGemini', 'get_rate_limiter', 'rate_limit_metrics', 'rate_limited_model',
+           'is_quota_error', 'RATE_LIMITING']
@@ -1,16 +1,35 @@
 """
 Human-in-the-Loop Tool with In-Memory approval (no files!)
-Uses shared memory to store and poll approval requests
+Approval requests are kept in the shared state store (tools/state_store.py), so the
+approve / reject POST can be handled by any server worker
+
+- Each waiting request is an asyncio future that update_approval_status() resolves,
+  so remediation resumes as soon as the decision arrives (no polling)
+- The timeout is asyncio.wait_for() on that future
+- With a shared store (STATE_BACKEND=sqlite) a decision may reach another worker:
+  one watcher task per process checks the store for all of its waiting requests at
+  once, every APPROVAL_POLL_INTERVAL seconds
+- approval_created / approval_resolved are pushed to dashboards (tools/update_bus.py)
 """
 
 from google.adk.tools import FunctionTool
 from loguru import logger
+from typing import Dict, Optional
 import asyncio
+import os
 import time
 import uuid
 
-# In-memory storage for approval requests (shared across the application)
-_approval_requests = {}
+from tools.state_store import get_state_store
+from tools.update_bus import get_update_bus, APPROVAL_CREATED, APPROVAL_RESOLVED
+
+APPROVALS = "approvals"  # State store namespace of approval requests
+APPROVAL_TIMEOUT = 300  # 5 minutes
+APPROVAL_POLL_INTERVAL = float(os.getenv("APPROVAL_POLL_INTERVAL", "0.5"))  # seconds between shared-store checks
+
+# Approval requests this process is waiting on: request_id → future resolved with the decision
+_waiters: Dict[str, asyncio.Future] = {}
+_watcher: Optional[asyncio.Task] = None
 
 async def human_remediation_approval_tool(plan_text: str) -> str:
     """
@@ -28,12 +47,21 @@ async def human_remediation_approval_tool(plan_text: str) -> str:
     # Generate unique request ID
     request_id = str(uuid.uuid4())[:8]
     
-    # Store in memory
-    _approval_requests[request_id] = {
+    # Register the waiter before the request becomes visible, so no decision can be missed
+    decision = asyncio.get_running_loop().create_future()
+    _waiters[request_id] = decision
+    
+    # Store in the shared state (expires on its own if this worker dies while waiting)
+    store = get_state_store()
+    request = {
         "plan": plan_text,
         "status": "pending",
         "created_at": time.time()
     }
+    await store.aset(APPROVALS, request_id, request, ttl=APPROVAL_TIMEOUT + 60)
+    await get_update_bus().publish(APPROVAL_CREATED, {"request_id": request_id, **request})
+    if store.shared:
+        _watch_shared_decisions()
     
     # Display message with curl commands
     print("\n" + "="*70)
@@ -45,71 +73,99 @@ async def human_remediation_approval_tool(plan_text: str) -> str:
     print(f"   curl -X POST http://localhost:8000/approve/{request_id}")
     print("\n📡 To reject via curl:")
     print(f"   curl -X POST http://localhost:8000/reject/{request_id}")
-    print("\n⏳ Polling every 5 seconds for your decision...")
+    print("\n⏳ Waiting for your decision (up to 5 minutes)...")
     print("="*70 + "\n")
     
     logger.info(f"📋 Approval request created: {request_id}")
     
-    # Poll for approval
-    start_time = time.time()
-    timeout = 300  # 5 minutes
-    poll_interval = 5  # 5 seconds
+    # Wait for the decision - resolved by update_approval_status
+    try:
+        request = await asyncio.wait_for(decision, timeout=APPROVAL_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️  Request {request_id} TIMED OUT")
+        await get_update_bus().publish(APPROVAL_RESOLVED, {"request_id": request_id, "status": "timeout"})
+        return "TIMEOUT: No response received within 5 minutes"
+    except asyncio.CancelledError:
+        logger.warning(f"🛑 Request {request_id} CANCELLED while waiting for a decision")
+        await get_update_bus().publish(APPROVAL_RESOLVED, {"request_id": request_id, "status": "cancelled"})
+        raise
+    finally:
+        _waiters.pop(request_id, None)
+        await store.adelete(APPROVALS, request_id)  # Clean up
     
-    while True:
-        # Check timeout
-        if time.time() - start_time > timeout:
-            logger.warning(f"⏱️  Request {request_id} TIMED OUT")
-            _approval_requests.pop(request_id, None)  # Clean up
-            return "TIMEOUT: No response received within 5 minutes"
-        
-        # Check in-memory status
-        request = _approval_requests.get(request_id)
-        if request:
-            status = request.get("status", "pending")
-            
-            if status == "approved":
-                logger.info(f"✅ Request {request_id} was APPROVED via API")
-                print(f"\n✅ APPROVED - Proceeding with execution...\n")
-                _approval_requests.pop(request_id, None)  # Clean up
-                return "APPROVED"
-            elif status == "rejected":
-                # Check if there's feedback
-                feedback = request.get("feedback", None)
-                if feedback:
-                    logger.info(f"💬 Request {request_id} was REJECTED with feedback: {feedback}")
-                    print(f"\n💬 REJECTED WITH FEEDBACK - Modifying plan...\n")
-                    print(f"Human feedback: {feedback}\n")
-                    _approval_requests.pop(request_id, None)  # Clean up
-                    return f"REJECTED_WITH_FEEDBACK: {feedback}"
-                else:
-                    logger.info(f"❌ Request {request_id} was REJECTED via API")
-                    print(f"\n❌ REJECTED - Will create alternative plan...\n")
-                    _approval_requests.pop(request_id, None)  # Clean up
-                    return "REJECTED"
-        
-        # Wait before next poll
-        elapsed = int(time.time() - start_time)
-        if elapsed % 10 == 0:  # Log every 10 seconds
-            logger.debug(f"⏳ Still waiting for approval... ({elapsed}s elapsed)")
-        await asyncio.sleep(poll_interval)
+    status = request.get("status")
+    if status == "approved":
+        logger.info(f"✅ Request {request_id} was APPROVED via API")
+        print(f"\n✅ APPROVED - Proceeding with execution...\n")
+        return "APPROVED"
+    
+    # Check if there's feedback
+    feedback = request.get("feedback", None)
+    if feedback:
+        logger.info(f"💬 Request {request_id} was REJECTED with feedback: {feedback}")
+        print(f"\n💬 REJECTED WITH FEEDBACK - Modifying plan...\n")
+        print(f"Human feedback: {feedback}\n")
+        return f"REJECTED_WITH_FEEDBACK: {feedback}"
+    logger.info(f"❌ Request {request_id} was REJECTED via API")
+    print(f"\n❌ REJECTED - Will create alternative plan...\n")
+    return "REJECTED"
 
-def get_all_approval_requests():
+def _settle(future: asyncio.Future, request: dict):
+    if not future.done():
+        future.set_result(request)
+
+def _resolve(request_id: str, request: dict):
+    """Wake the tool call waiting on request_id, if it runs in this process"""
+    future = _waiters.get(request_id)
+    if future is not None:
+        # Thread-safe: the decision may come from outside the waiting event loop
+        future.get_loop().call_soon_threadsafe(_settle, future, request)
+
+def _watch_shared_decisions():
+    """Start this process's watcher for decisions made on other workers (if not running)"""
+    global _watcher
+    loop = asyncio.get_running_loop()
+    if _watcher is None or _watcher.done() or _watcher.get_loop() is not loop:
+        _watcher = loop.create_task(_watch_store())
+
+async def _watch_store():
+    # One store read per interval covers every request this process is waiting on
+    while _waiters:
+        await asyncio.sleep(APPROVAL_POLL_INTERVAL)
+        try:
+            requests = await get_state_store().aitems(APPROVALS)
+        except Exception as e:
+            logger.warning(f"⚠ Could not check approval decisions: {e}")
+            continue
+        for request_id, future in list(_waiters.items()):
+            request = requests.get(request_id)
+            if request and request.get("status", "pending") != "pending":
+                _settle(future, request)
+
+async def get_all_approval_requests():
     """Get all approval requests (for API endpoint)"""
-    return _approval_requests
+    return await get_state_store().aitems(APPROVALS)
 
-def update_approval_status(request_id: str, status: str, feedback: str = None):
-    """Update approval status (called by API endpoint)"""
-    if request_id in _approval_requests:
-        _approval_requests[request_id]["status"] = status
-        if feedback:
-            _approval_requests[request_id]["feedback"] = feedback
-        return True
-    return False
+async def update_approval_status(request_id: str, status: str, feedback: str = None):
+    """Update approval status (called by API endpoint)
+    
+    Only a pending request can be decided: False if it is unknown or already decided
+    """
+    changes = {"status": status}
+    if feedback:
+        changes["feedback"] = feedback
+    if not await get_state_store().aupdate(APPROVALS, request_id, changes, expect={"status": "pending"}):
+        return False
+    if status != "pending":
+        _resolve(request_id, changes)
+        await get_update_bus().publish(APPROVAL_RESOLVED, {"request_id": request_id, **changes})
+    return True
 
-def get_approval_feedback(request_id: str):
+async def get_approval_feedback(request_id: str):
     """Get feedback for a specific request"""
-    if request_id in _approval_requests:
-        return _approval_requests[request_id].get("feedback", None)
+    request = await get_state_store().aget(APPROVALS, request_id)
+    if request:
+        return request.get("feedback", None)
     return None
 
 # Create the HITL tool
@@ -0,0 +1,240 @@
+"""
+Queryable index over the JSONL result store
+One SQLite row per saved result (agent_outputs/results_index.db, WAL mode) with the
+fields worth filtering on, plus the segment + byte offset of the full record
+
+- Filled by the result writer thread right after each group commit, in one
+  transaction per batch; the JSONL segments stay the source of truth
+- On start-up the index catches up with anything in the segments it has not seen
+  (crash between commit and indexing, index enabled later, index file deleted)
+- query(): filtered pages, by offset or by cursor (the last row id seen) - cursors
+  stay fast however deep the page
+- aggregate(): counts and averages grouped by one indexed column
+- Totals and aggregates are read from a rollup table (one row per distinct
+  run / session / level / application / classification / severity / component,
+  kept up to date by a trigger), so they cost the same at 1k or 10M results
+
+session_id filters match both the run id (first session of a process_log_file run)
+and the worker session that analysed the entry.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from tools.analysis_output import extract_analysis_json
+
+INDEX_DB_NAME = "results_index.db"
+
+COLUMNS = (
+    "run_id", "session_id", "log_index", "saved_at", "level", "application", "classification", "severity",
+    "component", "processing_time_ms", "tool_calls", "total_responses", "sub_agent_triggered", "llm_skipped",
+    "cache_hit", "segment", "line_offset"
+)
+ROLLUP_KEY = ("run_id", "session_id", "level", "application", "classification", "severity", "component")
+GROUP_BY_COLUMNS = ("run_id", "session_id", "level", "application", "classification", "severity", "component")
+FILTER_COLUMNS = ("level", "application", "classification", "severity", "component")
+_LEVELS = ("ERROR", "WARN", "INFO", "DEBUG", "TRACE", "FATAL")
+
+
+def _level(log_entry: str) -> Optional[str]:
+    first_line = (log_entry or "").split("\n", 1)[0]
+    for level in _LEVELS:
+        if f" {level} " in first_line:
+            return level
+    return None
+
+
+def _upper(value) -> Optional[str]:
+    return str(value).strip().upper() if value not in (None, "") else None
+
+
+def index_row(record: dict, segment: str, line_offset: int) -> tuple:
+    """Column values for one stored result"""
+    metadata = record.get("metadata", {})
+    trace = record.get("execution_trace", {})
+    analysis_data = record.get("log_analysis", {})
+    analysis = extract_analysis_json(analysis_data.get("agent_analysis_output") or "") or {}
+    return (
+        metadata.get("run_id") or metadata.get("session_id"),
+        metadata.get("session_id"),
+        metadata.get("log_index"),
+        metadata.get("saved_at"),
+        _level(analysis_data.get("original_log_entry")),
+        analysis.get("application"),
+        _upper(analysis.get("classification")),
+        _upper(analysis.get("severity")),
+        analysis.get("component"),
+        trace.get("processing_time_ms"),
+        trace.get("total_tool_calls", 0),
+        trace.get("total_responses", 0),
+        int(bool(trace.get("sub_agent_triggered"))),
+        int(bool(trace.get("llm_skipped"))),
+        int(bool(trace.get("cache_hit"))),
+        os.path.basename(segment),
+        line_offset,
+    )
+
+
+class ResultIndex:
+    """SQLite (WAL) index of stored results"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # The JSONL segments are the durable copy
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "id INTEGER PRIMARY KEY, run_id TEXT, session_id TEXT, log_index INTEGER, saved_at TEXT, "
+                "level TEXT, application TEXT, classification TEXT, severity TEXT, component TEXT, "
+                "processing_time_ms REAL, tool_calls INTEGER, total_responses INTEGER, "
+                "sub_agent_triggered INTEGER, llm_skipped INTEGER, cache_hit INTEGER, "
+                "segment TEXT NOT NULL, line_offset INTEGER NOT NULL, UNIQUE (segment, line_offset))"
+            )
+            for name, columns in (("run", "run_id, log_index"), ("session", "session_id, log_index"),
+                                  ("classification", "classification, severity"), ("severity", "severity"),
+                                  ("component", "component"), ("level", "level")):
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_results_{name} ON results({columns})")
+            # Rollup: NULLs are stored as '' so the key stays unique
+            key = ", ".join(ROLLUP_KEY)
+            key_values = ", ".join(f"COALESCE(NEW.{column}, '')" for column in ROLLUP_KEY)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS results_rollup ({key}, count INTEGER, timed INTEGER, "
+                f"processing_time_ms REAL, tool_calls INTEGER, sub_agent_triggered INTEGER, llm_skipped INTEGER, "
+                f"cache_hits INTEGER, PRIMARY KEY ({key}))"
+            )
+            self._db.execute(
+                f"CREATE TRIGGER IF NOT EXISTS results_rollup_insert AFTER INSERT ON results BEGIN "
+                f"INSERT INTO results_rollup VALUES ({key_values}, "
+                f"1, NEW.processing_time_ms IS NOT NULL, COALESCE(NEW.processing_time_ms, 0), "
+                f"COALESCE(NEW.tool_calls, 0), NEW.sub_agent_triggered, NEW.llm_skipped, NEW.cache_hit) "
+                f"ON CONFLICT ({key}) DO UPDATE SET count = count + 1, timed = timed + excluded.timed, "
+                f"processing_time_ms = processing_time_ms + excluded.processing_time_ms, "
+                f"tool_calls = tool_calls + excluded.tool_calls, "
+                f"sub_agent_triggered = sub_agent_triggered + excluded.sub_agent_triggered, "
+                f"llm_skipped = llm_skipped + excluded.llm_skipped, cache_hits = cache_hits + excluded.cache_hits; END"
+            )
+            self._db.commit()
+        return self._db
+
+    def add(self, entries: Iterable[Tuple[dict, str, int]]):
+        """Index (record, segment path, byte offset) entries in one transaction"""
+        rows = [index_row(record, segment, offset) for record, segment, offset in entries]
+        if not rows:
+            return
+        with self._lock:
+            db = self._connect()
+            db.executemany(f"INSERT OR IGNORE INTO results ({', '.join(COLUMNS)}) "
+                           f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            db.commit()
+
+    def catch_up(self, segments: List[str]):
+        """Index whatever the segments hold beyond the last indexed record"""
+        with self._lock:
+            last = self._connect().execute(
+                "SELECT segment, line_offset FROM results ORDER BY segment DESC, line_offset DESC LIMIT 1"
+            ).fetchone()
+        last_segment, last_offset = (last["segment"], last["line_offset"]) if last else ("", -1)
+
+        added = 0
+        for path in segments:
+            name = os.path.basename(path)
+            if name < last_segment:
+                continue
+            batch = []
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    line_offset, offset = offset, offset + len(line)
+                    if name == last_segment and line_offset <= last_offset:
+                        continue
+                    try:
+                        batch.append((json.loads(line), path, line_offset))
+                    except ValueError:
+                        break  # Torn tail
+                    if len(batch) >= 5000:
+                        self.add(batch)
+                        added += len(batch)
+                        batch = []
+            self.add(batch)
+            added += len(batch)
+        if added:
+            logger.info(f"🗂️ Result index caught up: {added} results indexed from the JSONL segments")
+
+    def _where(self, session_id=None, filters=None):
+        clauses, params = [], []
+        if session_id:
+            clauses.append("(run_id = ? OR session_id = ?)")
+            params += [session_id, session_id]
+        for column, value in (filters or {}).items():
+            if value is None:
+                continue
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on {column}")
+            if column in ("classification", "severity", "level"):
+                value = _upper(value)
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, session_id: str = None, filters: dict = None, offset: int = 0, limit: int = 100,
+              cursor: int = None) -> dict:
+        """One page of matching rows in save order; pass the returned next_cursor to continue"""
+        where, params = self._where(session_id, filters)
+        with self._lock:
+            db = self._connect()
+            total = db.execute(f"SELECT COALESCE(SUM(count), 0) FROM results_rollup{where}", params).fetchone()[0]
+            if cursor is not None:
+                page_where = (where + " AND" if where else " WHERE") + " id > ?"
+                rows = db.execute(f"SELECT * FROM results{page_where} ORDER BY id LIMIT ?",
+                                  params + [cursor, limit]).fetchall()
+            else:
+                rows = db.execute(f"SELECT * FROM results{where} ORDER BY id LIMIT ? OFFSET ?",
+                                  params + [limit, offset]).fetchall()
+        rows = [dict(row) for row in rows]
+        return {
+            "total": total,
+            "rows": rows,
+            "next_cursor": rows[-1]["id"] if len(rows) == limit else None
+        }
+
+    def aggregate(self, group_by: str, session_id: str = None, filters: dict = None) -> List[dict]:
+        """Counts, average processing time and tool calls per value of group_by"""
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"Cannot group by {group_by} (one of: {', '.join(GROUP_BY_COLUMNS)})")
+        where, params = self._where(session_id, filters)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT NULLIF({group_by}, '') AS value, SUM(count) AS count, "
+                f"SUM(processing_time_ms) / NULLIF(SUM(timed), 0) AS avg_processing_time_ms, "
+                f"SUM(tool_calls) AS tool_calls, SUM(sub_agent_triggered) AS sub_agent_triggered, "
+                f"SUM(llm_skipped) AS llm_skipped, SUM(cache_hits) AS cache_hits "
+                f"FROM results_rollup{where} GROUP BY {group_by} ORDER BY count DESC", params
+            ).fetchall()
+        return [dict(row, avg_processing_time_ms=round(row["avg_processing_time_ms"] or 0, 2)) for row in rows]
+
+
+def load_record(output_dir: str, segment: str, line_offset: int) -> Optional[dict]:
+    """Full stored result for an index row"""
+    with open(os.path.join(output_dir, segment), "rb") as f:
+        f.seek(line_offset)
+        line = f.readline()
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+__all__ = ['ResultIndex', 'index_row', 'load_record', 'INDEX_DB_NAME', 'GROUP_BY_COLUMNS', 'FILTER_COLUMNS']
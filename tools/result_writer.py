@@ -0,0 +1,297 @@
+"""
+Append-only JSONL result store
+Analysis results are appended as one JSON line each to size-capped segment files
+(agent_outputs/results-000001.jsonl, ...) instead of one pretty-printed file per entry
+
+- A background writer thread takes records off a queue, so serialisation and disk
+  I/O never run on the event loop
+- Group commit: everything queued while the previous write was in progress is
+  written with a single write + flush + fsync, then the callers' on_commit callbacks
+  run (in submission order, on the writer thread)
+- Size-based rollover to a new segment once RESULTS_SEGMENT_MB is reached
+- Crash-safe tail: a segment is only appended to after any partial last line (torn
+  write) has been cut off, and readers skip lines that do not parse
+- Optional ResultIndex: each committed batch is also indexed in SQLite for queries
+- Several processes (API server workers) can share an output directory: each commit
+  holds an exclusive lock on the segment and appends at its current end
+
+One writer per output directory per process (see get_result_writer).
+"""
+
+import glob
+import json
+import os
+import queue
+import threading
+from typing import Callable, Dict, Iterator, Optional
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows - one writing process per output directory
+    fcntl = None
+
+SEGMENT_PREFIX = "results-"
+SEGMENT_SUFFIX = ".jsonl"
+_STOP = object()
+
+
+def segment_files(output_dir: str):
+    """Segments of a result store, oldest first"""
+    return sorted(glob.glob(os.path.join(output_dir, f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")))
+
+
+def _segment_number(path: str) -> int:
+    return int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+def _repair_tail(path: str) -> int:
+    """Cut a partial last line off a segment; returns the resulting size"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    with open(path, "rb+") as f:
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return size
+        probe = min(size, 1 << 20)
+        while True:
+            f.seek(size - probe)
+            newline = f.read(probe).rfind(b"\n")
+            if newline != -1:
+                keep = size - probe + newline + 1
+                break
+            if probe == size:
+                keep = 0
+                break
+            probe = min(size, probe * 4)
+        f.truncate(keep)
+        f.flush()
+        os.fsync(f.fileno())
+    logger.warning(f"✂️ Removed torn tail from {path} ({size - keep} bytes)")
+    return keep
+
+
+class SegmentedResultWriter:
+    """Background JSONL appender with group commit and size-based segment rollover"""
+
+    def __init__(self, output_dir: str = "agent_outputs", segment_bytes: int = 64 * 1024 * 1024,
+                 fsync: bool = True, max_batch: int = 512, index=None):
+        self.output_dir = output_dir
+        self.index = index
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.max_batch = max_batch
+        self.stats = {"records": 0, "commits": 0, "failed_commits": 0, "segments_opened": 0}
+
+        self._queue = queue.Queue()
+        self._file = None
+        self._segment = None
+        self._size = 0
+        self._durable = 0  # Segment size at the last successful flush - a failed batch is cut back to it
+        self._claimed = False  # This commit holds the segment lock
+        self._thread = threading.Thread(target=self._run, name=f"result-writer-{os.path.basename(output_dir)}",
+                                        daemon=True)
+        self._thread.start()
+
+    # -- caller side -------------------------------------------------------
+
+    def submit(self, record: Optional[dict], on_commit: Callable[[bool], None] = None):
+        """Queue a record for appending; on_commit(ok) runs on the writer thread once it is durable
+
+        record=None writes nothing but keeps its place in the commit order (on_commit(False))
+        """
+        self._queue.put((record, on_commit))
+
+    def write(self, record: dict, timeout: float = None) -> bool:
+        """Append a record and wait until it is on disk"""
+        done = threading.Event()
+        result = []
+
+        def committed(ok):
+            result.append(ok)
+            done.set()
+
+        self.submit(record, committed)
+        return done.wait(timeout) and result[0]
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything submitted so far is committed and its callbacks have run"""
+        done = threading.Event()
+        self._queue.put((None, lambda ok: done.set()))
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # -- writer thread -----------------------------------------------------
+
+    def _open_segment(self, roll_over: bool = False):
+        """Open the segment to append to; roll_over=True always moves on to the next one"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        existing = segment_files(self.output_dir)
+        if self._segment is None and existing:
+            self._segment = existing[-1]
+            self._size = os.path.getsize(self._segment)
+        if roll_over or self._segment is None or self._size >= self.segment_bytes:
+            number = 1
+            if self._segment is not None:
+                number = _segment_number(self._segment) + 1
+            if existing:
+                number = max(number, _segment_number(existing[-1]))  # Another process may have rolled over already
+            self._segment = os.path.join(self.output_dir, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+            self._size = 0
+            logger.info(f"🗃️ Writing results to {self._segment}")
+        self._file = open(self._segment, "ab")
+        self._claimed = False
+        self._durable = self._size
+        self.stats["segments_opened"] += 1
+
+    def _claim_segment(self):
+        """Lock the open segment for one commit and pick up its current end
+
+        Other processes may have appended since the last commit, or left a torn line
+        behind; a segment they filled up is rolled over.
+        """
+        while True:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            self._size = self._durable = _repair_tail(self._segment)
+            if self._size < self.segment_bytes:
+                self._claimed = True
+                return
+            self._file.close()  # Releases the lock
+            self._open_segment()
+
+    def _release_segment(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._claimed = False
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._durable = self._size
+
+    def _commit(self, batch):
+        ok = True
+        try:
+            if self._file is None:
+                self._open_segment()
+            self._claim_segment()
+            chunk = bytearray()
+            written = []  # (record, segment, byte offset) for the index
+            for record, _ in batch:
+                if record is None:
+                    continue
+                line = (json.dumps(record, default=str) + "\n").encode()
+                # An empty segment still takes one oversized record, so every record gets written;
+                # the next segment may already be filled up by another process - then roll on again
+                while (self._size or chunk) and self._size + len(chunk) + len(line) > self.segment_bytes:
+                    # Roll over: finish the current segment first
+                    self._file.write(chunk)
+                    self._size += len(chunk)
+                    chunk = bytearray()
+                    self._sync()
+                    self._file.close()
+                    self._open_segment(roll_over=True)
+                    self._claim_segment()
+                written.append((record, self._segment, self._size + len(chunk)))
+                chunk += line
+            if chunk:
+                self._file.write(chunk)
+                self._size += len(chunk)
+            self._sync()
+            self._release_segment()
+            self.stats["records"] += sum(1 for record, _ in batch if record is not None)
+            self.stats["commits"] += 1
+        except Exception as e:
+            ok = False
+            self.stats["failed_commits"] += 1
+            logger.error(f"Failed to write {len(batch)} results to {self._segment}: {e}")
+            # Drop the half-written batch so the segment ends on a complete line again
+            try:
+                if self._claimed and os.path.exists(self._segment):
+                    os.truncate(self._segment, self._durable)  # Still under this commit's lock
+                if self._file is not None:
+                    self._file.close()
+            except OSError:
+                pass
+            self._file = None
+            self._segment = None
+
+        if ok and self.index is not None and written:
+            try:
+                self.index.add(written)
+            except Exception as e:
+                # The JSONL segment is the source of truth - the index catches up on the next start
+                logger.warning(f"⚠ Result index update failed: {e}")
+
+        for record, on_commit in batch:
+            if on_commit is not None:
+                try:
+                    on_commit(ok and record is not None)
+                except Exception as e:
+                    logger.error(f"Result commit callback failed: {e}")
+
+    def _run(self):
+        if self.index is not None:
+            try:
+                self.index.catch_up(segment_files(self.output_dir))
+            except Exception as e:
+                logger.warning(f"⚠ Result index catch-up failed: {e}")
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+            while not stop and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._commit(batch)
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+
+_writers: Dict[str, SegmentedResultWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_result_writer(output_dir: str = "agent_outputs", **options) -> SegmentedResultWriter:
+    """The process-wide writer for an output directory (created on first use)"""
+    key = os.path.abspath(output_dir)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = SegmentedResultWriter(output_dir, **options)
+        return _writers[key]
+
+
+def read_results(output_dir: str = "agent_outputs", session_id: str = None) -> Iterator[dict]:
+    """Stored results in write order, optionally only those of one run / session"""
+    for path in segment_files(output_dir):
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn tail of a segment that is still being written
+                if session_id is not None:
+                    metadata = record.get("metadata", {})
+                    if session_id not in (metadata.get("session_id"), metadata.get("run_id")):
+                        continue
+                yield record
+
+
+__all__ = ['SegmentedResultWriter', 'get_result_writer', 'read_results', 'segment_files']
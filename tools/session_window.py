@@ -0,0 +1,101 @@
+"""
+Bounded session history for long analysis runs
+Every prompt sent on an ADK session carries the whole conversation so far, so a file
+analysed on one session costs more per entry the longer it gets
+
+- SessionWindow tracks how many entries and how much context a session has seen;
+  once it reaches SESSION_WINDOW_ENTRIES entries or SESSION_WINDOW_TOKENS tokens
+  the caller swaps it for a fresh session
+- AnomalySummary keeps the most recent anomalies of the file as a few short lines;
+  the first prompt on a fresh session is prefixed with it, so the model keeps the
+  context that matters (what already went wrong) without the full history
+
+Context size is the prompt token count reported by the model for the session's
+latest call (usage_metadata); without it, prompt + output sizes are estimated at
+~4 characters per token.
+"""
+
+import threading
+from collections import deque
+from typing import Optional
+
+from tools.log_compaction import estimate_tokens
+
+
+class AnomalySummary:
+    """Rolling summary of the latest anomalies seen in a log file"""
+
+    def __init__(self, max_items: int = 10, max_chars: int = 160):
+        self.max_chars = max_chars
+        self._items = deque(maxlen=max_items)
+        self._lock = threading.Lock()
+
+    def add(self, log_index: int, analysis: Optional[dict]):
+        """Remember an analysis if it classified the entry as an anomaly"""
+        if not analysis or str(analysis.get("classification", "")).upper() != "ANOMALY":
+            return
+        cause = " ".join(str(analysis.get("likely_cause", "")).split())
+        if len(cause) > self.max_chars:
+            cause = cause[:self.max_chars - 3] + "..."
+        line = (f"- Log #{log_index} [{analysis.get('severity', 'UNKNOWN')}] "
+                f"{analysis.get('component', 'Unknown')}: {cause}")
+        with self._lock:
+            self._items.append((log_index, line))
+
+    def __len__(self):
+        return len(self._items)
+
+    def render(self) -> str:
+        """Prompt prefix for a fresh session ('' while no anomaly was seen)"""
+        with self._lock:
+            lines = [line for _, line in sorted(self._items)]
+        if not lines:
+            return ""
+        return ("CONTEXT FROM EARLIER IN THIS LOG FILE (recent anomalies, for reference only - "
+                "analyse the new log entry below on its own merits):\n" + "\n".join(lines) + "\n\n")
+
+
+class SessionWindow:
+    """A session plus the amount of history it has accumulated"""
+
+    def __init__(self, session, max_entries: int = 50, max_tokens: int = 32000):
+        self.session = session
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self.entries = 0
+        self.context_tokens = 0
+        self.generation = 0
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.entries == 0
+
+    def record(self, prompt: str, agent_output: str, prompt_tokens: Optional[int] = None):
+        """Account for one call on this session"""
+        self.entries += 1
+        if prompt_tokens:
+            # The last prompt already contains the whole history; add this call's answer
+            self.context_tokens = prompt_tokens + estimate_tokens(agent_output or "")
+        else:
+            self.context_tokens += estimate_tokens(prompt) + estimate_tokens(agent_output or "")
+
+    def is_full(self) -> bool:
+        return ((self.max_entries > 0 and self.entries >= self.max_entries)
+                or (self.max_tokens > 0 and self.context_tokens >= self.max_tokens))
+
+    def rotate(self, session):
+        """Continue on a fresh session"""
+        self.session = session
+        self.entries = 0
+        self.context_tokens = 0
+        self.generation += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "session_entries": self.entries,
+            "context_tokens": self.context_tokens,
+            "generation": self.generation
+        }
+
+
+__all__ = ['AnomalySummary', 'SessionWindow']
@@ -0,0 +1,352 @@
+"""
+Shared state for the API server processes
+Approval requests, job status and stream status live in a StateStore instead of module
+dicts, so several server processes (uvicorn --workers N behind a load balancer) see
+the same state - an approval POST can land on any worker
+
+- STATE_BACKEND=memory (default): process-local, for a single server process
+- STATE_BACKEND=sqlite: one SQLite database (WAL, STATE_DB) shared by every process
+  on the host
+- Values are JSON documents under (namespace, key); update() merges fields and add()
+  only inserts into a free key, each atomically, so check-then-act races between
+  processes are settled by the store
+- Optional ttl per key: expired keys read as missing, so entries of a worker that
+  died age out instead of lingering
+- Append-only logs: append() numbers events 1, 2, 3, ... per log (across processes
+  for the shared backend) and keeps the last `keep`; read() returns those after a
+  version cursor
+- Async code uses the a*() variants (aget, aset, ...): for the SQLite backend they run
+  on the store's own thread, so waiting for another process's write lock never
+  blocks the event loop
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()  # memory or sqlite
+STATE_DB = os.getenv("STATE_DB", "agent_outputs/state.db")  # shared database for STATE_BACKEND=sqlite
+
+
+def worker_id() -> str:
+    """Identifies this server process in shared state"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _expiry(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl is not None else None
+
+
+def _matches(value: dict, expect: Optional[dict]) -> bool:
+    return not expect or all(value.get(field) == wanted for field, wanted in expect.items())
+
+
+def _copy(value: dict) -> dict:
+    # Same semantics as the SQLite backend: stored values are JSON, never shared objects
+    return json.loads(json.dumps(value, default=str))
+
+
+class StateStore(ABC):
+    """Namespaced JSON key-value state"""
+
+    shared = False  # Other processes can change the state too
+    _executor: Optional[ThreadPoolExecutor] = None  # Runs the a*() calls of a blocking backend
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def add(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None) -> bool:
+        """Store value only if the key is free; False if it is taken"""
+        ...
+
+    @abstractmethod
+    def update(self, namespace: str, key: str, changes: dict, ttl: Optional[float] = None,
+               expect: Optional[dict] = None) -> bool:
+        """Merge changes into an existing value (and restart its ttl if given); False if missing
+
+        expect: only update if the value currently has these field values (compare-and-set)
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def items(self, namespace: str) -> Dict[str, dict]:
+        ...
+
+    @abstractmethod
+    def append(self, log: str, event: dict, keep: int = 1000) -> int:
+        """Add an event to a log; returns its version. Only the last `keep` events are kept"""
+        ...
+
+    @abstractmethod
+    def read(self, log: str, after: int = 0, limit: int = 1000) -> Tuple[List[Tuple[int, dict]], int, int]:
+        """(version, event) after version `after` (at most `limit`), the first version still
+        kept and the latest version - after < first - 1 means some were already dropped"""
+        ...
+
+    # -- from async code ---------------------------------------------------
+
+    async def _call(self, method, *args, **kwargs):
+        if self._executor is None:
+            return method(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, lambda: method(*args, **kwargs))
+
+    async def aget(self, namespace: str, key: str) -> Optional[dict]:
+        return await self._call(self.get, namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None):
+        return await self._call(self.set, namespace, key, value, ttl)
+
+    async def aadd(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None) -> bool:
+        return await self._call(self.add, namespace, key, value, ttl)
+
+    async def aupdate(self, namespace: str, key: str, changes: dict, ttl: Optional[float] = None,
+                      expect: Optional[dict] = None) -> bool:
+        return await self._call(self.update, namespace, key, changes, ttl, expect)
+
+    async def adelete(self, namespace: str, key: str) -> bool:
+        return await self._call(self.delete, namespace, key)
+
+    async def aitems(self, namespace: str) -> Dict[str, dict]:
+        return await self._call(self.items, namespace)
+
+    async def aappend(self, log: str, event: dict, keep: int = 1000) -> int:
+        return await self._call(self.append, log, event, keep)
+
+    async def aread(self, log: str, after: int = 0, limit: int = 1000) -> Tuple[List[Tuple[int, dict]], int, int]:
+        return await self._call(self.read, log, after, limit)
+
+
+class MemoryStateStore(StateStore):
+    """Process-local state (one server process)"""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, tuple]] = {}  # namespace → key → (value, expires_at)
+        self._logs: Dict[str, deque] = {}  # log → (version, event)
+        self._log_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, namespace, key):
+        entry = self._data.get(namespace, {}).get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._data[namespace][key]
+            return None
+        return entry
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._live(namespace, key)
+            return _copy(entry[0]) if entry else None
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = (_copy(value), _expiry(ttl))
+
+    def add(self, namespace, key, value, ttl=None):
+        with self._lock:
+            if self._live(namespace, key):
+                return False
+            self._data.setdefault(namespace, {})[key] = (_copy(value), _expiry(ttl))
+            return True
+
+    def update(self, namespace, key, changes, ttl=None, expect=None):
+        with self._lock:
+            entry = self._live(namespace, key)
+            if entry is None or not _matches(entry[0], expect):
+                return False
+            value, expires_at = entry
+            value.update(_copy(changes))
+            self._data[namespace][key] = (value, _expiry(ttl) if ttl is not None else expires_at)
+            return True
+
+    def delete(self, namespace, key):
+        with self._lock:
+            return self._data.get(namespace, {}).pop(key, None) is not None
+
+    def items(self, namespace):
+        with self._lock:
+            return {key: _copy(entry[0]) for key in list(self._data.get(namespace, {}))
+                    if (entry := self._live(namespace, key))}
+
+    def append(self, log, event, keep=1000):
+        with self._lock:
+            version = self._log_versions.get(log, 0) + 1
+            self._log_versions[log] = version
+            events = self._logs.setdefault(log, deque())
+            events.append((version, _copy(event)))
+            while len(events) > max(1, keep):
+                events.popleft()
+            return version
+
+    def read(self, log, after=0, limit=1000):
+        with self._lock:
+            events = self._logs.get(log, ())
+            latest = self._log_versions.get(log, 0)
+            first = events[0][0] if events else latest + 1
+            # Versions are contiguous, so the events after `after` start at a known position
+            start = max(0, after - first + 1)
+            selected = [(version, _copy(event)) for version, event in
+                        list(events)[start:start + limit]] if after < latest else []
+            return selected, first, latest
+
+
+class SQLiteStateStore(StateStore):
+    """State shared by every process that opens the same database file (WAL)
+
+    Each operation is one short transaction; update() and add() take the write lock
+    up front (BEGIN IMMEDIATE), so read-modify-write is atomic across processes.
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = None
+        # One thread is enough: operations are serialised by _lock anyway, and a wait for
+        # another process's lock does not tie up the default executor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE below)
+            self._db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS state (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                "value TEXT NOT NULL, expires_at REAL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS logs (log TEXT NOT NULL, version INTEGER NOT NULL, "
+                "value TEXT NOT NULL, PRIMARY KEY (log, version))"
+            )
+        return self._db
+
+    def _transaction(self, work, mode="IMMEDIATE"):
+        with self._lock:
+            db = self._connect()
+            db.execute(f"BEGIN {mode}")
+            try:
+                result = work(db)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _drop_expired(db, namespace, key=None):
+        if key is None:
+            db.execute("DELETE FROM state WHERE namespace = ? AND expires_at <= ?", (namespace, time.time()))
+        else:
+            db.execute("DELETE FROM state WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                       (namespace, key, time.time()))
+
+    def get(self, namespace, key):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?)",
+                                    (namespace, key, json.dumps(value, default=str), _expiry(ttl)))
+
+    def add(self, namespace, key, value, ttl=None):
+        def work(db):
+            self._drop_expired(db, namespace, key)
+            return db.execute("INSERT OR IGNORE INTO state VALUES (?, ?, ?, ?)",
+                              (namespace, key, json.dumps(value, default=str), _expiry(ttl))).rowcount == 1
+        return self._transaction(work)
+
+    def update(self, namespace, key, changes, ttl=None, expect=None):
+        def work(db):
+            row = db.execute(
+                "SELECT value, expires_at FROM state WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)", (namespace, key, time.time())).fetchone()
+            if row is None:
+                return False
+            value = json.loads(row[0])
+            if not _matches(value, expect):
+                return False
+            value.update(changes)
+            db.execute("UPDATE state SET value = ?, expires_at = ? WHERE namespace = ? AND key = ?",
+                       (json.dumps(value, default=str), _expiry(ttl) if ttl is not None else row[1], namespace, key))
+            return True
+        return self._transaction(work)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            return self._connect().execute("DELETE FROM state WHERE namespace = ? AND key = ?",
+                                           (namespace, key)).rowcount == 1
+
+    def items(self, namespace):
+        def work(db):
+            self._drop_expired(db, namespace)
+            return db.execute("SELECT key, value FROM state WHERE namespace = ?", (namespace,)).fetchall()
+        return {key: json.loads(value) for key, value in self._transaction(work)}
+
+    def append(self, log, event, keep=1000):
+        def work(db):
+            version = db.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM logs WHERE log = ?", (log,)).fetchone()[0]
+            db.execute("INSERT INTO logs VALUES (?, ?, ?)", (log, version, json.dumps(event, default=str)))
+            db.execute("DELETE FROM logs WHERE log = ? AND version <= ?", (log, version - max(1, keep)))
+            return version
+        return self._transaction(work)
+
+    def read(self, log, after=0, limit=1000):
+        def work(db):
+            first, latest = db.execute("SELECT MIN(version), MAX(version) FROM logs WHERE log = ?", (log,)).fetchone()
+            rows = db.execute("SELECT version, value FROM logs WHERE log = ? AND version > ? ORDER BY version LIMIT ?",
+                              (log, after, limit)).fetchall() if limit else []
+            return rows, first, latest
+        # One read transaction (DEFERRED): a consistent snapshot without taking the write lock
+        rows, first, latest = self._transaction(work, mode="DEFERRED")
+        latest = latest or 0
+        return [(version, json.loads(value)) for version, value in rows], first or latest + 1, latest
+
+
+_store: Optional[StateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """The process-wide state store for STATE_BACKEND (created on first use)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STATE_BACKEND == "sqlite":
+                _store = SQLiteStateStore(STATE_DB)
+                logger.info(f"🗄️ Shared state in {STATE_DB} (SQLite)")
+            elif STATE_BACKEND == "memory":
+                _store = MemoryStateStore()
+            else:
+                raise ValueError(f"Unknown STATE_BACKEND {STATE_BACKEND!r} (memory or sqlite)")
+        return _store
+
+
+__all__ = ['StateStore', 'MemoryStateStore', 'SQLiteStateStore', 'get_state_store', 'worker_id',
+           'STATE_BACKEND', 'STATE_DB']
@@ -0,0 +1,159 @@
+"""
+Bounded async pipeline for streaming endpoints
+reader → analyser → event writer, connected by bounded asyncio queues
+
+- Every stage awaits put() on the queue after it, so a slow consumer fills the queue
+  in front of it and the stage before it waits: a client that reads the event
+  stream slowly slows down analysis and file reading instead of piling events up
+  in memory (or blocking the server)
+- File reads run in worker threads (iter_in_thread); nothing on the event loop
+  sleeps or reads synchronously, so other requests are served while a stream runs
+- stop() ends reading and lets the item in progress finish; closing the event
+  stream (client gone) cancels every stage. Both set stop_event, which ends a
+  follow-mode reader waiting for new lines
+"""
+
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from loguru import logger
+
+_DONE = object()
+
+
+def _take(iterator: Iterator, count: int) -> list:
+    items = []
+    for item in iterator:
+        items.append(item)
+        if len(items) >= count:
+            break
+    return items
+
+
+async def iter_in_thread(iterator: Iterator, chunk_size: int = 64) -> AsyncIterator:
+    """Drain a blocking iterator from a worker thread, chunk_size items per hop
+
+    Use chunk_size=1 for iterators that may wait (follow mode) so each item is
+    passed on as soon as it exists.
+    """
+    while True:
+        items = await asyncio.to_thread(_take, iterator, chunk_size)
+        if not items:
+            return
+        for item in items:
+            yield item
+
+
+class StreamPipeline:
+    """source → handler(item, emit) → events(), with bounded queues between the stages"""
+
+    def __init__(self, source: AsyncIterator, handler: Callable[[object, Callable], Awaitable[None]],
+                 queue_size: int = 16, stop_event: Optional[threading.Event] = None):
+        self.source = source
+        self.handler = handler
+        self.stop_event = stop_event or threading.Event()
+        self._items = asyncio.Queue(maxsize=queue_size)
+        self._events = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+        self._overflow = []  # Events emitted from sync callbacks while the event queue was full
+        self.stopped = False
+        self.stats = {"items_read": 0, "items_handled": 0, "events": 0, "reader_waits": 0, "handler_waits": 0}
+
+    # -- stages ------------------------------------------------------------
+
+    async def _read(self):
+        if self.stopped:
+            return
+        try:
+            async for item in self.source:
+                if self._items.full():
+                    self.stats["reader_waits"] += 1
+                await self._items.put(item)
+                self.stats["items_read"] += 1
+        except Exception as e:
+            await self._items.put(e)
+            return
+        await self._items.put(_DONE)
+
+    async def _handle(self):
+        try:
+            while True:
+                item = await self._items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                await self.handler(item, self.emit)
+                await self._drain_overflow()
+                self.stats["items_handled"] += 1
+        except Exception as e:
+            await self._put(e)
+            return
+        await self._put(_DONE)
+
+    # -- emitting ----------------------------------------------------------
+
+    async def _put(self, event):
+        if self._events.full():
+            self.stats["handler_waits"] += 1
+        await self._events.put(event)
+
+    async def emit(self, event: dict):
+        """Send an event to the consumer, waiting while its queue is full"""
+        await self._drain_overflow()
+        await self._put(event)
+
+    def emit_nowait(self, event: dict):
+        """Send an event from sync code (status callbacks); held back while the queue is full
+
+        Held-back events go out, in order, before the next emit() or once the current item is handled.
+        """
+        if self._overflow or self._events.full():
+            self._overflow.append(event)
+        else:
+            self._events.put_nowait(event)
+
+    async def _drain_overflow(self):
+        while self._overflow:
+            await self._put(self._overflow.pop(0))
+
+    # -- consumer side -----------------------------------------------------
+
+    async def events(self) -> AsyncIterator[dict]:
+        """Events in emit order until the source is exhausted; stage errors are raised here"""
+        self._tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._handle())]
+        try:
+            while True:
+                event = await self._events.get()
+                if event is _DONE:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                self.stats["events"] += 1
+                yield event
+        finally:
+            await self.close()
+
+    def stop(self):
+        """Stop reading; events() ends once the item being handled is done"""
+        self.stopped = True
+        self.stop_event.set()
+        if self._tasks:
+            self._tasks[0].cancel()  # Reader
+        while not self._items.empty():
+            self._items.get_nowait()
+        self._items.put_nowait(_DONE)
+
+    async def close(self):
+        """Cancel the stages and wait for them to finish (idempotent)"""
+        self.stop_event.set()
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, asyncio.CancelledError):
+                logger.debug(f"Stream pipeline stage ended with: {result}")
+
+
+__all__ = ['StreamPipeline', 'iter_in_thread']
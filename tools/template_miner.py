@@ -0,0 +1,188 @@
+"""
+Streaming log template miner (Drain-style)
+Groups log entries into message templates so known-normal templates can skip the LLM
+
+Drain parse tree (He et al., "Drain: An Online Log Parsing Approach"):
+- Level 1: number of tokens in the (masked) message
+- Level 2..depth-1: the first tokens of the message (tokens with digits collapse to <*>)
+- Leaf: a small list of clusters, matched by token similarity; on a match the
+  cluster template is generalised by replacing differing tokens with <*>
+
+Numbers, UUIDs, IPs, hex ids, URLs and paths are masked before parsing, so
+"Processor 42 took 13 ms" and "Processor 7 took 250 ms" share one template.
+
+Each cluster also tracks how the Analyser classified its members. Once a
+template has been classified NORMAL often enough (and with high enough
+confidence) later instances can be answered with a synthesized result.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from tools.timestamp_parser import TIMESTAMP_WIDTH, parse_timestamp_ms
+
+WILDCARD = "<*>"
+
+_MASKS = [
+    (re.compile(r"https?://\S+"), "<URL>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"(?<![\w.])(?:[A-Za-z]:)?(?:[/\\][\w.\-]+){2,}[/\\]?"), "<PATH>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{12,}\b"), "<HEX>"),
+    (re.compile(r"(?<![A-Za-z])[-+]?\d+(?:\.\d+)?"), "<NUM>"),
+]
+
+
+def mask_message(text: str) -> str:
+    """Replace variable parts (ids, numbers, paths...) with placeholders"""
+    for pattern, placeholder in _MASKS:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def _message_of(log_entry: str) -> str:
+    """Header line (+ first continuation line, usually the exception) without the timestamp"""
+    lines = log_entry.split("\n", 2)
+    message = lines[0]
+    if parse_timestamp_ms(message) is not None:
+        message = message[TIMESTAMP_WIDTH:]
+    if len(lines) > 1:
+        message = f"{message} {lines[1]}"
+    return message
+
+
+class LogCluster:
+    """One template plus the Analyser's verdicts for its members"""
+
+    __slots__ = ("cluster_id", "template_tokens", "size", "normal_count", "anomaly_count", "last_normal_result")
+
+    def __init__(self, cluster_id: int, tokens: List[str]):
+        self.cluster_id = cluster_id
+        self.template_tokens = tokens
+        self.size = 1
+        self.normal_count = 0
+        self.anomaly_count = 0
+        self.last_normal_result: Optional[dict] = None
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.template_tokens)
+
+    @property
+    def confidence(self) -> float:
+        total = self.normal_count + self.anomaly_count
+        return self.normal_count / total if total else 0.0
+
+
+class TemplateMiner:
+    """Fixed-depth Drain parse tree over masked log messages"""
+
+    def __init__(self, depth: int = 4, similarity_threshold: float = 0.5, max_children: int = 100,
+                 min_normal: int = 5, min_confidence: float = 0.95):
+        self.prefix_depth = max(1, depth - 2)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.min_normal = min_normal
+        self.min_confidence = min_confidence
+        self.root: Dict[int, dict] = {}
+        self.clusters: Dict[int, LogCluster] = {}
+        self.llm_calls_skipped = 0
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    def add_log_message(self, log_entry: str) -> LogCluster:
+        """Match (or create) the cluster for a log entry, generalising its template if needed"""
+        tokens = mask_message(_message_of(log_entry)).split()
+        leaf = self._leaf_for(tokens)
+
+        cluster, similarity, best_params = None, -1.0, 0
+        for candidate in leaf:
+            score, params = self._similarity(candidate.template_tokens, tokens)
+            if score > similarity or (score == similarity and params < best_params):
+                cluster, similarity, best_params = candidate, score, params
+
+        if cluster is None or similarity < self.similarity_threshold:
+            cluster = LogCluster(len(self.clusters) + 1, tokens)
+            self.clusters[cluster.cluster_id] = cluster
+            leaf.append(cluster)
+            return cluster
+
+        cluster.size += 1
+        merged = [a if a == b else WILDCARD for a, b in zip(cluster.template_tokens, tokens)]
+        if merged != cluster.template_tokens:
+            # The template just got more general - earlier verdicts no longer vouch for it
+            cluster.template_tokens = merged
+            cluster.normal_count = cluster.anomaly_count = 0
+            cluster.last_normal_result = None
+        return cluster
+
+    def _leaf_for(self, tokens: List[str]) -> list:
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.prefix_depth]:
+            key = WILDCARD if any(ch.isdigit() for ch in token) else token
+            if key not in node:
+                key = key if len(node) < self.max_children else WILDCARD
+            node = node.setdefault(key, {})
+        return node.setdefault("__clusters__", [])
+
+    @staticmethod
+    def _similarity(template: List[str], tokens: List[str]):
+        if not tokens:
+            return 1.0, 0
+        same = params = 0
+        for a, b in zip(template, tokens):
+            if a == WILDCARD:
+                params += 1
+            elif a == b:
+                same += 1
+        return same / len(tokens), params
+
+    # ------------------------------------------------------------------
+    # Classification feedback
+    # ------------------------------------------------------------------
+
+    def record_result(self, cluster: LogCluster, analysis: Optional[dict]):
+        """Feed back the Analyser's verdict for one member of the cluster"""
+        if not analysis:
+            return
+        classification = str(analysis.get("classification", "")).upper()
+        if classification == "NORMAL":
+            cluster.normal_count += 1
+            cluster.last_normal_result = analysis
+        elif classification == "ANOMALY":
+            cluster.anomaly_count += 1
+
+    def is_known_normal(self, cluster: LogCluster) -> bool:
+        return cluster.normal_count >= self.min_normal and cluster.confidence >= self.min_confidence
+
+    def synthesize_result(self, cluster: LogCluster) -> dict:
+        """Analysis for a known-normal template, in the Analyser's JSON schema
+
+        Only template-level fields are carried over from earlier verdicts; entry-specific
+        ones (component, likely cause, ...) describe another entry and are not reused.
+        """
+        self.llm_calls_skipped += 1
+        earlier = cluster.last_normal_result or {}
+        return {
+            "application": earlier.get("application", ""),
+            "classification": "NORMAL",
+            "severity": earlier.get("severity") or "LOW",
+            "component": "",
+            "likely_cause": f"Matched known-normal template #{cluster.cluster_id}: {cluster.template}",
+            "recommendation": "No action needed",
+            "template_id": cluster.cluster_id,
+            "template": cluster.template
+        }
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self.clusters),
+            "known_normal_templates": sum(1 for c in self.clusters.values() if self.is_known_normal(c)),
+            "llm_calls_skipped": self.llm_calls_skipped
+        }
+
+
+__all__ = ['TemplateMiner', 'LogCluster', 'mask_message', 'WILDCARD']
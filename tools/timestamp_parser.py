@@ -0,0 +1,101 @@
+"""
+Fast fixed-width log timestamp parser
+Shared by app-log ingestion (agent_1) and NiFi log search (tools/nifi_log_index)
+
+Both log formats start every entry with "YYYY-MM-DD HH:MM:SS,mmm" (23 chars,
+',' or '.' before the milliseconds). Instead of a regex match or strptime per
+line, the prefix is parsed by slicing:
+- the 16-char "YYYY-MM-DD HH:MM" prefix is looked up in a cached minute → epoch-ms
+  table (a log file only spans a handful of distinct minutes per hour)
+- "SS" + "mmm" is validated and converted with a single int() call
+
+Values are naive epoch milliseconds (the log's wall clock treated as UTC), so
+they compare and subtract correctly but carry no timezone.
+"""
+
+from array import array
+from datetime import date
+from typing import Iterable, Optional, Union
+
+TIMESTAMP_WIDTH = 23  # "2025-09-14 10:01:09,437"
+NO_TIMESTAMP = -1  # Bulk-mode marker for continuation lines
+
+_DASH, _COLON, _SPACE, _TAB, _COMMA, _DOT = b"-: \t,."
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MAX_CACHED_MINUTES = 16384
+
+_minute_cache = {}
+
+
+def _minute_ms(prefix: bytes) -> Optional[int]:
+    """Epoch ms of a b"YYYY-MM-DD HH:MM" prefix, validated and cached"""
+    if (prefix[4] != _DASH or prefix[7] != _DASH or prefix[13] != _COLON
+            or (prefix[10] != _SPACE and prefix[10] != _TAB)):
+        return None
+    digits = prefix[0:4] + prefix[5:7] + prefix[8:10] + prefix[11:13] + prefix[14:16]  # b"YYYYMMDDHHMM"
+    if not digits.isdigit():
+        return None
+    hours, minutes = int(digits[8:10]), int(digits[10:12])
+    if hours > 23 or minutes > 59:
+        return None
+    try:
+        day = date(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]))
+    except ValueError:
+        return None
+    value = ((day.toordinal() - _EPOCH_ORDINAL) * 1440 + hours * 60 + minutes) * 60_000
+    if len(_minute_cache) >= _MAX_CACHED_MINUTES:
+        _minute_cache.clear()
+    _minute_cache[prefix] = value
+    return value
+
+
+def parse_timestamp_ms(line: Union[bytes, str]) -> Optional[int]:
+    """Epoch milliseconds of the line's leading timestamp, or None for continuation lines"""
+    if line.__class__ is str:
+        line = line[:TIMESTAMP_WIDTH].encode("ascii", "replace")
+    if len(line) < TIMESTAMP_WIDTH or line[16] != _COLON or (line[19] != _COMMA and line[19] != _DOT):
+        return None
+    minute_ms = _minute_cache.get(line[:16])
+    if minute_ms is None:
+        minute_ms = _minute_ms(line[:16])
+        if minute_ms is None:
+            return None
+    seconds = line[17:19] + line[20:23]  # b"SSmmm" == seconds * 1000 + millis
+    if not seconds.isdigit() or seconds >= b"60000":
+        return None
+    return minute_ms + int(seconds)
+
+
+def parse_lines(lines: Iterable[bytes]) -> array:
+    """Bulk mode: one epoch-ms value per line, NO_TIMESTAMP for lines without one"""
+    # Same logic as parse_timestamp_ms, inlined to avoid a call per line
+    cache_get = _minute_cache.get
+    out = array("q")
+    append = out.append
+    for line in lines:
+        if len(line) < TIMESTAMP_WIDTH or line[16] != _COLON or (line[19] != _COMMA and line[19] != _DOT):
+            append(NO_TIMESTAMP)
+            continue
+        minute_ms = cache_get(line[:16])
+        if minute_ms is None:
+            minute_ms = _minute_ms(line[:16])
+            if minute_ms is None:
+                append(NO_TIMESTAMP)
+                continue
+        seconds = line[17:19] + line[20:23]
+        if not seconds.isdigit() or seconds >= b"60000":
+            append(NO_TIMESTAMP)
+            continue
+        append(minute_ms + int(seconds))
+    return out
+
+
+def parse_buffer(buffer: bytes) -> array:
+    """Bulk mode over a buffer of newline-terminated lines (a trailing partial line is included)"""
+    lines = buffer.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return parse_lines(lines)
+
+
+__all__ = ['parse_timestamp_ms', 'parse_lines', 'parse_buffer', 'TIMESTAMP_WIDTH', 'NO_TIMESTAMP']
@@ -0,0 +1,141 @@
+"""
+Push channel for dashboards
+Approval and job updates are published as numbered events to an append-only log in
+the state store (tools/state_store.py); clients follow the log with a version cursor
+over one connection instead of polling the status endpoints
+
+- publish() appends {type, data, time} and wakes this process's waiting clients at once;
+  publish_soon() does the same from synchronous callbacks running on the event loop
+- wait(after, timeout) returns the events after version `after` as soon as there are
+  any (long poll), or none after `timeout`; reset=True when the cursor is no longer
+  valid (events already dropped, log restarted) - the client then reloads a snapshot
+- With a shared store, events published by other server workers are picked up by
+  one watcher task per process, every UPDATE_POLL_INTERVAL seconds
+- Only the last UPDATE_EVENTS_KEPT events are kept
+"""
+
+import asyncio
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+
+from tools.state_store import StateStore, get_state_store
+
+UPDATE_EVENTS_KEPT = int(os.getenv("UPDATE_EVENTS_KEPT", "1000"))  # events a reconnecting client can catch up on
+UPDATE_POLL_INTERVAL = float(os.getenv("UPDATE_POLL_INTERVAL", "0.5"))  # seconds between checks for other workers' events
+
+APPROVAL_CREATED, APPROVAL_RESOLVED, JOB_PROGRESS = "approval_created", "approval_resolved", "job_progress"
+
+
+class UpdateBus:
+    """Versioned event log with long-poll waiting"""
+
+    def __init__(self, store: StateStore, log: str = "updates", keep: int = 1000, poll_interval: float = 0.5):
+        self.store = store
+        self.log = log
+        self.keep = keep
+        self.poll_interval = poll_interval
+        self.waiting = 0  # Clients waiting in this process
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._publishing: set = set()  # publish_soon() tasks (referenced until done)
+
+    async def publish(self, event_type: str, data: dict) -> int:
+        """Append an event; returns its version"""
+        version = await self.store.aappend(self.log, {"type": event_type, "data": data,
+                                                      "time": datetime.now().isoformat()}, keep=self.keep)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)  # Clients may wait on another event loop
+        return version
+
+    def publish_soon(self, event_type: str, data: dict):
+        """publish() without waiting for it - for callbacks on the event loop; events keep their order"""
+        task = asyncio.get_running_loop().create_task(self.publish(event_type, data))
+        self._publishing.add(task)
+        task.add_done_callback(self._published)
+
+    def _published(self, task: asyncio.Task):
+        self._publishing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠ Could not publish update: {task.exception()}")
+
+    async def latest_version(self) -> int:
+        return (await self.store.aread(self.log, limit=0))[2]
+
+    async def wait(self, after: int, timeout: float) -> dict:
+        """{"version", "events", "reset"}: the events after `after`, waiting up to `timeout` for one"""
+        loop = self._bind()
+        deadline = loop.time() + timeout
+        self.waiting += 1
+        try:
+            while True:
+                wakeup = self._wakeup  # Taken before reading, so a publish in between is not missed
+                events, first, latest = await self.store.aread(self.log, after, limit=self.keep)
+                if after > latest or after < first - 1:
+                    return {"version": latest, "events": [], "reset": True}
+                if events:
+                    return {"version": events[-1][0], "events": [{"version": version, **event}
+                                                                 for version, event in events], "reset": False}
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return {"version": latest, "events": [], "reset": False}
+                if self.store.shared:
+                    self._watch_store(latest)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting -= 1
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._watcher = None
+        return loop
+
+    def _wake(self):
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        if wakeup is not None:
+            wakeup.set()
+
+    def _watch_store(self, seen: int):
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch(seen))
+
+    async def _watch(self, seen: int):
+        # One store read per interval for every client of this process
+        while self.waiting:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                latest = await self.latest_version()
+            except Exception as e:
+                logger.warning(f"⚠ Could not check for new updates: {e}")
+                continue
+            if latest != seen:
+                seen = latest
+                self._wake()
+
+
+_bus: Optional[UpdateBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_update_bus() -> UpdateBus:
+    """The process-wide update bus on the state store (created on first use)"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = UpdateBus(get_state_store(), keep=UPDATE_EVENTS_KEPT, poll_interval=UPDATE_POLL_INTERVAL)
+        return _bus
+
+
+__all__ = ['UpdateBus', 'get_update_bus', 'APPROVAL_CREATED', 'APPROVAL_RESOLVED', 'JOB_PROGRESS',
+           'UPDATE_EVENTS_KEPT', 'UPDATE_POLL_INTERVAL']
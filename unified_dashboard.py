@@ -1,17 +1,96 @@
 """
 Unified Dashboard for Multi-Agent Log Analysis
 Combines: Trigger Analysis + Approval Dashboard
+
+Status and approvals come from the API's push channel (GET /updates): one long-poll
+connection kept open by a background thread, so new approval requests and analysis
+progress show up without clicking Refresh
 """
 
 import streamlit as st
 import requests
 import os
+import threading
 from dotenv import load_dotenv
 import time
 from datetime import datetime
 
 load_dotenv()
 API_BASE = os.getenv("API_BASE_URL")
+DASHBOARD_REFRESH = float(os.getenv("DASHBOARD_REFRESH", "1"))  # seconds between redraws of live sections
+
+
+class LiveUpdates:
+    """Follows /updates in a background thread and keeps the dashboard's view of the server"""
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+        self.connected = False
+        self.version = None
+        self.pending_approvals = {}
+        self.jobs = {}
+        self.analysis_status = {"is_running": False, "logs_processed": 0, "agent_events": []}
+        self.last_update = None
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="dashboard-updates", daemon=True).start()
+
+    def _run(self):
+        http = requests.Session()
+        while True:
+            try:
+                params = {} if self.version is None else {"after": self.version, "timeout": 25}
+                response = http.get(f"{self.api_url}/updates", params=params, timeout=35)
+                response.raise_for_status()
+                self._apply(response.json())
+                self.connected = True
+            except Exception:
+                self.connected = False
+                self.version = None  # Start over from a snapshot once the API is back
+                time.sleep(2)
+
+    def _apply(self, update):
+        with self._lock:
+            snapshot = update.get("snapshot")
+            if snapshot:
+                self.pending_approvals = snapshot["pending_approvals"]
+                self.jobs = {job["job_id"]: job for job in snapshot["jobs"]}
+                self.analysis_status = snapshot["analysis_status"]
+            for event in update["events"]:
+                data = event["data"]
+                if event["type"] == "approval_created":
+                    self.pending_approvals[data["request_id"]] = data
+                elif event["type"] == "approval_resolved":
+                    self.pending_approvals.pop(data["request_id"], None)
+                elif event["type"] == "job_progress":
+                    self._job_progress(data)
+            self.version = update["version"]
+            if snapshot or update["events"]:
+                self.last_update = datetime.now()
+
+    def _job_progress(self, job):
+        self.jobs[job["job_id"]] = job
+        latest = self.analysis_status.get("job_id")
+        latest_started = self.jobs.get(latest, {}).get("started_at") if latest else None
+        if job["started_at"] and (job["job_id"] == latest or not latest_started or job["started_at"] >= latest_started):
+            # Same view as /analysis-status: the most recently started job
+            self.analysis_status = {
+                "logs_processed": job["logs_processed"],
+                "current_activity": job["current_activity"],
+                "current_log": job["current_log"],
+                "agent_events": job.get("events", []),
+                "job_id": job["job_id"]
+            }
+        self.analysis_status["is_running"] = any(j["status"] == "running" for j in self.jobs.values())
+
+    def view(self):
+        """Consistent copy of the state for one redraw"""
+        with self._lock:
+            return dict(self.pending_approvals), dict(self.analysis_status)
+
+
+@st.cache_resource
+def live_updates(api_url):
+    return LiveUpdates(api_url)
 
 # Page configuration
 st.set_page_config(
@@ -52,16 +131,17 @@ with st.sidebar:
     st.divider()
     
     st.header("📊 System Status")
-    try:
-        health_response = requests.get(f"{api_url}/health", timeout=2)
-        if health_response.status_code == 200:
+    updates = live_updates(api_url)
+    
+    @st.fragment(run_every=DASHBOARD_REFRESH)
+    def connection_status():
+        if updates.connected:
             st.success("✅ API Connected")
-            data = health_response.json()
-            st.caption(f"Agents: {', '.join(data.get('agents', []))}")
+            st.caption(f"Live updates - version {updates.version}")
         else:
-            st.error("❌ API Error")
-    except:
-        st.error("❌ API Offline")
+            st.error("❌ API Offline")
+    
+    connection_status()
     
     st.divider()
     
@@ -161,62 +241,48 @@ with tab1:
     st.divider()
     st.subheader("📊 Analysis Status")
     
-    # Get current status
-    try:
-        status_response = requests.get(f"{api_url}/analysis-status", timeout=2)
-        if status_response.status_code == 200:
-            status_data = status_response.json()
-            
-            # Debug expander to see raw data
-            with st.expander("🔍 Debug - Raw Status Data"):
-                st.json(status_data)
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                if status_data["is_running"]:
-                    st.success("🔴 Status: LIVE - Running")
-                else:
-                    st.info("⚪ Status: Idle")
-            with col2:
-                st.metric("Logs Processed", status_data.get("logs_processed", 0))
-            with col3:
-                st.metric("🕐 Last Update", datetime.now().strftime("%H:%M:%S"))
-            
-            # Show current log being processed
-            if status_data.get("current_log"):
-                st.markdown("### 📋 Current Log Being Analyzed")
-                st.code(status_data["current_log"], language="text")
-            
-            # Show important events only (without emojis)
-            if status_data.get("agent_events"):
-                st.markdown("### 📜 Recent Activity (Live Stream)")
-                # Create a scrollable container
-                activity_container = st.container()
-                with activity_container:
-                    for event in reversed(status_data["agent_events"][-20:]):
-                        st.text(f"[{event['time']}] {event['message']}")
+    @st.fragment(run_every=DASHBOARD_REFRESH)
+    def analysis_status():
+        # Kept up to date by the push channel - redrawing reads memory only
+        pending_approvals, status_data = updates.view()
+        
+        # Debug expander to see raw data
+        with st.expander("🔍 Debug - Raw Status Data"):
+            st.json(status_data)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if status_data["is_running"]:
+                st.success("🔴 Status: LIVE - Running")
             else:
-                st.info("💡 No activity yet. Start analysis to see live updates here.")
-            
-            # Check for pending approvals and show notification
-            try:
-                approval_response = requests.get(f"{api_url}/approvals/pending", timeout=1)
-                if approval_response.status_code == 200:
-                    approval_data = approval_response.json()
-                    pending_approvals = approval_data.get("pending_approvals", {})
-                    if pending_approvals:
-                        st.warning(f"🔔 **{len(pending_approvals)} Approval Request(s) Pending!** Switch to 'Approve Plans' tab →")
-            except:
-                pass  # Silently ignore if can't check approvals
-            
-            # Real-time auto-refresh - updates every 1 second when running
-            # DISABLED to prevent blur in other tabs
-            # if status_data["is_running"]:
-            #     time.sleep(1)  # 1 second for real-time feel
-            #     st.rerun()
+                st.info("⚪ Status: Idle")
+        with col2:
+            st.metric("Logs Processed", status_data.get("logs_processed", 0))
+        with col3:
+            last_update = updates.last_update
+            st.metric("🕐 Last Update", last_update.strftime("%H:%M:%S") if last_update else "-")
+        
+        # Show current log being processed
+        if status_data.get("current_log"):
+            st.markdown("### 📋 Current Log Being Analyzed")
+            st.code(status_data["current_log"], language="text")
+        
+        # Show important events only (without emojis)
+        if status_data.get("agent_events"):
+            st.markdown("### 📜 Recent Activity (Live Stream)")
+            # Create a scrollable container
+            activity_container = st.container()
+            with activity_container:
+                for event in reversed(status_data["agent_events"][-20:]):
+                    st.text(f"[{event['time']}] {event['message']}")
+        else:
+            st.info("💡 No activity yet. Start analysis to see live updates here.")
+        
+        # Notify about pending approvals
+        if pending_approvals:
+            st.warning(f"🔔 **{len(pending_approvals)} Approval Request(s) Pending!** Switch to 'Approve Plans' tab →")
     
-    except Exception as e:
-        st.warning(f"⚠️ Could not fetch status: {e}")
+    analysis_status()
     
     st.divider()
     st.info("💡 **Tip:** Switch to 'Approve Plans' tab to handle approval requests when they appear")
@@ -233,28 +299,10 @@ with tab2:
         if st.button("🔄 Refresh Now", use_container_width=True):
             st.rerun()
     with col2:
-        st.caption("💡 Click refresh to check for new approval requests")
+        st.caption("💡 New approval requests appear here automatically")
     
     st.divider()
     
-    # Fetch pending approvals
-    def get_pending_approvals():
-        try:
-            response = requests.get(f"{api_url}/approvals/pending", timeout=5)
-            st.write(f"DEBUG: API Response Status: {response.status_code}")  # DEBUG
-            if response.status_code == 200:
-                data = response.json()
-                st.write(f"DEBUG: Raw data: {data}")  # DEBUG
-                approvals = data.get("pending_approvals", {})
-                st.write(f"DEBUG: Approvals extracted: {len(approvals)} items")  # DEBUG
-                return approvals
-            return {}
-        except Exception as e:
-            st.error(f"❌ Error fetching approvals: {e}")
-            import traceback
-            st.code(traceback.format_exc())
-            return {}
-    
     def approve_request(request_id):
         try:
             response = requests.post(f"{api_url}/approve/{request_id}", timeout=5)
@@ -296,104 +344,108 @@ with tab2:
         except Exception as e:
             st.error(f"❌ Error: {e}")
     
-    approvals = get_pending_approvals()
-    pending_count = len(approvals)
+    @st.fragment(run_every=DASHBOARD_REFRESH)
+    def pending_approvals():
+        approvals, _ = updates.view()
+        pending_count = len(approvals)
     
-    # Debug: Show raw data
-    with st.expander("🔍 Debug Info"):
-        st.json({
-            "pending_count": pending_count, 
-            "approval_ids": list(approvals.keys()) if approvals else [],
-            "full_data": approvals
-        })
+        # Debug: Show raw data
+        with st.expander("🔍 Debug Info"):
+            st.json({
+                "pending_count": pending_count, 
+                "approval_ids": list(approvals.keys()) if approvals else [],
+                "full_data": approvals
+            })
     
-    # Metrics
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("⏳ Pending Approvals", pending_count)
-    with col2:
-        st.metric("✅ Status", "Active" if pending_count > 0 else "Idle")
-    with col3:
-        st.metric("🕐 Last Check", datetime.now().strftime("%H:%M:%S"))
+        # Metrics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("⏳ Pending Approvals", pending_count)
+        with col2:
+            st.metric("✅ Status", "Active" if pending_count > 0 else "Idle")
+        with col3:
+            st.metric("🕐 Last Check", datetime.now().strftime("%H:%M:%S"))
     
-    st.divider()
+        st.divider()
     
-    # Display approvals
-    if pending_count == 0:
-        st.info("✅ **No pending approvals** - All remediation plans have been reviewed!")
+        # Display approvals
+        if pending_count == 0:
+            st.info("✅ **No pending approvals** - All remediation plans have been reviewed!")
         
-        # Show execution logs from terminal
-        st.markdown("---")
-        st.subheader("📜 Execution Logs")
-        st.info("💡 **Tip:** After approving a plan, check your **FastAPI terminal** to see real-time execution progress and command outputs.")
+            # Show execution logs from terminal
+            st.markdown("---")
+            st.subheader("📜 Execution Logs")
+            st.info("💡 **Tip:** After approving a plan, check your **FastAPI terminal** to see real-time execution progress and command outputs.")
         
-        with st.expander("🔍 Where to see execution details"):
-            st.markdown("""
-            **After you approve a plan:**
-            1. ✅ The approval is sent to the agent
-            2. 🔧 The agent executes the command in the terminal
-            3. 📊 Results appear in the **FastAPI server terminal** (where you ran `python main.py`)
-            4. 🤖 The agent may present a new plan based on the results
+            with st.expander("🔍 Where to see execution details"):
+                st.markdown("""
+                **After you approve a plan:**
+                1. ✅ The approval is sent to the agent
+                2. 🔧 The agent executes the command in the terminal
+                3. 📊 Results appear in the **FastAPI server terminal** (where you ran `python main.py`)
+                4. 🤖 The agent may present a new plan based on the results
             
-            **To see execution progress:**
-            - Look at the terminal where `python main.py` is running
-            - You'll see command outputs and agent responses there
-            - New approval requests will appear here automatically
-            """)
-    else:
-        st.success(f"📋 **{pending_count} Approval Request{'s' if pending_count > 1 else ''} Found!**")
+                **To see execution progress:**
+                - Look at the terminal where `python main.py` is running
+                - You'll see command outputs and agent responses there
+                - New approval requests will appear here automatically
+                """)
+        else:
+            st.success(f"📋 **{pending_count} Approval Request{'s' if pending_count > 1 else ''} Found!**")
         
-        for request_id, approval in approvals.items():
-            with st.container():
-                # Card header
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.markdown(f"### 🔖 Request ID: `{request_id}`")
-                with col2:
-                    created_time = datetime.fromtimestamp(approval.get("created_at", 0))
-                    st.caption(f"⏰ {created_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            for request_id, approval in approvals.items():
+                with st.container():
+                    # Card header
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.markdown(f"### 🔖 Request ID: `{request_id}`")
+                    with col2:
+                        created_time = datetime.fromtimestamp(approval.get("created_at", 0))
+                        st.caption(f"⏰ {created_time.strftime('%Y-%m-%d %H:%M:%S')}")
                 
-                # Plan details - handle both old and new format
-                plan_content = approval.get("plan", "") or approval.get("plan_text", "")
+                    # Plan details - handle both old and new format
+                    plan_content = approval.get("plan", "") or approval.get("plan_text", "")
                 
-                # Try to parse the structured format
-                if "UNDERSTANDING:" in plan_content:
-                    # New format: all in one string
-                    st.markdown("**📋 Remediation Plan:**")
-                    st.text_area("Plan Details", plan_content, height=300, disabled=True, key=f"plan_display_{request_id}", label_visibility="collapsed")
-                else:
-                    # Old format: separate fields
-                    st.markdown("**🧠 Understanding:**")
-                    st.info(approval.get("understanding", "N/A"))
+                    # Try to parse the structured format
+                    if "UNDERSTANDING:" in plan_content:
+                        # New format: all in one string
+                        st.markdown("**📋 Remediation Plan:**")
+                        st.text_area("Plan Details", plan_content, height=300, disabled=True, key=f"plan_display_{request_id}", label_visibility="collapsed")
+                    else:
+                        # Old format: separate fields
+                        st.markdown("**🧠 Understanding:**")
+                        st.info(approval.get("understanding", "N/A"))
                     
-                    st.markdown("**📋 Plan:**")
-                    st.code(plan_content or "No plan details", language="text")
+                        st.markdown("**📋 Plan:**")
+                        st.code(plan_content or "No plan details", language="text")
                     
-                # Action buttons
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    if st.button("✅ Approve", key=f"approve_{request_id}", type="primary", use_container_width=True):
-                        approve_request(request_id)
-                        st.success("✅ Approved! Check the FastAPI terminal for execution progress.")
-                with col2:
-                    if st.button("❌ Reject", key=f"reject_{request_id}", use_container_width=True):
-                        reject_request(request_id)
+                    # Action buttons
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        if st.button("✅ Approve", key=f"approve_{request_id}", type="primary", use_container_width=True):
+                            approve_request(request_id)
+                            st.success("✅ Approved! Check the FastAPI terminal for execution progress.")
+                    with col2:
+                        if st.button("❌ Reject", key=f"reject_{request_id}", use_container_width=True):
+                            reject_request(request_id)
                 
-                # Feedback/Suggestion section
-                with st.expander("💬 Provide Feedback / Suggestions"):
-                    feedback = st.text_area(
-                        "Your suggestions for modifying the plan:",
-                        key=f"feedback_{request_id}",
-                        placeholder="e.g., 'Use df -h instead of df', 'Check /var/log first', 'Add error handling'...",
-                        height=100
-                    )
-                    if st.button("📝 Send Feedback", key=f"feedback_btn_{request_id}", use_container_width=True):
-                        if feedback.strip():
-                            send_feedback(request_id, feedback)
-                        else:
-                            st.warning("Please enter your feedback first!")
+                    # Feedback/Suggestion section
+                    with st.expander("💬 Provide Feedback / Suggestions"):
+                        feedback = st.text_area(
+                            "Your suggestions for modifying the plan:",
+                            key=f"feedback_{request_id}",
+                            placeholder="e.g., 'Use df -h instead of df', 'Check /var/log first', 'Add error handling'...",
+                            height=100
+                        )
+                        if st.button("📝 Send Feedback", key=f"feedback_btn_{request_id}", use_container_width=True):
+                            if feedback.strip():
+                                send_feedback(request_id, feedback)
+                            else:
+                                st.warning("Please enter your feedback first!")
                 
-                st.divider()
+                    st.divider()
+    
+    pending_approvals()
 
 # Footer
 st.markdown("---")